@@ -0,0 +1,7 @@
+"""
+Reproducible ingest and read benchmarks for the TrainTrack API.
+
+The suite starts the API itself (or targets ``--base-url``), seeds synthetic
+runs and writes machine-readable results that can be compared against a
+baseline file. See ``python -m benchmarks.suite --help``.
+"""
@@ -0,0 +1,212 @@
+"""
+The benchmarks. Each one returns result records::
+
+    {"benchmark": ..., "case": ..., "metric": ..., "value": ..., "unit": ..., "higher_is_better": ...}
+"""
+
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+from benchmarks.suite.synthetic import SyntheticSpec, create_model, create_run, seed_runs
+from client.traintrack import TrainTrackClient, AsyncTrainTrackClient
+
+
+def record(benchmark: str, case: str, metric: str, value: float, unit: str, higher_is_better: bool) -> dict:
+    return {"benchmark": benchmark, "case": case, "metric": metric, "value": value,
+            "unit": unit, "higher_is_better": higher_is_better}
+
+
+def latency_records(benchmark: str, case: str, latencies: list) -> list[dict]:
+    """p50/p90/p99/mean of ``latencies`` (seconds) as millisecond records."""
+    # quantiles() needs two samples: a single one is every percentile
+    q = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return [record(benchmark, case, name, value * 1000, "ms", False)
+            for name, value in (("p50", q[49]), ("p90", q[89]), ("p99", q[98]),
+                                ("mean", statistics.fmean(latencies)))]
+
+
+def timed(fn, repeat: int) -> list:
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def ingest_single(session: requests.Session, base_url: str, calls: int) -> list[dict]:
+    """One POST /loss/ per point, sequentially: per-request cost."""
+    run_id = create_run(session, base_url)
+    step = iter(range(calls))
+
+    def post():
+        r = session.post(f"{base_url}/loss/", json={"run_id": run_id, "step": next(step),
+                                                    "split": "train", "value": 0.5})
+        r.raise_for_status()
+
+    latencies = timed(post, calls)
+    return latency_records("ingest_single", f"calls={calls}", latencies) + [
+        record("ingest_single", f"calls={calls}", "points_per_sec", calls / sum(latencies), "points/s", True)]
+
+
+def ingest_concurrent(base_url: str, writers: int, calls: int) -> list[dict]:
+    """
+    ``writers`` threads, each logging its own run one POST /loss/ at a time
+    like independent training jobs: latency and throughput under contention.
+    """
+    latencies, errors = [], []
+
+    def writer():
+        with requests.Session() as session:
+            run_id = create_run(session, base_url)
+            for step in range(calls):
+                start = time.perf_counter()
+                try:
+                    r = session.post(f"{base_url}/loss/", json={"run_id": run_id, "step": step,
+                                                                "split": "train", "value": 0.5})
+                    r.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+                except requests.RequestException:
+                    errors.append(step)
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    case = f"writers={writers} calls={calls}"
+    results = [record("ingest_concurrent", case, "requests_per_sec", len(latencies) / elapsed, "req/s", True),
+               record("ingest_concurrent", case, "errors", len(errors), "requests", False)]
+    if latencies:
+        results += latency_records("ingest_concurrent", case, latencies)
+    return results
+
+
+def ingest_batch(session: requests.Session, base_url: str, sizes: list[int], repeat: int,
+                 returning: str = "count") -> list[dict]:
+    """POST /loss/batch and /metric/batch at growing batch sizes, answering with ``returning``."""
+    results = []
+    for endpoint, key, point in (
+            ("/loss/batch", "losses", lambda run_id, s: {"run_id": run_id, "step": s, "split": "train",
+                                                         "value": 0.5}),
+            ("/metric/batch", "metrics", lambda run_id, s: {"run_id": run_id, "step": s, "split": "validation",
+                                                            "metric_name": "accuracy", "value": 0.5})):
+        for size in sizes:
+            latencies = []
+            for _ in range(repeat):
+                run_id = create_run(session, base_url)
+                payload = {"run_id": run_id, key: [point(run_id, s) for s in range(size)]}
+                start = time.perf_counter()
+                r = session.post(f"{base_url}{endpoint}", params={"return": returning}, json=payload)
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+            best = min(latencies)
+            case = f"{endpoint} size={size}" + (f" return={returning}" if returning != "count" else "")
+            results.append(record("ingest_batch", case, "points_per_sec", size / best, "points/s", True))
+            results.append(record("ingest_batch", case, "best", best * 1000, "ms", False))
+    return results
+
+
+def read_latency(session: requests.Session, base_url: str, sizes: list[int], repeat: int) -> list[dict]:
+    """
+    GET /loss/ and /metric/ of one run holding ``size`` points per table,
+    as full JSON, downsampled to 1000 points and as columnar binary.
+    """
+    results = []
+    for size in sizes:
+        # one split and one metric: the read returns exactly ``size`` points
+        (run_id,) = seed_runs(session, base_url, SyntheticSpec(runs=1, steps=size, splits=["train"],
+                                                               metrics=["accuracy"]))
+        for path in ("/loss/", "/metric/"):
+            for variant, params in (("json", {}), ("max_points=1000", {"max_points": 1000}),
+                                    ("binary", {"format": "binary"})):
+                def get():
+                    r = session.get(f"{base_url}{path}", params={"run_id": run_id, **params})
+                    r.raise_for_status()
+                results += latency_records("read_latency", f"GET {path} points={size} {variant}",
+                                           timed(get, repeat))
+    return results
+
+
+def compare_fanout(session: requests.Session, base_url: str, runs: int, steps: int, repeat: int,
+                   splits: list = None, metrics: list = None, concurrency: int = 6) -> list[dict]:
+    """
+    Loading a compare page of ``runs`` runs: one GET /loss/ and /metric/ per
+    run, ``concurrency`` at a time like a browser, vs one POST /runs/series.
+    """
+    spec = SyntheticSpec(runs=runs, steps=steps)
+    if splits:
+        spec.splits = splits
+    if metrics:
+        spec.metrics = metrics
+    run_ids = seed_runs(session, base_url, spec)
+
+    def fetch(path_run):
+        path, run_id = path_run
+        r = session.get(f"{base_url}{path}", params={"run_id": run_id, "max_points": 1000, "format": "columnar"})
+        r.raise_for_status()
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        requests_ = [(path, run_id) for run_id in run_ids for path in ("/loss/", "/metric/")]
+        fan_out = timed(lambda: list(pool.map(fetch, requests_)), repeat)
+
+    def series():
+        r = session.post(f"{base_url}/runs/series", json={"run_ids": run_ids, "max_points": 1000})
+        r.raise_for_status()
+
+    case = f"runs={runs} steps={steps}"
+    return (latency_records("compare_fanout", f"{case} per-run GETs", fan_out)
+            + latency_records("compare_fanout", f"{case} /runs/series", timed(series, repeat)))
+
+
+async def _async_log_loss(base_url: str, model_id: str, calls: int) -> list:
+    latencies = []
+    async with AsyncTrainTrackClient(base_url) as tt:
+        await tt.create_run(model_id=model_id)
+        for step in range(calls):
+            start = time.perf_counter()
+            await tt.log_loss(step, "train", 0.5)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def client_overhead(session: requests.Session, base_url: str, calls: int) -> list[dict]:
+    """
+    TrainTrackClient.log_loss vs the same POST through a bare requests
+    session and through one connection per call (the old client transport),
+    plus AsyncTrainTrackClient when httpx is installed.
+    """
+    run_id = create_run(session, base_url)
+    steps = iter(range(3 * calls))
+
+    def post(send):
+        def call():
+            r = send(f"{base_url}/loss/", json={"run_id": run_id, "step": next(steps),
+                                                "split": "train", "value": 0.5})
+            r.raise_for_status()
+        return call
+
+    client = TrainTrackClient(base_url)
+    try:
+        bare = timed(post(session.post), calls)
+        unpooled = timed(post(requests.post), calls)
+        wrapped = timed(lambda: client.log_loss(next(steps), "train", 0.5, run_id=run_id), calls)
+    finally:
+        client.close()
+    overhead = statistics.median(wrapped) - statistics.median(bare)
+    results = (latency_records("client_overhead", "requests.Session", bare)
+               + latency_records("client_overhead", "requests.post", unpooled)
+               + latency_records("client_overhead", "TrainTrackClient.log_loss", wrapped)
+               + [record("client_overhead", "TrainTrackClient.log_loss", "overhead_p50", overhead * 1000, "ms", False)])
+    try:
+        latencies = asyncio.run(_async_log_loss(base_url, create_model(session, base_url), calls))
+    except ImportError:
+        return results
+    return results + latency_records("client_overhead", "AsyncTrainTrackClient.log_loss", latencies)
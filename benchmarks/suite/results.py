@@ -0,0 +1,70 @@
+"""Machine-readable results and comparison against a baseline run."""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, urlunsplit
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _redact(url):
+    if not url:
+        return url
+    parts = urlsplit(url)
+    if parts.password:
+        parts = parts._replace(netloc=parts.netloc.replace(f":{parts.password}@", ":***@"))
+    return urlunsplit(parts)
+
+
+def environment(database_url: str, base_url: str, server_env: dict, options: dict) -> dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "database_url": _redact(database_url),
+        "base_url": base_url,
+        "server_env": server_env,
+        "options": options,
+    }
+
+
+def write_results(path: str, meta: dict, results: list[dict]):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"version": 1, "meta": meta, "results": results}, f, indent=2)
+
+
+def print_results(results: list[dict]):
+    width = max((len(f"{r['benchmark']} {r['case']}") for r in results), default=20)
+    for r in results:
+        print(f"{r['benchmark'] + ' ' + r['case']:<{width}}  {r['metric']:>14}  {r['value']:>12.2f} {r['unit']}")
+
+
+def compare(baseline_path: str, results: list[dict], threshold: float) -> list[dict]:
+    """Print the change of every result present in the baseline; return those worse than ``threshold``."""
+    with open(baseline_path) as f:
+        baseline = {(r["benchmark"], r["case"], r["metric"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        old = baseline.get((r["benchmark"], r["case"], r["metric"]))
+        if old is None or not old["value"]:
+            continue
+        change = (r["value"] - old["value"]) / abs(old["value"])
+        worse = -change if r["higher_is_better"] else change
+        flag = "REGRESSION" if worse > threshold else ""
+        print(f"{r['benchmark']} {r['case']} {r['metric']}: {old['value']:.2f} -> {r['value']:.2f} "
+              f"{r['unit']} ({change:+.1%}) {flag}")
+        if flag:
+            regressions.append({**r, "baseline": old["value"], "change": change})
+    return regressions
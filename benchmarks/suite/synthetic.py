@@ -0,0 +1,65 @@
+"""Synthetic models and runs, seeded through the batch endpoints."""
+
+import math
+import random
+import uuid
+from dataclasses import dataclass, field
+import requests
+
+SEED_CHUNK = 20000
+
+
+@dataclass
+class SyntheticSpec:
+    runs: int = 1
+    steps: int = 1000
+    splits: list = field(default_factory=lambda: ["train", "validation"])
+    metrics: list = field(default_factory=lambda: ["accuracy"])
+
+    @property
+    def points_per_run(self) -> int:
+        return self.steps * len(self.splits) * (1 + len(self.metrics))
+
+
+def create_model(session: requests.Session, base_url: str) -> str:
+    model = session.post(f"{base_url}/models/", json={"name": f"bench-{uuid.uuid4().hex[:8]}",
+                                                      "project_name": "benchmarks"})
+    model.raise_for_status()
+    return model.json()["id"]
+
+
+def create_run(session: requests.Session, base_url: str, model_id: str = None) -> str:
+    """Create a run, under a new model unless ``model_id`` is given."""
+    model_id = model_id or create_model(session, base_url)
+    run = session.post(f"{base_url}/runs/", json={"model_id": model_id, "hyperparameters": {"seed": 0}})
+    run.raise_for_status()
+    return run.json()["id"]
+
+
+def curve(step: int, steps: int, rng: random.Random) -> float:
+    """A noisy decaying loss curve."""
+    return math.exp(-4 * step / max(1, steps)) + rng.gauss(0, 0.02)
+
+
+def _post_chunks(session, url: str, run_id: str, key: str, points: list):
+    for i in range(0, len(points), SEED_CHUNK):
+        r = session.post(url, params={"return": "none"}, json={"run_id": run_id, key: points[i:i + SEED_CHUNK]})
+        r.raise_for_status()
+
+
+def seed_runs(session: requests.Session, base_url: str, spec: SyntheticSpec, seed: int = 0) -> list[str]:
+    """Create ``spec.runs`` runs of one model, each with every split/metric series filled up to ``spec.steps``."""
+    rng = random.Random(seed)
+    model_id = create_model(session, base_url)
+    run_ids = []
+    for _ in range(spec.runs):
+        run_id = create_run(session, base_url, model_id)
+        losses = [{"run_id": run_id, "step": s, "split": split, "value": curve(s, spec.steps, rng)}
+                  for split in spec.splits for s in range(spec.steps)]
+        _post_chunks(session, f"{base_url}/loss/batch", run_id, "losses", losses)
+        metrics = [{"run_id": run_id, "step": s, "split": split, "metric_name": name,
+                    "value": 1 - curve(s, spec.steps, rng)}
+                   for split in spec.splits for name in spec.metrics for s in range(spec.steps)]
+        _post_chunks(session, f"{base_url}/metric/batch", run_id, "metrics", metrics)
+        run_ids.append(run_id)
+    return run_ids
@@ -0,0 +1,58 @@
+"""
+TrainTrack command line tools.
+
+    python -m client.cli sync runs/*/traintrack.spool [--url http://localhost:8000] [--remove]
+
+`sync` replays the spools of offline or interrupted runs to the server.
+"""
+
+import argparse
+import os
+import sys
+from client.spool import Spool, replay
+from client.traintrack import TrainTrackClient
+
+
+def sync(paths: list[str], url: str = None, batch_size: int = 5000, remove: bool = False) -> int:
+    failures = 0
+    for path in paths:
+        if not os.path.exists(path):
+            failures += 1
+            print(f"{path}: no such spool", file=sys.stderr)
+            continue
+        spool = Spool(path)
+        base_url = url or spool.get_meta("base_url") or "http://localhost:8000"
+        client = TrainTrackClient(base_url)
+        try:
+            sent = replay(spool, client, batch_size)
+            print(f"{path}: sent {sent} points to {base_url}")
+        except Exception as e:
+            failures += 1
+            print(f"{path}: failed after partial sync ({spool.count()} operations left): {e}", file=sys.stderr)
+            continue
+        finally:
+            client.close()
+            spool.close()
+        if remove:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="traintrack", description="TrainTrack command line tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_sync = sub.add_parser("sync", help="push spooled runs to the server")
+    p_sync.add_argument("paths", nargs="+", help="spool files written with TrainTrackClient(spool=...)")
+    p_sync.add_argument("--url", help="server URL (default: the one recorded in each spool)")
+    p_sync.add_argument("--batch-size", type=int, default=5000)
+    p_sync.add_argument("--remove", action="store_true", help="delete spools that were fully synced")
+    args = parser.parse_args(argv)
+
+    if args.command == "sync":
+        sys.exit(1 if sync(args.paths, args.url, args.batch_size, args.remove) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Rank-aggregated logging for distributed (e.g. DDP) training.
+
+Every rank logs as usual; rank 0 runs an aggregator thread that collects
+the values of all ranks over a local TCP socket, reduces them per step
+(mean/sum/min/max/last) and forwards a single buffered stream to the
+server, so the request volume does not grow with the number of GPUs.
+
+    tt = DistributedTrainTrackClient("http://localhost:8000")   # RANK/WORLD_SIZE from env
+    tt.create_model("ResNet50", "Image Classification")          # rank 0 only, no-op elsewhere
+    tt.create_run(hyperparameters={"lr": 0.001})
+    for epoch in range(50):
+        tt.log_loss(step=epoch, split="train", value=local_loss)  # every rank
+    tt.close()          # every rank, before rank 0 completes the run
+    tt.complete_run()   # rank 0
+"""
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import statistics
+import threading
+import time
+from typing import Optional, Union
+from client.enums import SplitEnum
+from client.traintrack import TrainTrackClient
+
+logger = logging.getLogger("traintrack")
+
+REDUCERS = {
+    "mean": statistics.fmean,
+    "sum": sum,
+    "min": min,
+    "max": max,
+    "last": lambda values: values[-1],
+}
+
+
+class RankAggregator:
+    """Collects per-rank points and forwards one reduced point per (series, step)."""
+
+    def __init__(self, client: TrainTrackClient, world_size: int,
+                 reduce: Union[str, dict] = "mean", max_wait: float = 30.0,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.client = client
+        self.world_size = world_size
+        self.reduce = reduce
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._pending = {}   # (kind, split, metric_name, step) -> (first_seen, [values])
+        self._closed_ranks = set()
+        self._stop = threading.Event()
+
+        aggregator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    msg = json.loads(line)
+                    if msg.get("kind") == "close":
+                        aggregator.rank_closed(msg["rank"])
+                    else:
+                        aggregator.add(msg)
+
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.address = self._server.server_address
+        threading.Thread(target=self._server.serve_forever, name="traintrack-agg", daemon=True).start()
+        threading.Thread(target=self._reap, name="traintrack-agg-reaper", daemon=True).start()
+
+    def _reducer(self, kind: str, metric_name: Optional[str]):
+        op = self.reduce
+        if isinstance(op, dict):
+            op = op.get(metric_name if kind == "metric" else "loss", "mean")
+        if op not in REDUCERS:
+            raise ValueError(f"Unknown reduce op '{op}', expected one of {sorted(REDUCERS)}")
+        return REDUCERS[op]
+
+    def add(self, msg: dict):
+        key = (msg["kind"], msg["split"], msg.get("metric_name"), msg["step"])
+        with self._lock:
+            first_seen, values = self._pending.setdefault(key, (time.monotonic(), []))
+            values.append(msg["value"])
+            if len(values) < self.world_size:
+                return
+            del self._pending[key]
+        self._forward(key, values)
+
+    def rank_closed(self, rank: int):
+        with self._lock:
+            self._closed_ranks.add(rank)
+
+    def _forward(self, key: tuple, values: list):
+        kind, split, metric_name, step = key
+        value = self._reducer(kind, metric_name)(values)
+        if len(values) < self.world_size:
+            logger.warning(f"Step {step} of {kind} {metric_name or split} reduced over "
+                           f"{len(values)}/{self.world_size} ranks")
+        if kind == "loss":
+            self.client.log_loss(step=step, split=split, value=value)
+        else:
+            self.client.log_metric(step=step, split=split, metric_name=metric_name, value=value)
+
+    def _take(self, older_than: Optional[float] = None) -> list:
+        now = time.monotonic()
+        with self._lock:
+            keys = [k for k, (seen, _) in self._pending.items()
+                    if older_than is None or now - seen >= older_than]
+            return [(k, self._pending.pop(k)[1]) for k in keys]
+
+    def _reap(self):
+        # a rank that died or skipped a step must not hold the series back forever
+        while not self._stop.wait(min(1.0, self.max_wait)):
+            for key, values in self._take(self.max_wait):
+                self._forward(key, values)
+
+    def drain(self, timeout: Optional[float] = None):
+        """Wait for the other ranks to close (or timeout), then forward everything pending."""
+        deadline = time.monotonic() + (self.max_wait if timeout is None else timeout)
+        while time.monotonic() < deadline:
+            with self._lock:
+                if len(self._closed_ranks) >= self.world_size - 1:
+                    break
+            time.sleep(0.05)
+        for key, values in sorted(self._take(), key=lambda kv: kv[0][3]):
+            self._forward(key, values)
+
+    def close(self):
+        self._stop.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class DistributedTrainTrackClient:
+    """
+    TrainTrackClient for multi-process training. Rank 0 owns the server
+    connection and the aggregator; the other ranks only send their values
+    to it. ``rank``/``world_size`` default to the RANK/WORLD_SIZE variables
+    set by torchrun, the aggregator listens on MASTER_ADDR and
+    TRAINTRACK_AGG_PORT (29600).
+    """
+
+    def __init__(self, base_url: str = "http://localhost:8000", rank: Optional[int] = None,
+                 world_size: Optional[int] = None, reduce: Union[str, dict] = "mean",
+                 host: Optional[str] = None, port: Optional[int] = None,
+                 max_wait: float = 30.0, connect_timeout: float = 60.0, **client_kwargs):
+        self.rank = int(os.getenv("RANK", "0")) if rank is None else rank
+        self.world_size = int(os.getenv("WORLD_SIZE", "1")) if world_size is None else world_size
+        host = host or os.getenv("MASTER_ADDR", "127.0.0.1")
+        port = int(os.getenv("TRAINTRACK_AGG_PORT", "29600")) if port is None else port
+        self.max_wait = max_wait
+        self.client = None
+        self._aggregator = None
+        self._sock = None
+        self._send_lock = threading.Lock()
+        self._closed = False
+        self._run_finished = False
+
+        if self.rank == 0:
+            client_kwargs.setdefault("buffered", not client_kwargs.get("spool"))
+            self.client = TrainTrackClient(base_url, **client_kwargs)
+            # ranks on other nodes connect through MASTER_ADDR, so listen on every interface then
+            bind_host = host if host in ("127.0.0.1", "localhost") else "0.0.0.0"
+            self._aggregator = RankAggregator(self.client, self.world_size, reduce, max_wait, bind_host, port)
+        else:
+            self._sock = self._connect(host, port, connect_timeout)
+
+    @staticmethod
+    def _connect(host: str, port: int, timeout: float) -> socket.socket:
+        # rank 0 may still be starting its aggregator
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return socket.create_connection((host, port), timeout=timeout)
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.2)
+
+    @property
+    def is_main(self) -> bool:
+        return self.rank == 0
+
+    @property
+    def model_id(self):
+        return self.client.model_id if self.client else None
+
+    @property
+    def run_id(self):
+        return self.client.run_id if self.client else None
+
+    def _send(self, msg: dict):
+        if self._aggregator is not None:
+            return self._aggregator.add(msg)
+        line = (json.dumps(msg) + "\n").encode()
+        with self._send_lock:
+            self._sock.sendall(line)
+
+    # ── Rank 0 only (no-ops on the other ranks) ─────
+
+    def create_model(self, name: str, project_name: str):
+        """Register a new model on rank 0."""
+        return self.client.create_model(name, project_name) if self.is_main else None
+
+    def create_run(self, hyperparameters: Optional[dict] = None, model_id: str = None):
+        """Start a new run on rank 0."""
+        return self.client.create_run(hyperparameters, model_id) if self.is_main else None
+
+    def complete_run(self):
+        """Forward what the other ranks logged, then mark the run as completed."""
+        if self.is_main:
+            return self._finish_run(self.client.complete_run)
+
+    def fail_run(self):
+        """Forward what the other ranks logged, then mark the run as failed."""
+        if self.is_main:
+            return self._finish_run(self.client.fail_run)
+
+    def _finish_run(self, set_status):
+        self._stop_aggregator()
+        result = set_status()
+        self._run_finished = True
+        if self._closed:
+            self.client.close()
+        return result
+
+    def _stop_aggregator(self):
+        # waits for the other ranks to close, then forwards their last values
+        if self._aggregator is not None:
+            self._aggregator.drain(self.max_wait)
+            self._aggregator.close()
+            self._aggregator = None
+
+    # ── Every rank ──────────────────────────────────
+
+    def log_loss(self, step: int, split: SplitEnum, value: float):
+        """Log this rank's loss value; rank 0 forwards the reduction over all ranks."""
+        self._send({"kind": "loss", "split": split, "step": step, "value": value})
+
+    def log_losses(self, losses: list[dict]):
+        """losses: list of {"step": int, "split": str, "value": float}"""
+        for l in losses:
+            self.log_loss(l["step"], l["split"], l["value"])
+
+    def log_metric(self, step: int, split: SplitEnum, metric_name: str, value: float):
+        """Log this rank's metric value; rank 0 forwards the reduction over all ranks."""
+        self._send({"kind": "metric", "split": split, "metric_name": metric_name,
+                    "step": step, "value": value})
+
+    def log_metrics(self, metrics: list[dict]):
+        """metrics: list of {"step": int, "split": str, "metric_name": str, "value": float}"""
+        for m in metrics:
+            self.log_metric(m["step"], m["split"], m["metric_name"], m["value"])
+
+    def close(self):
+        """
+        Non-zero ranks tell rank 0 they are done; rank 0 stops the aggregator
+        and flushes. Rank 0 keeps its connection open for a complete_run() or
+        fail_run() still to come, which then closes it.
+        """
+        if self._sock is not None:
+            self._send({"kind": "close", "rank": self.rank})
+            self._sock.close()
+            self._sock = None
+        elif self.is_main and not self._closed:
+            self._closed = True
+            self._stop_aggregator()
+            if self._run_finished or self.client.run_id is None:
+                self.client.close()
+            else:
+                self.client.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
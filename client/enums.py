@@ -9,6 +9,7 @@ class StatusEnum(str, enum.Enum):
     completed = 'completed'
     failed = 'failed'
 
+# common metric names; the server accepts any name, these are just shortcuts
 class MetricEnum(str, enum.Enum):
     accuracy = 'accuracy'
     f1_score = 'f1-score'
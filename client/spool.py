@@ -0,0 +1,208 @@
+"""
+Write-ahead spool for TrainTrackClient.
+
+Every logged point (and, while the server is unreachable, every model/run
+creation and status change) is appended to a local SQLite file first and
+replayed to the API in order. Points are sent with ``on_conflict=update``,
+so replaying a batch the server already stored is harmless.
+"""
+
+import os
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional
+import requests
+
+logger = logging.getLogger("traintrack")
+
+LOCAL_PREFIX = "local-"
+
+
+def is_local(object_id) -> bool:
+    """True for placeholder IDs handed out while the server was unreachable."""
+    return isinstance(object_id, str) and object_id.startswith(LOCAL_PREFIX)
+
+
+class Spool:
+    """Append-only SQLite journal of operations not yet acknowledged by the server."""
+
+    def __init__(self, path: str, base_url: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS ops ("
+                           "id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, "
+                           "target TEXT NOT NULL, payload TEXT NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        if base_url and self.get_meta("base_url") is None:
+            self.set_meta("base_url", base_url)
+
+    def append(self, kind: str, target: str, payload: dict):
+        self.append_many(kind, target, [payload])
+
+    def append_many(self, kind: str, target: str, payloads: list[dict]):
+        rows = [(kind, target, json.dumps(p)) for p in payloads]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT INTO ops (kind, target, payload) VALUES (?, ?, ?)", rows)
+            self._conn.execute("COMMIT")
+
+    def pending(self, limit: int) -> list[tuple]:
+        with self._lock:
+            rows = self._conn.execute("SELECT id, kind, target, payload FROM ops ORDER BY id LIMIT ?",
+                                      (limit,)).fetchall()
+        return [(i, kind, target, json.loads(payload)) for i, kind, target, payload in rows]
+
+    def ack(self, last_id: int):
+        """Forget every operation up to and including ``last_id``."""
+        with self._lock:
+            self._conn.execute("DELETE FROM ops WHERE id <= ?", (last_id,))
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM ops").fetchone()[0]
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def new_local_id(self) -> str:
+        return f"{LOCAL_PREFIX}{uuid.uuid4()}"
+
+    def resolve(self, object_id: str) -> str:
+        """Map a placeholder ID to the server ID it was replayed as."""
+        if not is_local(object_id):
+            return object_id
+        real = self.get_meta(f"id:{object_id}")
+        if real is None:
+            raise RuntimeError(f"{object_id} has not been created on the server yet")
+        return real
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _replay_op(spool: Spool, client, kind: str, target: str, payload: dict):
+    if kind == "model":
+        # look the model up first: a previous replay may have created it already
+        for m in client._get("/models/"):
+            if m["name"] == payload["name"] and m["project_name"] == payload["project_name"]:
+                real = m["id"]
+                break
+        else:
+            real = client._post("/models/", payload)["id"]
+        spool.set_meta(f"id:{target}", real)
+    elif kind == "run":
+        # the payload carries a client-chosen id: the server returns the same run on a retry
+        real = client._post("/runs/", {**payload, "model_id": spool.resolve(payload["model_id"])})["id"]
+        spool.set_meta(f"id:{target}", real)
+    elif kind == "status":
+        client._patch("/runs/update_status", {**payload, "run_id": spool.resolve(target)})
+
+
+def replay(spool: Spool, client, batch_size: int = 500) -> int:
+    """
+    Send every spooled operation in order and return the number of points sent.
+
+    Consecutive points of the same kind and run go out as one batch request.
+    Raises on the first failure; what was acknowledged stays acknowledged.
+    Points refused with 409 (their run was compacted by server retention)
+    can never be stored and are dropped with a warning.
+    """
+    sent = 0
+    while True:
+        ops = spool.pending(batch_size)
+        if not ops:
+            return sent
+        op_id, kind, target, payload = ops[0]
+        if kind not in ("loss", "metric"):
+            _replay_op(spool, client, kind, target, payload)
+            spool.ack(op_id)
+            continue
+
+        group = []
+        for op in ops:
+            if op[1] != kind or op[2] != target:
+                break
+            group.append(op)
+        run_id = spool.resolve(target)
+        points = [{**p, "run_id": run_id} for _, _, _, p in group]
+        params = {"return": "count", "on_conflict": "update"}
+        try:
+            if kind == "loss":
+                client._post("/loss/batch", {"run_id": run_id, "losses": points}, params=params)
+            else:
+                client._post_metrics(run_id, points, params=params)
+            sent += len(group)
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code != 409:
+                raise
+            logger.warning(f"Dropped {len(group)} spooled {kind} points of run {run_id}: {e.response.text}")
+        spool.ack(group[-1][0])
+
+
+class SpoolReplayer:
+    """Replays a spool from a daemon thread, backing off while the server is unreachable."""
+
+    def __init__(self, client, spool: Spool, batch_size: int, interval: float, max_backoff: float = 60.0):
+        self.client = client
+        self.spool = spool
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self._unsent = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="traintrack-spool", daemon=True)
+        self._thread.start()
+
+    def wake_if(self, appended: int):
+        """Start a replay early once a full batch has been spooled."""
+        self._unsent += appended
+        if self._unsent >= self.batch_size:
+            self._wake.set()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the spool is empty. Returns False if the timeout expired first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self._wake.set()
+        while self.spool.count() > 0:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Stop the replay thread. Returns False if it was still running when the timeout expired."""
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def _run(self):
+        backoff = 0.0
+        while True:
+            self._wake.wait(backoff or self.interval)
+            self._wake.clear()
+            self._unsent = 0
+            try:
+                replay(self.spool, self.client, self.batch_size)
+                backoff = 0.0
+            except Exception as e:
+                backoff = min(self.max_backoff, max(1.0, backoff * 2))
+                logger.warning(f"Spool replay failed, retrying in {backoff:.0f}s: {e}")
+            if self._stop.is_set():
+                return
@@ -0,0 +1,100 @@
+import json
+import os
+import sys
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+# the client is imported as the ``client`` package from the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+class StubAPI:
+    """In-process stand-in for the TrainTrack API recording every request."""
+
+    def __init__(self):
+        self.requests = []   # (method, path, body)
+        self.runs = {}
+        self.metric_keys = {}
+        self.fail = {}       # path -> status code to answer instead
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def points(self, kind: str) -> list:
+        path = "/loss/batch" if kind == "loss" else "/metric/batch"
+        field = "losses" if kind == "loss" else "metrics"
+        single = "/loss/" if kind == "loss" else "/metric/"
+        out = []
+        for method, p, body in self.requests:
+            if p == path:
+                out.extend(body[field])
+            elif p == single:
+                out.append(body)
+        return out
+
+    def paths(self) -> list:
+        return [p for _, p, _ in self.requests]
+
+    def answer(self, method: str, path: str, body):
+        if path.startswith("/models/") and method == "GET":
+            return 200, []
+        if path == "/models/":
+            return 200, {"id": str(uuid.uuid4()), **body}
+        if path == "/runs/":
+            run_id = body.get("id") or str(uuid.uuid4())
+            self.runs.setdefault(run_id, body)
+            return 200, {"id": run_id, "model_id": body["model_id"], "status": "running"}
+        if path == "/metric/keys":
+            for name in body:
+                self.metric_keys.setdefault(name, len(self.metric_keys) + 1)
+            return 200, {n: self.metric_keys[n] for n in body}
+        if path in ("/loss/batch", "/metric/batch"):
+            field = "losses" if path == "/loss/batch" else "metrics"
+            return 200, {"inserted": len(body[field]), "updated": 0, "ignored": 0}
+        if path == "/runs/update_status":
+            return 200, {"rows_updated": 1}
+        return 200, body
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _serve(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                body = json.loads(raw) if raw else None
+                path = self.path.split("?")[0]
+                with api._lock:
+                    api.requests.append((self.command, path, body))
+                    status = api.fail.get(path)
+                    if status is None:
+                        status, payload = api.answer(self.command, path, body)
+                    else:
+                        payload = {"detail": "stub failure"}
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _serve
+
+        return Handler
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def api():
+    stub = StubAPI()
+    yield stub
+    stub.close()
@@ -0,0 +1,80 @@
+import threading
+from client.traintrack import TrainTrackClient
+
+
+def test_points_are_sent_in_batches_on_flush(api):
+    tt = TrainTrackClient(api.url, buffered=True, batch_size=3, flush_interval=60)
+    for step in range(7):
+        tt.log_loss(step, "train", 1.0 / (step + 1), run_id="run-1")
+    assert tt.flush(timeout=5)
+
+    sizes = [len(body["losses"]) for _, path, body in api.requests if path == "/loss/batch"]
+    assert sizes == [3, 3, 1]
+    assert [p["step"] for p in api.points("loss")] == list(range(7))
+    tt.close()
+
+
+def test_close_sends_what_is_still_queued(api):
+    tt = TrainTrackClient(api.url, buffered=True, batch_size=100, flush_interval=60)
+    tt.log_losses([{"step": s, "split": "train", "value": 0.5} for s in range(5)], run_id="run-1")
+    tt.log_metric(4, "validation", "accuracy", 0.9, run_id="run-1")
+    tt.close(timeout=5)
+
+    assert len(api.points("loss")) == 5
+    assert len(api.points("metric")) == 1
+
+
+def test_failed_batches_are_counted_not_raised(api):
+    api.fail["/loss/batch"] = 400
+    tt = TrainTrackClient(api.url, buffered=True, batch_size=2, flush_interval=60, retries=0)
+    for step in range(3):
+        tt.log_loss(step, "train", 0.5, run_id="run-1")
+    assert tt.flush(timeout=5)
+    assert tt.failed == 3
+    tt.close()
+
+
+def test_batches_failing_on_a_server_error_are_retried(api):
+    api.fail["/loss/batch"] = 500
+    tt = TrainTrackClient(api.url, buffered=True, batch_size=2, flush_interval=60,
+                          max_queue_size=3, retries=0)
+    for step in range(5):
+        tt.log_loss(step, "train", 0.5, run_id="run-1")
+    # still unsent: flush says so, and only what overflowed the buffer is lost
+    assert not tt.flush(timeout=5)
+    assert tt.failed == 2
+
+    del api.fail["/loss/batch"]
+    api.requests.clear()
+    assert tt.flush(timeout=5)
+    assert [p["step"] for p in api.points("loss")] == [2, 3, 4]
+    tt.close()
+
+
+def test_close_counts_points_it_could_not_send(api):
+    api.fail["/loss/batch"] = 503
+    tt = TrainTrackClient(api.url, buffered=True, batch_size=10, flush_interval=60, retries=0)
+    tt.log_losses([{"step": s, "split": "train", "value": 0.5} for s in range(4)], run_id="run-1")
+    tt.close(timeout=5)
+    assert tt.failed == 4
+
+
+def test_full_queue_drops_points(api):
+    tt = TrainTrackClient(api.url, buffered=True, batch_size=1, flush_interval=60,
+                          max_queue_size=2, on_full="drop")
+    release = threading.Event()
+    post = tt._post
+
+    def stuck_post(*args, **kwargs):
+        release.wait(5)
+        return post(*args, **kwargs)
+
+    tt._post = stuck_post
+    for step in range(10):
+        tt.log_loss(step, "train", 0.5, run_id="run-1")
+    release.set()
+    tt.close(timeout=5)
+
+    # one point was being sent, two were queued
+    assert tt.dropped >= 7
+    assert len(api.points("loss")) + tt.dropped == 10
@@ -0,0 +1,61 @@
+import threading
+from client.distributed import DistributedTrainTrackClient
+
+
+def _statuses(api):
+    return [body["new_status"] for _, path, body in api.requests if path == "/runs/update_status"]
+
+
+def test_single_rank_close_then_complete(api):
+    tt = DistributedTrainTrackClient(api.url, rank=0, world_size=1, port=0, max_wait=2)
+    tt.create_model("resnet", "vision")
+    tt.create_run()
+    tt.log_loss(step=0, split="train", value=0.5)
+    tt.log_metric(step=0, split="validation", metric_name="accuracy", value=0.9)
+
+    # the documented order: close on every rank, then complete on rank 0
+    tt.close()
+    tt.complete_run()
+
+    assert [p["value"] for p in api.points("loss")] == [0.5]
+    assert [p["value"] for p in api.points("metric")] == [0.9]
+    assert _statuses(api) == ["completed"]
+
+
+def test_two_ranks_are_reduced_before_completing(api):
+    main = DistributedTrainTrackClient(api.url, rank=0, world_size=2, port=0, max_wait=5)
+    main.create_model("resnet", "vision")
+    main.create_run()
+    port = main._aggregator.address[1]
+
+    def worker():
+        tt = DistributedTrainTrackClient(api.url, rank=1, world_size=2, port=port)
+        tt.log_loss(step=0, split="train", value=3.0)
+        tt.log_loss(step=1, split="train", value=5.0)
+        tt.close()
+        tt.complete_run()   # no-op off rank 0
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    main.log_loss(step=0, split="train", value=1.0)
+    main.log_loss(step=1, split="train", value=1.0)
+    thread.join()
+    main.close()
+    main.fail_run()
+
+    by_step = {p["step"]: p["value"] for p in api.points("loss")}
+    assert by_step == {0: 2.0, 1: 3.0}
+    assert _statuses(api) == ["failed"]
+    # the status update is the last request, after every point
+    assert api.paths()[-1] == "/runs/update_status"
+
+
+def test_complete_before_close_still_works(api):
+    tt = DistributedTrainTrackClient(api.url, rank=0, world_size=1, port=0, max_wait=2)
+    tt.create_model("resnet", "vision")
+    tt.create_run()
+    tt.log_loss(step=0, split="train", value=0.5)
+    tt.complete_run()
+    tt.close()
+    assert _statuses(api) == ["completed"]
+    assert [p["value"] for p in api.points("loss")] == [0.5]
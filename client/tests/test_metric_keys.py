@@ -0,0 +1,47 @@
+from client.traintrack import TrainTrackClient
+
+
+def key_requests(api) -> list:
+    return [body for _, path, body in api.requests if path == "/metric/keys"]
+
+
+def test_metric_names_are_sent_as_cached_keys(api):
+    tt = TrainTrackClient(api.url)
+    tt.log_metrics([{"step": 1, "split": "validation", "metric_name": "top5", "value": 0.9},
+                    {"step": 1, "split": "validation", "metric_name": "bleu", "value": 0.3}], run_id="run-1")
+    tt.log_metric(2, "validation", "top5", 0.95, run_id="run-1")
+    tt.close()
+
+    assert key_requests(api) == [["bleu", "top5"]]
+    assert [p["metric_key"] for p in api.points("metric")] == [api.metric_keys[n] for n in ("top5", "bleu", "top5")]
+    assert all("metric_name" not in p for p in api.points("metric"))
+
+
+def test_older_servers_get_metric_names(api):
+    api.fail["/metric/keys"] = 404
+    tt = TrainTrackClient(api.url)
+    tt.log_metric(1, "validation", "accuracy", 0.9, run_id="run-1")
+    tt.log_metric(2, "validation", "accuracy", 0.9, run_id="run-1")
+    tt.close()
+
+    assert len(key_requests(api)) == 1
+    assert [p["metric_name"] for p in api.points("metric")] == ["accuracy", "accuracy"]
+
+
+def test_stale_keys_are_fetched_again(api, monkeypatch):
+    tt = TrainTrackClient(api.url)
+    tt.log_metric(1, "validation", "accuracy", 0.9, run_id="run-1")
+    # the server lost its keys (e.g. a new database): the next batch is refused once
+    answer, refused = api.answer, []
+
+    def forgetful(method, path, body):
+        if path == "/metric/batch" and not refused:
+            refused.append(body)
+            return 422, {"detail": "Unknown metric_key"}
+        return answer(method, path, body)
+
+    monkeypatch.setattr(api, "answer", forgetful)
+    tt.log_metrics([{"step": 2, "split": "validation", "metric_name": "accuracy", "value": 0.9}], run_id="run-1")
+    tt.close()
+
+    assert refused and len(key_requests(api)) == 2
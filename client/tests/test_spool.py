@@ -0,0 +1,126 @@
+import socket
+import threading
+from client import cli
+from client.spool import Spool, replay
+from client.traintrack import TrainTrackClient
+
+
+def unused_url() -> str:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}"
+
+
+def offline_run(path: str):
+    """Spool a model, a run, its points and its completion without a server."""
+    tt = TrainTrackClient(unused_url(), spool=path, retries=0, spool_flush_timeout=0.1, flush_interval=60)
+    tt.create_model("resnet", "vision")
+    run_id = tt.create_run({"lr": 0.1})
+    tt.log_losses([{"step": s, "split": "train", "value": 1.0 / (s + 1)} for s in range(5)])
+    tt.log_metric(4, "validation", "top5", 0.9)
+    tt.complete_run()
+    tt.close(timeout=5)
+    return run_id
+
+
+def test_offline_run_is_replayed_in_order(api, tmp_path):
+    path = str(tmp_path / "run.spool")
+    local_id = offline_run(path)
+    assert local_id.startswith("local-")
+
+    assert cli.sync([path], url=api.url) == 0
+
+    (run_id, run), = api.runs.items()
+    assert run["hyperparameters"] == {"lr": 0.1}
+    assert [p["run_id"] for p in api.points("loss")] == [run_id] * 5
+    assert [p["metric_key"] for p in api.points("metric")] == [api.metric_keys["top5"]]
+    assert api.paths()[-1] == "/runs/update_status"
+    assert api.requests[-1][2] == {"new_status": "completed", "run_id": run_id}
+    assert Spool(path).count() == 0
+
+
+def test_run_replay_is_idempotent(api, tmp_path, monkeypatch):
+    path = str(tmp_path / "run.spool")
+    local_id = offline_run(path)
+    set_meta = Spool.set_meta
+
+    def dies_after_create(self, key, value):
+        if key == f"id:{local_id}":
+            raise RuntimeError("process killed")
+        set_meta(self, key, value)
+
+    # the server created the run, but its id never reached the spool
+    monkeypatch.setattr(Spool, "set_meta", dies_after_create)
+    assert cli.sync([path], url=api.url) == 1
+    monkeypatch.setattr(Spool, "set_meta", set_meta)
+    assert cli.sync([path], url=api.url) == 0
+
+    creations = [body for _, p, body in api.requests if p == "/runs/"]
+    assert len(creations) == 2 and creations[0]["id"] == creations[1]["id"]
+    assert list(api.runs) == [creations[0]["id"]]
+    assert {p["run_id"] for p in api.points("loss")} == {creations[0]["id"]}
+
+
+def test_sync_closes_its_client(api, tmp_path, monkeypatch):
+    closed = []
+
+    class Client(TrainTrackClient):
+        def close(self, timeout=None):
+            closed.append(self.base_url)
+            super().close(timeout)
+
+    monkeypatch.setattr(cli, "TrainTrackClient", Client)
+    path = str(tmp_path / "run.spool")
+    offline_run(path)
+    api.fail["/runs/"] = 500
+    assert cli.sync([path], url=api.url) == 1
+    del api.fail["/runs/"]
+    assert cli.sync([path], url=api.url) == 0
+    assert closed == [api.url, api.url]
+
+
+def test_points_of_a_compacted_run_are_dropped(api, tmp_path):
+    path = str(tmp_path / "run.spool")
+    offline_run(path)
+    api.fail["/loss/batch"] = 409
+
+    assert cli.sync([path], url=api.url) == 0
+
+    # the metric and the status change behind the refused losses still go out
+    assert api.paths()[-2:] == ["/metric/batch", "/runs/update_status"]
+    assert Spool(path).count() == 0
+
+
+def test_close_leaves_the_spool_to_a_replay_still_running(api, tmp_path, monkeypatch):
+    from client import spool as spool_module
+    started, release = threading.Event(), threading.Event()
+
+    def slow_replay(spool, client, batch_size=500):
+        started.set()
+        release.wait(5)
+        return replay(spool, client, batch_size)
+
+    monkeypatch.setattr(spool_module, "replay", slow_replay)
+    # the spool's directory is created on demand
+    path = str(tmp_path / "runs" / "exp1" / "run.spool")
+    tt = TrainTrackClient(api.url, spool=path, flush_interval=60)
+    tt.create_model("resnet", "vision")
+    tt.create_run()
+    tt.log_loss(0, "train", 1.0)
+    tt.flush(0)
+    assert started.wait(5)
+    replayer = tt._replayer._thread
+
+    tt.close(timeout=0.1)
+    release.set()
+    replayer.join(5)
+    # the replay finished on an open spool instead of failing on a closed one
+    assert not replayer.is_alive()
+    assert [p["value"] for p in api.points("loss")] == [1.0]
+    assert Spool(path).count() == 0
+
+
+def test_sync_reports_missing_spools(tmp_path, capsys):
+    assert cli.sync([str(tmp_path / "missing.spool")]) == 1
+    assert "no such spool" in capsys.readouterr().err
+    assert not (tmp_path / "missing.spool").exists()
@@ -2,7 +2,7 @@
 TrainTrack Client — Lightweight Python client for the TrainTrack API.
 
 Usage:
-    from traintrack import TrainTrackClient
+    from client.traintrack import TrainTrackClient
 
     tt = TrainTrackClient("http://localhost:8000")
 
@@ -24,39 +24,380 @@ Usage:
 
     # Mark run as completed
     tt.complete_run()
+
+Buffered mode:
+    # log_loss / log_metric return immediately, a background thread
+    # sends the points to /loss/batch and /metric/batch
+    tt = TrainTrackClient("http://localhost:8000", buffered=True)
+
+Async training loops:
+    tt = AsyncTrainTrackClient("http://localhost:8000")   # requires httpx
+    await tt.create_model("ResNet50", "Image Classification")
+    await tt.log_loss(step=0, split="train", value=0.7)
+
+Spool mode:
+    # every call is written to a local SQLite file first and replayed to the
+    # server in order; works offline, push leftovers with `traintrack sync`
+    tt = TrainTrackClient("http://localhost:8000", spool="runs/exp1/traintrack.spool")
 """
 
+import atexit
+import gzip
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Optional
-from client.enums import SplitEnum, StatusEnum, MetricEnum
+from urllib3.util.retry import Retry
+from client.enums import SplitEnum, StatusEnum
+from client.spool import Spool, SpoolReplayer, is_local
+
+logger = logging.getLogger("traintrack")
+
+_FLUSH = object()
+_STOP = object()
+
+
+def _encode_body(data: dict, gzip_min_bytes: Optional[int]) -> tuple[bytes, dict]:
+    """JSON-encode a request body, gzipping it when it is at least gzip_min_bytes long."""
+    body = json.dumps(data).encode()
+    headers = {"Content-Type": "application/json"}
+    if gzip_min_bytes is not None and len(body) >= gzip_min_bytes:
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
+
+
+def _is_transient(error: Exception) -> bool:
+    """Connection errors, timeouts and 5xx may succeed later; other HTTP errors never will."""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500
+    return isinstance(error, requests.RequestException)
+
+
+class _BackgroundSender:
+    """
+    Drains queued loss/metric points into the batch endpoints from a daemon
+    thread. Batches that fail on a transient error are kept and retried with
+    exponential backoff; while the server is down at most ``max_queue_size``
+    points are kept, the oldest are dropped (and counted in ``failed``) first.
+    """
+
+    def __init__(self, client: "TrainTrackClient", batch_size: int, flush_interval: float,
+                 max_queue_size: int, on_full: str, max_backoff: float = 60.0):
+        if on_full not in ("block", "drop"):
+            raise ValueError("on_full must be 'block' or 'drop'")
+        self.client = client
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_full = on_full
+        self.max_pending = max_queue_size
+        self.max_backoff = max_backoff
+        self.dropped = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._pending = {}   # (kind, run_id) -> list of points
+        self._pending_count = 0
+        self._backoff = 0.0
+        self._retry_at = 0.0
+        self._dropping = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="traintrack-sender", daemon=True)
+        self._thread.start()
+
+    def put(self, kind: str, run_id: str, point: dict):
+        if self._closed:
+            raise RuntimeError("TrainTrackClient has been closed")
+        item = (kind, run_id, point)
+        if self.on_full == "block":
+            self._queue.put(item)
+            return
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Send everything queued so far. Returns False if the timeout expired or points are left to retry."""
+        if not self._thread.is_alive():
+            return True
+        done, sent = threading.Event(), []
+        self._queue.put((_FLUSH, (done, sent), None))
+        return done.wait(timeout) and sent == [True]
+
+    def close(self, timeout: Optional[float] = None):
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            self._queue.put((_STOP, None, None))
+            self._thread.join(timeout)
+
+    def _run(self):
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                kind, run_id, point = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                self._send_pending()
+                deadline = time.monotonic() + self.flush_interval
+                continue
+
+            if kind is _FLUSH:
+                self._send_pending(force=True)
+                done, sent = run_id  # flush markers carry their Event in the run_id slot
+                sent.append(not self._pending)
+                done.set()
+                continue
+            if kind is _STOP:
+                self._send_pending(force=True)
+                if self._pending_count:
+                    self.failed += self._pending_count
+                    logger.error(f"Server unreachable at close, dropped {self._pending_count} unsent points")
+                return
+
+            self._pending.setdefault((kind, run_id), []).append(point)
+            self._pending_count += 1
+            if self._pending_count > self.max_pending:
+                self._drop_oldest(self._pending_count - self.max_pending)
+            if self._pending_count >= self.batch_size:
+                self._send_pending()
+                deadline = time.monotonic() + self.flush_interval
+
+    def _send_pending(self, force: bool = False):
+        """Send the pending points; ``force`` ignores the backoff of a previous failure."""
+        if not self._pending or (not force and time.monotonic() < self._retry_at):
+            return
+        pending, self._pending, self._pending_count = self._pending, {}, 0
+        error = None
+        for (kind, run_id), points in pending.items():
+            for i in range(0, len(points), self.batch_size):
+                chunk = points[i:i + self.batch_size]
+                if error is not None:
+                    # the server is failing: keep the rest for the retry instead of hammering it
+                    self._keep(kind, run_id, chunk)
+                    continue
+                try:
+                    if kind == "loss":
+                        self.client._post("/loss/batch", {"run_id": run_id, "losses": chunk},
+                                          params={"return": "count"})
+                    else:
+                        self.client._post_metrics(run_id, chunk, params={"return": "count"})
+                except Exception as e:
+                    if not _is_transient(e):
+                        self.failed += len(chunk)
+                        logger.warning(f"Server refused {len(chunk)} {kind} points for run {run_id}: {e}")
+                        continue
+                    error = e
+                    self._keep(kind, run_id, chunk)
+
+        if error is None:
+            self._backoff = 0.0
+            self._dropping = False
+            return
+        self._backoff = min(self.max_backoff, max(1.0, self._backoff * 2))
+        self._retry_at = time.monotonic() + self._backoff
+        logger.warning(f"Failed to send {self._pending_count} points, retrying in {self._backoff:.0f}s: {error}")
+
+    def _keep(self, kind: str, run_id: str, points: list[dict]):
+        self._pending.setdefault((kind, run_id), []).extend(points)
+        self._pending_count += len(points)
+
+    def _drop_oldest(self, count: int):
+        self.failed += count
+        if not self._dropping:
+            self._dropping = True
+            logger.warning(f"Server unreachable and {self.max_pending} points waiting: dropping the oldest")
+        for key in list(self._pending):
+            points = self._pending[key]
+            n = min(count, len(points))
+            del points[:n]
+            self._pending_count -= n
+            count -= n
+            if not points:
+                del self._pending[key]
+            if not count:
+                return
 
-class TrainTrackClient:
-    """Simple client for the TrainTrack experiment tracking API."""
 
-    def __init__(self, base_url: str = "http://localhost:8000"):
+class TrainTrackClient:
+    """Simple client for the TrainTrack experiment tracking API.
+
+    With ``buffered=True`` the log_* methods enqueue points and return at once;
+    a background thread sends them in batches of up to ``batch_size`` points or
+    every ``flush_interval`` seconds. When the queue holds ``max_queue_size``
+    points, ``on_full="block"`` waits for room and ``on_full="drop"`` discards
+    the point (counted in ``dropped``).
+
+    With ``spool="path/to/file"`` every call is appended to a local SQLite
+    spool and replayed to the batch endpoints by a background thread, with
+    exponential backoff while the server is unreachable. If the server is
+    down when create_model/create_run is called, a placeholder ID is returned
+    and the creation is replayed later. ``spool`` and ``buffered`` are
+    mutually exclusive.
+
+    Requests go through a pooled keep-alive session. ``timeout`` applies to
+    every call, ``retries`` retries failed connections (and 502/503/504 on
+    GET/DELETE), and bodies of at least ``gzip_min_bytes`` bytes are sent
+    gzip-compressed. Metric points are sent with the server's integer key of
+    their name, fetched once per name and cached.
+    """
+
+    def __init__(self, base_url: str = "http://localhost:8000", buffered: bool = False,
+                 batch_size: int = 500, flush_interval: float = 2.0,
+                 max_queue_size: int = 10000, on_full: str = "block",
+                 spool: Optional[str] = None, spool_flush_timeout: float = 30.0,
+                 timeout: float = 30.0, retries: int = 3, gzip_min_bytes: Optional[int] = None,
+                 pool_maxsize: int = 10):
+        if buffered and spool:
+            raise ValueError("buffered and spool cannot be used together")
         self.base_url = base_url
         self.model_id = None
         self.run_id = None
-
-    def _post(self, path: str, data: dict):
-        r = requests.post(f"{self.base_url}{path}", json=data)
+        self.spool_flush_timeout = spool_flush_timeout
+        self.timeout = timeout
+        self.gzip_min_bytes = gzip_min_bytes
+        retry = Retry(total=retries, connect=retries, status=retries,
+                      backoff_factor=0.5, status_forcelist=(502, 503, 504), raise_on_status=False)
+        self._session = requests.Session()
+        self._session.mount("http://", HTTPAdapter(pool_maxsize=pool_maxsize, max_retries=retry))
+        self._session.mount("https://", HTTPAdapter(pool_maxsize=pool_maxsize, max_retries=retry))
+        self._sender = None
+        self._spool = None
+        self._replayer = None
+        self._metric_keys = {}   # metric name -> server key; None if the server has no /metric/keys
+        # the sender or replay thread and the caller's thread both send metrics
+        self._metric_keys_lock = threading.Lock()
+        if spool:
+            self._spool = Spool(spool, base_url)
+            self._replayer = SpoolReplayer(self, self._spool, batch_size, flush_interval)
+            atexit.register(self.close)
+        if buffered:
+            self._sender = _BackgroundSender(self, batch_size, flush_interval, max_queue_size, on_full)
+            atexit.register(self.close)
+
+    @property
+    def dropped(self) -> int:
+        """Number of points discarded because the buffer was full."""
+        return self._sender.dropped if self._sender else 0
+
+    @property
+    def failed(self) -> int:
+        """Number of buffered points that could not be delivered (refused, or lost while the server was down)."""
+        return self._sender.failed if self._sender else 0
+
+    @property
+    def pending(self) -> int:
+        """Number of spooled operations not yet acknowledged by the server."""
+        return self._spool.count() if self._spool else 0
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every buffered or spooled point has been sent. No-op otherwise."""
+        if self._replayer is not None:
+            return self._replayer.flush(timeout)
+        if self._sender is None:
+            return True
+        return self._sender.flush(timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """Flush pending points, stop the background sender and release connections."""
+        if self._sender is not None:
+            self._sender.close(timeout)
+        atexit.unregister(self.close)
+        if self._replayer is not None:
+            replayer, self._replayer = self._replayer, None
+            if not replayer.close(timeout):
+                # the daemon thread is still replaying: the spool and the session stay open for it
+                logger.warning(f"Spool replay still running at close, "
+                               f"{self.pending} operations left in {self._spool.path}")
+                return
+            self._spool.close()
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _request(self, method: str, path: str, data: dict = None, params: dict = None):
+        kwargs = {"params": params, "timeout": self.timeout}
+        if data is not None:
+            kwargs["data"], kwargs["headers"] = _encode_body(data, self.gzip_min_bytes)
+        r = self._session.request(method, f"{self.base_url}{path}", **kwargs)
         r.raise_for_status()
-        return r.json()
+        return r.json() if r.content else None
+
+    def _post(self, path: str, data: dict, params: dict = None):
+        return self._request("POST", path, data, params)
 
     def _get(self, path: str, params: dict = None):
-        r = requests.get(f"{self.base_url}{path}", params=params)
-        r.raise_for_status()
-        return r.json()
+        return self._request("GET", path, params=params)
 
     def _patch(self, path: str, data: dict):
-        r = requests.patch(f"{self.base_url}{path}", json=data)
-        r.raise_for_status()
-        return r.json()
+        return self._request("PATCH", path, data)
 
     def _delete(self, path: str):
-        r = requests.delete(f"{self.base_url}{path}")
-        r.raise_for_status()
-        return r.json()
+        return self._request("DELETE", path)
+
+    # ── Metric keys ─────────────────────────────────
+
+    def _with_metric_keys(self, points: list[dict]) -> list[dict]:
+        """Replace metric names with their cached keys, fetching the keys of new names first."""
+        with self._metric_keys_lock:
+            if self._metric_keys is None:
+                return points
+            names = [getattr(p["metric_name"], "value", p["metric_name"]) for p in points]
+            new = set(names) - self._metric_keys.keys()
+            if new:
+                try:
+                    self._metric_keys.update(self._post("/metric/keys", sorted(new)))
+                except requests.HTTPError as e:
+                    if e.response is None or e.response.status_code not in (404, 405):
+                        raise
+                    # older servers only take names
+                    self._metric_keys = None
+                    return points
+            keys = self._metric_keys
+        return [{**{k: v for k, v in p.items() if k != "metric_name"}, "metric_key": keys[n]}
+                for p, n in zip(points, names)]
+
+    def _post_metrics(self, run_id: str, points: list[dict], params: dict = None, single: bool = False):
+        """POST metric points to /metric/ (``single``) or /metric/batch with keys instead of names."""
+        for attempt in range(2):
+            keyed = self._with_metric_keys(points)
+            body = keyed[0] if single else {"run_id": run_id, "metrics": keyed}
+            try:
+                return self._post("/metric/" if single else "/metric/batch", body, params)
+            except requests.HTTPError as e:
+                # cached keys unknown to the server (e.g. a new database): fetch them again once
+                if attempt or keyed is points or e.response is None or e.response.status_code != 422:
+                    raise
+                with self._metric_keys_lock:
+                    self._metric_keys = {}
+
+    # ── Spool ───────────────────────────────────────
+
+    def _spool_create(self, kind: str, payload: dict) -> dict:
+        local_id = self._spool.new_local_id()
+        self._spool.append(kind, local_id, payload)
+        logger.warning(f"Server unreachable, {kind} spooled as {local_id}")
+        return {"id": local_id}
+
+    def _post_or_spool(self, kind: str, path: str, payload: dict) -> dict:
+        try:
+            return self._post(path, payload)
+        except (requests.ConnectionError, requests.Timeout):
+            return self._spool_create(kind, payload)
+
+    def _spool_points(self, kind: str, run_id: str, points: list[dict]):
+        self._spool.append_many(kind, run_id, points)
+        self._replayer.wake_if(len(points))
+        return None
 
     # ── Models ──────────────────────────────────────
 
@@ -66,7 +407,10 @@ class TrainTrackClient:
             "name": name,
             "project_name": project_name
         }
-        response = self._post("/models/", payload)
+        if self._spool is None:
+            response = self._post("/models/", payload)
+        else:
+            response = self._post_or_spool("model", "/models/", payload)
         self.model_id = response.get("id", None)
         return self.model_id
 
@@ -75,14 +419,49 @@ class TrainTrackClient:
         return self._get("/models/")
 
     def delete_model(self, model_id: str = None):
-        """Delete a model by ID. Uses stored model_id if not provided."""
+        """
+        Delete a model by ID. Uses stored model_id if not provided.
+        Deletion runs in the background: returns the job, see get_job().
+        """
         mid = model_id or self.model_id
         return self._delete(f"/models/{mid}")
 
     def delete_project(self, project_name: str):
-        """Delete all models in a project."""
+        """Delete all models in a project. Returns the background deletion job."""
         return self._delete(f"/models/project/{project_name}")
 
+    def get_job(self, job_id: str):
+        """Get the status of a background deletion job."""
+        return self._get(f"/jobs/{job_id}")
+
+    # ── Export / Import ─────────────────────────────
+
+    def export_runs(self, path: str, project: str = None, model_id: str = None,
+                    run_id: str = None, format: str = "parquet"):
+        """
+        Download runs as a Parquet or Arrow IPC file. project, model_id and
+        run_id accept comma-separated lists.
+        """
+        params = {"format": format}
+        for key, value in (("project", project), ("model_id", model_id), ("run_id", run_id)):
+            if value:
+                params[key] = value
+        with self._session.get(f"{self.base_url}/export", params=params,
+                               timeout=self.timeout, stream=True) as r:
+            r.raise_for_status()
+            with open(path, "wb") as f:
+                for chunk in r.iter_content(chunk_size=1 << 20):
+                    f.write(chunk)
+        return path
+
+    def import_runs(self, path: str, format: str = "parquet", skip_existing: bool = True):
+        """Upload a file produced by export_runs(). Returns the import counts."""
+        with open(path, "rb") as f:
+            r = self._session.post(f"{self.base_url}/import", data=f, timeout=self.timeout,
+                                   params={"format": format, "skip_existing": str(skip_existing).lower()})
+        r.raise_for_status()
+        return r.json()
+
     # ── Runs ────────────────────────────────────────
 
     def create_run(self, hyperparameters: Optional[dict] = None, model_id: str = None):
@@ -90,10 +469,16 @@ class TrainTrackClient:
         mid = model_id or self.model_id
         if not mid:
             raise ValueError("No model_id available. Call create_model() first or pass model_id.")
-        payload = {"model_id": str(mid)}
+        # the id is chosen here so a retried or replayed creation is a no-op
+        payload = {"id": str(uuid.uuid4()), "model_id": str(mid)}
         if hyperparameters:
             payload["hyperparameters"] = hyperparameters
-        response = self._post("/runs/", payload)
+        if self._spool is None:
+            response = self._post("/runs/", payload)
+        elif is_local(payload["model_id"]):
+            response = self._spool_create("run", payload)
+        else:
+            response = self._post_or_spool("run", "/runs/", payload)
         self.run_id = response.get("id", None)
         return self.run_id
 
@@ -102,22 +487,39 @@ class TrainTrackClient:
         mid = model_id or self.model_id
         return self._get(f"/runs/runbymodels/{mid}")
 
+    def search_runs(self, hp: Optional[list[str]] = None, cursor: str = None, **filters):
+        """
+        Search runs, one page at a time. hp: filters like "lr:lt:0.001";
+        other keyword arguments (status, sort, order, limit, ...) are passed
+        as query parameters. Returns {"items": [...], "next_cursor": ...}.
+        """
+        params = {**filters, "hp": hp or []}
+        if cursor:
+            params["cursor"] = cursor
+        return self._get("/runs/search", params)
+
     def complete_run(self, run_id: str = None):
         """Mark the current run as completed."""
         rid = run_id or self.run_id
-        return self._patch("/runs/update_status", {
-            "run_id": str(rid), "new_status": "completed"
-        })
+        return self._set_status(str(rid), "completed")
 
     def fail_run(self, run_id: str = None):
         """Mark the current run as failed."""
         rid = run_id or self.run_id
-        return self._patch("/runs/update_status", {
-            "run_id": str(rid), "new_status": "failed"
-        })
+        return self._set_status(str(rid), "failed")
+
+    def _set_status(self, run_id: str, status: str):
+        if self._spool is not None:
+            # queued behind the run's points so it can't overtake them
+            self._spool.append("status", run_id, {"new_status": status})
+            if not self.flush(self.spool_flush_timeout):
+                logger.warning(f"Server unreachable, {self.pending} operations left in {self._spool.path}")
+            return None
+        self.flush()
+        return self._patch("/runs/update_status", {"run_id": run_id, "new_status": status})
 
     def delete_run(self, run_id: str = None):
-        """Delete a run."""
+        """Delete a run. Returns the background deletion job."""
         rid = run_id or self.run_id
         return self._delete(f"/runs/{rid}")
 
@@ -126,9 +528,12 @@ class TrainTrackClient:
     def log_loss(self, step: int, split: SplitEnum, value: float, run_id: str = None):
         """Log a single loss value. split: 'train' or 'validation'."""
         rid = run_id or self.run_id
-        return self._post("/loss/", {
-            "run_id": str(rid), "step": step, "split": split, "value": value
-        })
+        point = {"run_id": str(rid), "step": step, "split": split, "value": value}
+        if self._spool is not None:
+            return self._spool_points("loss", str(rid), [point])
+        if self._sender is not None:
+            return self._sender.put("loss", str(rid), point)
+        return self._post("/loss/", point)
 
     def log_losses(self, losses: list[dict], run_id: str = None):
         """
@@ -137,6 +542,12 @@ class TrainTrackClient:
         """
         rid = run_id or self.run_id
         batch = [{"run_id": str(rid), **l} for l in losses]
+        if self._spool is not None:
+            return self._spool_points("loss", str(rid), batch)
+        if self._sender is not None:
+            for point in batch:
+                self._sender.put("loss", str(rid), point)
+            return None
         return self._post("/loss/batch", {"run_id": str(rid), "losses": batch})
 
     def get_losses(self, split: Optional[SplitEnum] = None, run_id: str = None):
@@ -149,18 +560,20 @@ class TrainTrackClient:
 
     # ── Metrics ─────────────────────────────────────
 
-    def log_metric(self, step: int, split: SplitEnum, metric_name: MetricEnum,
+    def log_metric(self, step: int, split: SplitEnum, metric_name: str,
                    value: float, run_id: str = None):
         """
-        Log a single metric value.
-        metric_name: 'accuracy', 'f1-score', 'recall', 'precision',
-                     'balanced accuracy', 'mse', 'mae'
+        Log a single metric value. metric_name is any name ('accuracy',
+        'top5', 'bleu', ...); new names are registered by the server.
         """
         rid = run_id or self.run_id
-        return self._post("/metric/", {
-            "run_id": str(rid), "step": step, "split": split,
-            "metric_name": metric_name, "value": value
-        })
+        point = {"run_id": str(rid), "step": step, "split": split,
+                 "metric_name": metric_name, "value": value}
+        if self._spool is not None:
+            return self._spool_points("metric", str(rid), [point])
+        if self._sender is not None:
+            return self._sender.put("metric", str(rid), point)
+        return self._post_metrics(str(rid), [point], single=True)
 
     def log_metrics(self, metrics: list[dict], run_id: str = None):
         """
@@ -169,10 +582,16 @@ class TrainTrackClient:
         """
         rid = run_id or self.run_id
         batch = [{"run_id": str(rid), **m} for m in metrics]
-        return self._post("/metric/batch", {"run_id": str(rid), "metrics": batch})
+        if self._spool is not None:
+            return self._spool_points("metric", str(rid), batch)
+        if self._sender is not None:
+            for point in batch:
+                self._sender.put("metric", str(rid), point)
+            return None
+        return self._post_metrics(str(rid), batch)
 
     def get_metrics(self, split: Optional[SplitEnum] = None,
-                    metric_name: Optional[MetricEnum] = None, run_id: str = None):
+                    metric_name: Optional[str] = None, run_id: str = None):
         """Get metric values for the current run."""
         rid = run_id or self.run_id
         params = {"run_id": str(rid)}
@@ -181,3 +600,187 @@ class TrainTrackClient:
         if metric_name:
             params["metric_name"] = metric_name
         return self._get("/metric/", params)
+
+
+class AsyncTrainTrackClient:
+    """asyncio variant of TrainTrackClient with the same methods, as coroutines.
+
+    Uses one pooled ``httpx.AsyncClient`` (``pip install httpx``; pass
+    ``http2=True`` with ``httpx[http2]`` installed to speak HTTP/2). There is
+    no buffered or spool mode: schedule log calls as tasks if they must not
+    block the loop.
+    """
+
+    def __init__(self, base_url: str = "http://localhost:8000", timeout: float = 30.0,
+                 retries: int = 3, gzip_min_bytes: Optional[int] = None,
+                 max_connections: int = 10, http2: bool = False):
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError("AsyncTrainTrackClient requires httpx: pip install httpx") from e
+        self.base_url = base_url
+        self.model_id = None
+        self.run_id = None
+        self.gzip_min_bytes = gzip_min_bytes
+        self._metric_keys = {}   # metric name -> server key; None if the server has no /metric/keys
+        self._client = httpx.AsyncClient(
+            base_url=base_url, timeout=timeout, http2=http2,
+            limits=httpx.Limits(max_connections=max_connections),
+            transport=httpx.AsyncHTTPTransport(retries=retries, http2=http2),
+        )
+
+    async def close(self):
+        """Release pooled connections."""
+        await self._client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _request(self, method: str, path: str, data: dict = None, params: dict = None):
+        kwargs = {"params": params}
+        if data is not None:
+            kwargs["content"], kwargs["headers"] = _encode_body(data, self.gzip_min_bytes)
+        r = await self._client.request(method, path, **kwargs)
+        r.raise_for_status()
+        return r.json() if r.content else None
+
+    async def _with_metric_keys(self, points: list[dict]) -> list[dict]:
+        """Replace metric names with their cached keys, like TrainTrackClient."""
+        import httpx
+        if self._metric_keys is None:
+            return points
+        names = [getattr(p["metric_name"], "value", p["metric_name"]) for p in points]
+        new = set(names) - self._metric_keys.keys()
+        if new:
+            try:
+                self._metric_keys.update(await self._request("POST", "/metric/keys", sorted(new)))
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code not in (404, 405):
+                    raise
+                self._metric_keys = None
+                return points
+        return [{**{k: v for k, v in p.items() if k != "metric_name"}, "metric_key": self._metric_keys[n]}
+                for p, n in zip(points, names)]
+
+    async def _post_metrics(self, run_id: str, points: list[dict], single: bool = False):
+        import httpx
+        for attempt in range(2):
+            keyed = await self._with_metric_keys(points)
+            body = keyed[0] if single else {"run_id": run_id, "metrics": keyed}
+            try:
+                return await self._request("POST", "/metric/" if single else "/metric/batch", body)
+            except httpx.HTTPStatusError as e:
+                if attempt or keyed is points or e.response.status_code != 422:
+                    raise
+                self._metric_keys = {}
+
+    # ── Models ──────────────────────────────────────
+
+    async def create_model(self, name: str, project_name: str):
+        """Register a new model. Stores model_id internally."""
+        response = await self._request("POST", "/models/", {"name": name, "project_name": project_name})
+        self.model_id = response.get("id", None)
+        return self.model_id
+
+    async def get_models(self):
+        """List all registered models."""
+        return await self._request("GET", "/models/")
+
+    async def delete_model(self, model_id: str = None):
+        """Delete a model by ID. Returns the background deletion job."""
+        return await self._request("DELETE", f"/models/{model_id or self.model_id}")
+
+    async def delete_project(self, project_name: str):
+        """Delete all models in a project. Returns the background deletion job."""
+        return await self._request("DELETE", f"/models/project/{project_name}")
+
+    async def get_job(self, job_id: str):
+        """Get the status of a background deletion job."""
+        return await self._request("GET", f"/jobs/{job_id}")
+
+    # ── Runs ────────────────────────────────────────
+
+    async def create_run(self, hyperparameters: Optional[dict] = None, model_id: str = None):
+        """Start a new training run. Stores run_id internally."""
+        mid = model_id or self.model_id
+        if not mid:
+            raise ValueError("No model_id available. Call create_model() first or pass model_id.")
+        # the id is chosen here so a retried or replayed creation is a no-op
+        payload = {"id": str(uuid.uuid4()), "model_id": str(mid)}
+        if hyperparameters:
+            payload["hyperparameters"] = hyperparameters
+        response = await self._request("POST", "/runs/", payload)
+        self.run_id = response.get("id", None)
+        return self.run_id
+
+    async def get_runs(self, model_id: str = None):
+        """Get all runs for the current model."""
+        return await self._request("GET", f"/runs/runbymodels/{model_id or self.model_id}")
+
+    async def complete_run(self, run_id: str = None):
+        """Mark the current run as completed."""
+        return await self._request("PATCH", "/runs/update_status", {
+            "run_id": str(run_id or self.run_id), "new_status": "completed"
+        })
+
+    async def fail_run(self, run_id: str = None):
+        """Mark the current run as failed."""
+        return await self._request("PATCH", "/runs/update_status", {
+            "run_id": str(run_id or self.run_id), "new_status": "failed"
+        })
+
+    async def delete_run(self, run_id: str = None):
+        """Delete a run. Returns the background deletion job."""
+        return await self._request("DELETE", f"/runs/{run_id or self.run_id}")
+
+    # ── Loss ────────────────────────────────────────
+
+    async def log_loss(self, step: int, split: SplitEnum, value: float, run_id: str = None):
+        """Log a single loss value. split: 'train' or 'validation'."""
+        rid = run_id or self.run_id
+        return await self._request("POST", "/loss/", {
+            "run_id": str(rid), "step": step, "split": split, "value": value
+        })
+
+    async def log_losses(self, losses: list[dict], run_id: str = None):
+        """Log multiple loss values at once."""
+        rid = run_id or self.run_id
+        batch = [{"run_id": str(rid), **l} for l in losses]
+        return await self._request("POST", "/loss/batch", {"run_id": str(rid), "losses": batch})
+
+    async def get_losses(self, split: Optional[SplitEnum] = None, run_id: str = None):
+        """Get loss values for the current run."""
+        params = {"run_id": str(run_id or self.run_id)}
+        if split:
+            params["split"] = split
+        return await self._request("GET", "/loss/", params=params)
+
+    # ── Metrics ─────────────────────────────────────
+
+    async def log_metric(self, step: int, split: SplitEnum, metric_name: str,
+                         value: float, run_id: str = None):
+        """Log a single metric value."""
+        rid = run_id or self.run_id
+        return await self._post_metrics(str(rid), [{
+            "run_id": str(rid), "step": step, "split": split,
+            "metric_name": metric_name, "value": value
+        }], single=True)
+
+    async def log_metrics(self, metrics: list[dict], run_id: str = None):
+        """Log multiple metric values at once."""
+        rid = run_id or self.run_id
+        batch = [{"run_id": str(rid), **m} for m in metrics]
+        return await self._post_metrics(str(rid), batch)
+
+    async def get_metrics(self, split: Optional[SplitEnum] = None,
+                          metric_name: Optional[str] = None, run_id: str = None):
+        """Get metric values for the current run."""
+        params = {"run_id": str(run_id or self.run_id)}
+        if split:
+            params["split"] = split
+        if metric_name:
+            params["metric_name"] = metric_name
+        return await self._request("GET", "/metric/", params=params)
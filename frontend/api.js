@@ -13,6 +13,13 @@ const api = {
     return res.json();
   },
 
+  /** Every model with run counts per status and its latest run, in one request. */
+  async getModelsOverview() {
+    const res = await fetch(`${API_BASE}/models/overview`);
+    if (!res.ok) throw new Error(`Failed to fetch models overview: ${res.status}`);
+    return res.json();
+  },
+
   // ── Runs ────────────────────────────────
   async getRunsByModel(modelId) {
     const res = await fetch(`${API_BASE}/runs/runbymodels/${modelId}`);
@@ -49,8 +56,167 @@ const api = {
     if (!res.ok) throw new Error(`Failed to fetch metrics: ${res.status}`);
     return res.json();
   },
+
+  // ── Incremental series ──────────────────
+  /**
+   * Fetch loss ('loss') or metric ('metric') points written after a timestamp.
+   * maxPoints asks the server for a min/max/last downsample of each series.
+   * Returns { data, etag } or { notModified: true } when the server answers 304.
+   */
+  async getSeriesSince(kind, runId, afterTimestamp = null, etag = null, maxPoints = null) {
+    let url = `${API_BASE}/${kind}/?run_id=${runId}&format=columnar`;
+    if (afterTimestamp) url += `&after_timestamp=${encodeURIComponent(afterTimestamp)}`;
+    if (maxPoints) url += `&max_points=${maxPoints}`;
+    const headers = etag ? { 'If-None-Match': etag } : {};
+    const res = await fetch(url, { headers });
+    if (res.status === 304) return { notModified: true };
+    if (!res.ok) throw new Error(`Failed to fetch ${kind}: ${res.status}`);
+    return { data: expandColumnar(await res.json()), etag: res.headers.get('ETag') };
+  },
+
+  /**
+   * Statuses and columnar loss/metric series of many runs in one request.
+   * options: { split, metric_name, min_step, max_step, after_timestamp, max_points }
+   */
+  async getRunsSeries(runIds, options = {}) {
+    const res = await fetch(`${API_BASE}/runs/series`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ run_ids: runIds, ...options }),
+    });
+    if (!res.ok) throw new Error(`Failed to fetch runs series: ${res.status}`);
+    return res.json();
+  },
+
+  /**
+   * Per-step mean/std/min/max/quantile band of one series across runs, computed on the server.
+   * query: { run_ids | model_id | project_name | hyperparameters, split, metric_name,
+   *          quantiles, align: 'exact' | 'interpolate', max_points, min_step, max_step }
+   */
+  async aggregateRuns(query) {
+    const res = await fetch(`${API_BASE}/runs/aggregate`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(query),
+    });
+    if (!res.ok) throw new Error(`Failed to aggregate runs: ${res.status}`);
+    return res.json();
+  },
+
+  // ── Live stream ─────────────────────────
+  /**
+   * Subscribe to new points and status changes of one or more runs (Server-Sent Events).
+   * handlers: { onPoints(kind, runId, points), onStatus(runId, status), onResync(), onFallback() }
+   * onResync fires after a reconnect or when the server dropped events; onFallback
+   * fires when the stream is unavailable and the caller should poll instead.
+   * Returns the EventSource, or null if the browser does not support it.
+   */
+  streamRuns(runIds, handlers) {
+    if (!window.EventSource) return null;
+    const source = new EventSource(`${API_BASE}/runs/${runIds.join(',')}/stream`);
+    let opened = false;
+
+    source.addEventListener('open', () => {
+      if (opened) handlers.onResync();
+      opened = true;
+    });
+    ['loss', 'metric'].forEach(kind => {
+      source.addEventListener(kind, (e) => {
+        const event = JSON.parse(e.data);
+        handlers.onPoints(kind, event.run_id, event.points);
+      });
+    });
+    source.addEventListener('status', (e) => {
+      const event = JSON.parse(e.data);
+      handlers.onStatus(event.run_id, event.status);
+    });
+    source.addEventListener('resync', () => handlers.onResync());
+    source.addEventListener('error', () => {
+      if (source.readyState === EventSource.CLOSED) handlers.onFallback();
+    });
+    return source;
+  },
 };
 
+// ── Columnar Series ─────────────────────────
+
+/**
+ * Turn a columnar series response ({ run_id, series: [{ split, metric_name?,
+ * steps, values, timestamps }] }) back into point objects. Plain arrays from
+ * servers without columnar support are returned unchanged.
+ */
+function expandColumnar(body) {
+  if (Array.isArray(body)) return body;
+  const points = [];
+  body.series.forEach(s => {
+    s.steps.forEach((step, i) => {
+      points.push({
+        run_id: body.run_id,
+        split: s.split,
+        metric_name: s.metric_name,
+        step,
+        value: s.values[i],
+        timestamp: s.timestamps[i] === null ? null : new Date(s.timestamps[i]).toISOString(),
+      });
+    });
+  });
+  return points;
+}
+
+// ── Series Tracker ──────────────────────────
+
+/**
+ * Keeps a local copy of a run's loss or metric series and polls only for
+ * points newer than the last one seen. The cursor is moved back by
+ * OVERLAP_MS to tolerate transactions committing out of order; duplicates
+ * are merged by (split, metric_name, step). The first load is downsampled
+ * to maxPoints per series; later deltas arrive at full resolution.
+ */
+class SeriesTracker {
+  static OVERLAP_MS = 5000;
+
+  constructor(kind, runId, maxPoints = 2000) {
+    this.kind = kind;
+    this.runId = runId;
+    this.maxPoints = maxPoints;
+    this.points = new Map();
+    this.lastTimestamp = null;
+    this.etag = null;
+  }
+
+  get data() {
+    return [...this.points.values()];
+  }
+
+  /** Fetch new points. Resolves to true if the series changed. */
+  async poll() {
+    let cursor = null;
+    if (this.lastTimestamp !== null) {
+      cursor = new Date(this.lastTimestamp - SeriesTracker.OVERLAP_MS).toISOString();
+    }
+    const maxPoints = cursor === null ? this.maxPoints : null;
+    const res = await api.getSeriesSince(this.kind, this.runId, cursor, this.etag, maxPoints);
+    if (res.notModified) return false;
+    this.etag = res.etag;
+    return this.merge(res.data);
+  }
+
+  merge(points) {
+    let changed = false;
+    points.forEach(p => {
+      const key = `${p.split}|${p.metric_name || ''}|${p.step}`;
+      const prev = this.points.get(key);
+      if (!prev || prev.value !== p.value) {
+        this.points.set(key, p);
+        changed = true;
+      }
+      const ts = Date.parse(p.timestamp);
+      if (!isNaN(ts) && (this.lastTimestamp === null || ts > this.lastTimestamp)) this.lastTimestamp = ts;
+    });
+    return changed;
+  }
+}
+
 // ── Utility Functions ───────────────────────
 
 function getQueryParam(name) {
@@ -0,0 +1,96 @@
+# app/aggregate.py
+# Aggregazione per step di una serie su più run (bande media/std tra seed)
+
+from typing import Literal, Optional
+from sqlalchemy import select, func, case, cast, literal, literal_column, any_, union_all, null, and_, Float
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from sqlalchemy.orm import aliased
+
+AlignMode = Literal["exact", "interpolate"]
+
+
+def _interpolated(pts, max_points: Optional[int]):
+    """
+    Every run's value at every step of a shared grid, linearly interpolated
+    between its neighbouring points. The grid is the union of the logged
+    steps, or ``max_points`` evenly spaced steps; runs are never
+    extrapolated beyond their first and last step.
+    """
+    bounds = (select(pts.c.run_id, func.min(pts.c.step).label("lo"), func.max(pts.c.step).label("hi"))
+              .group_by(pts.c.run_id).cte("bounds"))
+    if max_points:
+        lo = select(func.min(pts.c.step)).scalar_subquery()
+        hi = select(func.max(pts.c.step)).scalar_subquery()
+        stride = func.greatest(1, func.ceil(cast(hi - lo, Float) / literal(float(max(1, max_points - 1)), Float)))
+        grid = select(func.generate_series(lo, hi, cast(stride, pts.c.step.type)).label("step")).cte("grid")
+    else:
+        grid = select(pts.c.step).distinct().cte("grid")
+
+    # grid rows (ord 1) sort after a point at the same step, so they see it as both neighbours
+    both = union_all(
+        select(pts.c.run_id, pts.c.step, literal_column("0").label("ord")),
+        select(bounds.c.run_id, grid.c.step, literal_column("1").label("ord"))
+        .join(grid, grid.c.step.between(bounds.c.lo, bounds.c.hi)),
+    ).subquery("both")
+    point_step = case((both.c.ord == 0, both.c.step))
+    neighbours = select(
+        both.c.run_id, both.c.step, both.c.ord,
+        func.max(point_step).over(partition_by=both.c.run_id, order_by=[both.c.step, both.c.ord],
+                                  rows=(None, 0)).label("prev_step"),
+        func.min(point_step).over(partition_by=both.c.run_id, order_by=[both.c.step.desc(), both.c.ord],
+                                  rows=(None, 0)).label("next_step"),
+    ).subquery("neighbours")
+
+    prev, nxt = aliased(pts, name="prev"), aliased(pts, name="next")
+    n = neighbours.c
+    frac = cast(n.step - n.prev_step, Float) / cast(func.nullif(n.next_step - n.prev_step, 0), Float)
+    value = prev.c.value + (nxt.c.value - prev.c.value) * func.coalesce(frac, 0)
+    return (select(n.step, value.label("value"))
+            .select_from(neighbours
+                         .join(prev, and_(prev.c.run_id == n.run_id, prev.c.step == n.prev_step))
+                         .join(nxt, and_(nxt.c.run_id == n.run_id, nxt.c.step == n.next_step)))
+            .where(n.ord == 1)
+            .subquery("aligned"))
+
+
+def aggregate_runs(sources: list[tuple], quantiles: list[float],
+                   align: AlignMode = "interpolate", max_points: Optional[int] = None):
+    """
+    Build a SELECT with one row per step: number of runs, mean, sample std,
+    min, max and the requested quantiles of ``value`` across runs.
+    ``sources`` lists ``(model, run_ids, conditions)`` triples (raw and
+    rollup tables); ``conditions`` must narrow ``model`` to a single series
+    per run (one split, and one metric_name for metrics).
+    """
+    parts = [select(model.run_id, model.step, model.value)
+             .where(model.run_id == any_(literal(run_ids, ARRAY(PG_UUID(as_uuid=True)))), *conditions)
+             for model, run_ids, conditions in sources]
+    pts = (parts[0] if len(parts) == 1 else union_all(*parts)).cte("pts")
+    src = pts if align == "exact" else _interpolated(pts, max_points)
+
+    cols = [
+        src.c.step,
+        func.count(src.c.value).label("count"),
+        func.avg(src.c.value).label("mean"),
+        func.stddev_samp(src.c.value).label("std"),
+        func.min(src.c.value).label("min"),
+        func.max(src.c.value).label("max"),
+    ]
+    if quantiles:
+        qs = literal(quantiles, ARRAY(Float))
+        cols.append(func.percentile_cont(qs).within_group(src.c.value).label("quantiles"))
+    else:
+        cols.append(null().label("quantiles"))
+    return select(*cols).group_by(src.c.step).order_by(src.c.step)
+
+
+def to_band(rows, quantiles: list[float]) -> dict:
+    """Columnar response body: one array per statistic, quantiles keyed by their level."""
+    body = {"steps": [], "count": [], "mean": [], "std": [], "min": [], "max": [],
+            "quantiles": {str(q): [] for q in quantiles}}
+    for row in rows:
+        for key in ("step", "count", "mean", "std", "min", "max"):
+            body["steps" if key == "step" else key].append(row._mapping[key])
+        for q, v in zip(quantiles, row.quantiles or []):
+            body["quantiles"][str(q)].append(v)
+    return body
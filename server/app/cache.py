@@ -0,0 +1,257 @@
+# app/cache.py
+# Cache delle risposte (serie e listing) in memoria LRU o su un backend condiviso
+
+import os
+import json
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from itertools import islice
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterable, Optional
+from uuid import UUID
+from fastapi import Response
+from app.series import etag_matches
+
+logger = logging.getLogger("uvicorn")
+
+# Size bound of the in-process cache in bytes (0 disables response caching)
+RESPONSE_CACHE_BYTES = int(os.getenv("RESPONSE_CACHE_BYTES", str(64 * 1024 * 1024)))
+# memory: per-process LRU; redis: shared by every worker (needs the redis package)
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "redis://localhost:6379/0")
+# Seconds a response of a running run, or a listing, is served from the cache
+RESPONSE_CACHE_LIVE_TTL = float(os.getenv("RESPONSE_CACHE_LIVE_TTL", "2"))
+# Browser max-age of series of completed/failed runs
+RESPONSE_CACHE_MAX_AGE = int(os.getenv("RESPONSE_CACHE_MAX_AGE", "3600"))
+
+LISTINGS = "listings"
+# run listings embedding run_summaries, which every ingest updates
+SUMMARIES = "summaries"
+
+
+def _run_key(run_id) -> str:
+    try:
+        return str(UUID(str(run_id)))
+    except ValueError:
+        return str(run_id)
+
+
+def run_tags(run_ids: Iterable) -> list[str]:
+    return [f"run:{_run_key(r)}" for r in run_ids]
+
+
+def listing_tags(fields: Optional[list[str]]) -> list[str]:
+    """Tags of a run listing returning ``fields`` (None: the full schema)."""
+    if fields is None or "summaries" in fields:
+        return [LISTINGS, SUMMARIES]
+    return [LISTINGS]
+
+
+def cache_policy(finished: bool) -> tuple[Optional[float], str]:
+    """(server TTL, Cache-Control) of a series: finished runs are kept until invalidated."""
+    if finished:
+        return None, f"public, max-age={RESPONSE_CACHE_MAX_AGE}"
+    return RESPONSE_CACHE_LIVE_TTL, "no-cache"
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    headers: dict
+    # generations of the entry's tags when it was built; any bump makes it stale
+    generations: list
+
+    def to_response(self) -> Response:
+        return Response(self.body, headers=self.headers)
+
+    def dumps(self) -> bytes:
+        """One JSON line of headers and generations, then the body as is: nothing to execute on load."""
+        meta = json.dumps({"headers": self.headers, "generations": self.generations})
+        return meta.encode() + b"\n" + self.body
+
+    @classmethod
+    def loads(cls, raw: bytes) -> "CachedResponse":
+        meta, _, body = raw.partition(b"\n")
+        meta = json.loads(meta)
+        return cls(body, meta["headers"], meta["generations"])
+
+
+class MemoryBackend:
+    """LRU of entries bounded by their total body size, with optional expiry."""
+
+    # tags whose generation is remembered, beyond one per cached entry
+    TAG_SLACK = 1024
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        # tag -> clock value of its last bump, least recently bumped first
+        self._generations = {}
+        self._clock = 0
+        # generation of the tags forgotten so far: the newest one dropped
+        self._floor = 0
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        entry, expires, _ = item
+        if expires is not None and expires < time.monotonic():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, entry: CachedResponse, ttl: Optional[float]):
+        size = len(entry.body) + 256
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        expires = time.monotonic() + ttl if ttl is not None else None
+        self._entries[key] = (entry, expires, size)
+        self._size += size
+        while self._size > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self._size -= size
+
+    async def generations(self, tags: list[str]) -> list[int]:
+        return [self._generations.get(t, self._floor) for t in tags]
+
+    async def bump(self, tags: list[str]):
+        for t in tags:
+            self._clock += 1
+            self._generations.pop(t, None)
+            self._generations[t] = self._clock
+        limit = len(self._entries) + self.TAG_SLACK
+        if len(self._generations) > 2 * limit:
+            # forget the least recently bumped tags: they read as the floor from now on,
+            # which is never below what they read before, so stale entries can't match again
+            for t in list(islice(self._generations, len(self._generations) - limit)):
+                self._floor = self._generations.pop(t)
+
+    async def close(self):
+        self._entries.clear()
+        self._size = 0
+        self._generations.clear()
+
+
+class RedisBackend:
+    """Entries and generations in Redis, shared by all API workers; eviction is left to maxmemory-policy."""
+
+    PREFIX = "traintrack:cache:"
+    GENERATION = "traintrack:gen:"
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis needs the redis package: pip install redis") from e
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        raw = await self._redis.get(self.PREFIX + key)
+        if not raw:
+            return None
+        try:
+            return CachedResponse.loads(raw)
+        except (ValueError, KeyError, TypeError):
+            # not written by this version (or not by us at all): a miss
+            return None
+
+    async def set(self, key: str, entry: CachedResponse, ttl: Optional[float]):
+        px = max(1, int(ttl * 1000)) if ttl is not None else None
+        await self._redis.set(self.PREFIX + key, entry.dumps(), px=px)
+
+    async def generations(self, tags: list[str]) -> list[int]:
+        values = await self._redis.mget([self.GENERATION + t for t in tags])
+        return [int(v or 0) for v in values]
+
+    async def bump(self, tags: list[str]):
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for t in tags:
+                pipe.incr(self.GENERATION + t)
+            await pipe.execute()
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+class ResponseCache:
+    """
+    Response cache for series and listings. Every entry is tagged with the
+    runs it shows (or ``listings``); writes bump the generation of their
+    tags, which turns the entries built before them into misses.
+    """
+
+    def __init__(self):
+        self.backend = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    async def start(self):
+        if RESPONSE_CACHE_BYTES <= 0:
+            return
+        if RESPONSE_CACHE_BACKEND == "redis":
+            self.backend = RedisBackend(RESPONSE_CACHE_URL)
+        else:
+            self.backend = MemoryBackend(RESPONSE_CACHE_BYTES)
+        logger.info(f"Response cache enabled ({RESPONSE_CACHE_BACKEND})")
+
+    async def stop(self):
+        if self.backend is not None:
+            await self.backend.close()
+            self.backend = None
+
+    @staticmethod
+    def key(*parts) -> str:
+        raw = json.dumps(parts, default=str, sort_keys=True)
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    async def invalidate(self, run_ids: Iterable = (), listings: bool = False, summaries: bool = False):
+        """Make every cached response showing ``run_ids`` (and listings, or the run summaries) stale."""
+        if self.backend is None:
+            return
+        tags = list(set(run_tags(run_ids))) + ([LISTINGS] if listings else []) + ([SUMMARIES] if summaries else [])
+        if tags:
+            await self.backend.bump(tags)
+
+    async def serve(self, key: str, tags: list[str], if_none_match: Optional[str],
+                    build: Callable[[], Awaitable[tuple[Response, Optional[float]]]]) -> Response:
+        """
+        Answer from the cache, or call ``build`` for ``(response, ttl)`` and
+        store 200 responses: ``ttl=None`` keeps them until invalidated, ``0``
+        skips the cache. Cached responses get a strong ETag if they lack one.
+        """
+        if self.backend is None:
+            response, _ = await build()
+            return response
+
+        # read before building: a write landing meanwhile leaves the new entry stale, never the reverse
+        generations = await self.backend.generations(tags)
+        entry = await self.backend.get(key)
+        if entry is not None and entry.generations == generations:
+            etag = entry.headers.get("etag")
+            if etag and etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers={"ETag": etag,
+                                                          "Cache-Control": entry.headers.get("cache-control", "no-cache")})
+            return entry.to_response()
+
+        response, ttl = await build()
+        if response.status_code == 200 and ttl != 0:
+            if "etag" not in response.headers:
+                response.headers["ETag"] = f'"{hashlib.md5(response.body).hexdigest()}"'
+            headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+            await self.backend.set(key, CachedResponse(response.body, headers, generations), ttl)
+        return response
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,57 @@
+# app/compression.py
+# Decompressione dei body gzip inviati dal client
+
+import os
+import zlib
+from starlette.types import ASGIApp, Receive, Scope, Send
+from starlette.responses import JSONResponse
+
+# Upper bound on a decompressed request body, guards against gzip bombs
+MAX_INFLATED_BYTES = int(os.getenv("REQUEST_MAX_INFLATED_BYTES", str(64 * 1024 * 1024)))
+
+
+class GzipRequestMiddleware:
+    """Inflate request bodies sent with ``Content-Encoding: gzip`` before routing."""
+
+    def __init__(self, app: ASGIApp, max_size: int = MAX_INFLATED_BYTES):
+        self.app = app
+        self.max_size = max_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        if headers.get(b"content-encoding", b"").lower() != b"gzip":
+            return await self.app(scope, receive, send)
+
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        chunks, size = [], 0
+        more_body = True
+        try:
+            while more_body:
+                message = await receive()
+                more_body = message.get("more_body", False)
+                chunk = inflater.decompress(message.get("body", b""), self.max_size - size + 1)
+                size += len(chunk)
+                if size > self.max_size or inflater.unconsumed_tail:
+                    return await JSONResponse({"detail": "Request body too large"}, 413)(scope, receive, send)
+                chunks.append(chunk)
+            chunks.append(inflater.flush())
+        except zlib.error:
+            return await JSONResponse({"detail": "Invalid gzip body"}, 400)(scope, receive, send)
+
+        body = b"".join(chunks)
+        # edited in place, not copied: outer middlewares read the matched route from this scope
+        scope["headers"] = [(k, v) for k, v in scope["headers"]
+                            if k not in (b"content-encoding", b"content-length")]
+        scope["headers"].append((b"content-length", str(len(body)).encode()))
+        sent = False
+
+        async def inflated_receive():
+            nonlocal sent
+            if sent:
+                return await receive()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        await self.app(scope, inflated_receive, send)
@@ -1,10 +1,54 @@
 import os
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from app.instrumentation import TimedQueuePool, instrument_engine
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql+asyncpg://postgres:password@db:5432/ml_tracking")
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+# Engine / pool tuning, all overridable from the environment
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() in ("1", "true", "yes")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "30"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+# Persistent connections of the bulk pool (/import, /loss/batch, /metric/batch), which has no timeouts
+DB_BULK_POOL_SIZE = int(os.getenv("DB_BULK_POOL_SIZE", "5"))
+
+
+def engine_options(url: str, bulk: bool = False) -> dict:
+    """
+    Keyword arguments for create_async_engine, depending on the driver in
+    ``url``. ``bulk`` drops the statement timeouts, for uploads that may
+    legitimately run for minutes.
+    """
+    options = {"echo": SQL_ECHO}
+    if url.startswith("sqlite"):
+        return options
+    options.update(
+        poolclass=TimedQueuePool,
+        pool_size=DB_BULK_POOL_SIZE if bulk else DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+    if "+asyncpg" in url:
+        options["connect_args"] = {
+            # SQLAlchemy's own prepared statement cache and asyncpg's, per connection
+            "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "command_timeout": None if bulk else DB_COMMAND_TIMEOUT,
+            "server_settings": {"statement_timeout": "0" if bulk else str(DB_STATEMENT_TIMEOUT_MS)},
+        }
+    return options
+
+
+engine = create_async_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+instrument_engine(engine)
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
@@ -12,9 +56,24 @@ AsyncSessionLocal = sessionmaker(
     expire_on_commit=False
 )
 
+bulk_engine = create_async_engine(DATABASE_URL, **engine_options(DATABASE_URL, bulk=True))
+instrument_engine(bulk_engine)
+
+BulkSessionLocal = sessionmaker(
+    bind=bulk_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
 class Base(DeclarativeBase):
     pass
 
 async def get_db():
+    # AsyncSession checks a connection out of the pool only on its first query
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+async def get_bulk_db():
+    # bulk uploads are exempt from REQUEST_TIMEOUT: the database must not cut them off either
+    async with BulkSessionLocal() as session:
+        yield session
@@ -0,0 +1,145 @@
+# app/deletion.py
+# Cancellazione asincrona e a blocchi di runs, modelli e progetti
+
+import os
+import asyncio
+import logging
+from datetime import datetime, timezone
+from sqlalchemy import select, delete, update, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import AsyncSessionLocal
+from app import models, model_stats
+from app.cache import response_cache
+
+logger = logging.getLogger("uvicorn")
+
+# Points removed per DELETE statement; each chunk commits on its own
+DELETE_CHUNK_SIZE = int(os.getenv("DELETE_CHUNK_SIZE", "5000"))
+
+
+async def create_job(db: AsyncSession, kind: str, target: str,
+                     run_ids: list, model_ids: list = ()) -> models.DeletionJob:
+    """
+    Record a deletion job, hide its runs and models from reads and hand it to
+    the background worker. Runs and models claimed meanwhile by a concurrent
+    job are left to it. Commits before returning.
+    """
+    job = models.DeletionJob(kind=kind, target=target, status="pending", total_runs=0)
+    db.add(job)
+    await db.flush()
+    if run_ids:
+        claimed = await db.execute(insert(models.DeletingRun)
+                                   .values([{"run_id": rid, "job_id": job.id} for rid in run_ids])
+                                   .on_conflict_do_nothing(index_elements=["run_id"])
+                                   .returning(models.DeletingRun.run_id))
+        claimed_ids = claimed.scalars().all()
+        job.total_runs = len(claimed_ids)
+        await model_stats.remove_runs(db, claimed_ids)
+    if model_ids:
+        await db.execute(insert(models.DeletingModel)
+                         .values([{"model_id": mid, "job_id": job.id} for mid in model_ids])
+                         .on_conflict_do_nothing(index_elements=["model_id"]))
+    await db.commit()
+    await response_cache.invalidate(run_ids, listings=True)
+    await db.refresh(job)
+    deletion_worker.submit(job.id)
+    return job
+
+
+async def _delete_chunk(db: AsyncSession, model, run_id) -> int:
+    # hash partitions are shared by many runs: there is no partition to drop,
+    # the run's rows are deleted in chunks from the one partition holding them
+    table = model.__table__
+    # rest of the primary key after run_id: selects a chunk through the index
+    keys = [c for c in table.primary_key.columns if c.name != "run_id"]
+    chunk = select(*keys).where(table.c.run_id == run_id).limit(DELETE_CHUNK_SIZE)
+    stmt = delete(table).where(table.c.run_id == run_id, tuple_(*keys).in_(chunk))
+    result = await db.execute(stmt)
+    return result.rowcount
+
+
+class DeletionWorker:
+    """Processes deletion jobs one at a time in a background task."""
+
+    def __init__(self):
+        self._queue = None
+        self._task = None
+
+    def submit(self, job_id):
+        if self._queue is not None:
+            self._queue.put_nowait(job_id)
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+        # resume jobs interrupted by a restart
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(models.DeletionJob.id)
+                                      .where(models.DeletionJob.status.in_(["pending", "running"]))
+                                      .order_by(models.DeletionJob.created_at))
+            for job_id in result.scalars():
+                self.submit(job_id)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._process(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Deletion job {job_id} failed: {e}")
+                async with AsyncSessionLocal() as db:
+                    await db.execute(update(models.DeletionJob)
+                                     .where(models.DeletionJob.id == job_id)
+                                     .values(status="failed", error=str(e),
+                                             finished_at=datetime.now(timezone.utc)))
+                    await db.commit()
+
+    async def _process(self, job_id):
+        async with AsyncSessionLocal() as db:
+            job = await db.get(models.DeletionJob, job_id)
+            if job is None or job.status in ("completed", "failed"):
+                return
+            job.status = "running"
+            await db.commit()
+
+            run_ids = (await db.execute(select(models.DeletingRun.run_id)
+                                        .where(models.DeletingRun.job_id == job_id))).scalars().all()
+            for run_id in run_ids:
+                for model in (models.Loss, models.Metric):
+                    while True:
+                        deleted = await _delete_chunk(db, model, run_id)
+                        job.deleted_points += deleted
+                        await db.commit()
+                        if deleted < DELETE_CHUNK_SIZE:
+                            break
+                        # let request handlers run between chunks
+                        await asyncio.sleep(0)
+                # the points are gone: the cascade only has summaries and markers left
+                await db.execute(delete(models.TrainingRun.__table__)
+                                 .where(models.TrainingRun.id == run_id))
+                job.deleted_runs += 1
+                await db.commit()
+
+            model_ids = (await db.execute(select(models.DeletingModel.model_id)
+                                          .where(models.DeletingModel.job_id == job_id))).scalars().all()
+            if model_ids:
+                await db.execute(delete(models.Model.__table__).where(models.Model.id.in_(model_ids)))
+
+            job.status = "completed"
+            job.finished_at = datetime.now(timezone.utc)
+            await db.commit()
+            logger.info(f"Deletion job {job_id} completed: {job.deleted_runs} runs, {job.deleted_points} points")
+
+
+deletion_worker = DeletionWorker()
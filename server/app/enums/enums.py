@@ -8,12 +8,3 @@ class StatusEnum(str, enum.Enum):
     running = 'running'
     completed = 'completed'
     failed = 'failed'
-
-class MetricEnum(str, enum.Enum):
-    accuracy = 'accuracy'
-    f1_score = 'f1-score'
-    recall   = 'recall'
-    precision = 'precision'
-    balanced_accuracy = 'balanced accuracy'
-    mse = 'mse'
-    mae = 'mae'
\ No newline at end of file
@@ -0,0 +1,138 @@
+# app/ingest.py
+# Inserimento set-based di losses e metrics
+
+from datetime import datetime, timezone
+from typing import Literal
+from fastapi import HTTPException
+from sqlalchemy import literal_column, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import schemas
+from app.pubsub import broker
+from app.instrumentation import INGESTED_POINTS
+from app.cache import response_cache
+from app.summaries import update_summaries
+from app.retention import lock_writable
+
+BatchReturn = Literal["none", "count", "rows"]
+OnConflict = Literal["error", "update", "ignore"]
+KINDS = {"losses": "loss", "metrics": "metric"}
+UNIQUE_VIOLATION = "23505"
+
+
+def _dedupe(rows: list[dict], key_cols: list[str], keep_last: bool) -> list[dict]:
+    """Collapse rows sharing a primary key; ON CONFLICT cannot touch the same row twice."""
+    unique = {}
+    for row in rows:
+        key = tuple(row[c] for c in key_cols)
+        if keep_last or key not in unique:
+            unique[key] = row
+    return list(unique.values())
+
+
+async def publish_points(kind: str, rows: list[dict]):
+    """Push freshly written points to the live stream subscribers of their run."""
+    by_run = {}
+    for row in rows:
+        by_run.setdefault(str(row["run_id"]), []).append(row)
+    for run_id, points in by_run.items():
+        if not broker.has_subscribers(run_id):
+            continue
+        now = datetime.now(timezone.utc)
+        await broker.publish(run_id, {"type": kind, "points": [{"timestamp": now, **p} for p in points]})
+
+
+async def write_points(db: AsyncSession, model, rows: list[dict],
+                       on_conflict: OnConflict = "error", read_back: bool = True) -> list[dict]:
+    """
+    Execute the INSERT for ``rows`` and update run_summaries, without committing.
+
+    Conflict modes collapse duplicate keys first and always read the written
+    rows back, with an ``is_insert`` flag; plain inserts only do when
+    ``read_back`` is set, in parameter order. With ``error``, a point that
+    already exists is refused with 409.
+    """
+    table = model.__table__
+    await lock_writable(db, {row["run_id"] for row in rows})
+    stmt = insert(table)
+    if on_conflict != "error":
+        key_cols = [c.name for c in table.primary_key.columns]
+        rows = _dedupe(rows, key_cols, keep_last=on_conflict == "update")
+        if on_conflict == "update":
+            stmt = stmt.on_conflict_do_update(
+                index_elements=key_cols,
+                set_={"value": stmt.excluded.value, "timestamp": func.now()},
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=key_cols)
+
+    try:
+        if on_conflict == "error" and not read_back:
+            # plain inserts: every row is new, no need to read anything back
+            await db.execute(stmt, rows)
+            written = rows
+        else:
+            # xmax is 0 only for tuples created by this statement, not for updated ones
+            is_insert = literal_column("xmax = 0").label("is_insert")
+            result = await db.execute(
+                stmt.returning(*table.c, is_insert, sort_by_parameter_order=on_conflict == "error"), rows)
+            written = [dict(r._mapping) for r in result]
+    except IntegrityError as e:
+        if getattr(e.orig, "sqlstate", None) != UNIQUE_VIOLATION:
+            raise
+        # asyncpg's message names the key: "Key (run_id, split, step)=(..., train, 3) already exists."
+        detail = getattr(e.orig.__cause__, "detail", None) or str(e.orig)
+        raise HTTPException(status_code=409, detail=f"Duplicate {KINDS[table.name]} point: {detail}")
+    await update_summaries(db, KINDS[table.name], written)
+    INGESTED_POINTS.inc(len(written), KINDS[table.name])
+    return written
+
+
+def count_written(total: int, unique: int, written: list[dict], on_conflict: OnConflict) -> schemas.BatchInsertResult:
+    """Inserted/updated/skipped counts of ``total`` submitted rows, ``unique`` of them after dedupe."""
+    counts = schemas.BatchInsertResult(inserted=sum(1 for r in written if r.get("is_insert", True)))
+    counts.updated = len(written) - counts.inserted
+    if on_conflict == "update":
+        # in-batch duplicates were folded into the surviving row: count them as updates
+        counts.updated += total - unique
+    counts.skipped = total - counts.inserted - counts.updated
+    return counts
+
+
+def strip_flags(written: list[dict]) -> list[dict]:
+    return [{k: v for k, v in r.items() if k != "is_insert"} for r in written]
+
+
+async def insert_points(db: AsyncSession, model, rows: list[dict],
+                        returning: BatchReturn = "rows", on_conflict: OnConflict = "error"):
+    """
+    Insert all rows with a single executemany INSERT and commit.
+
+    SQLAlchemy batches the parameter sets into multi-row ``INSERT ... VALUES``
+    statements (insertmanyvalues), so the number of round trips no longer grows
+    with one statement plus one REFRESH per row.
+
+    ``on_conflict`` decides what happens to rows whose primary key already exists:
+    ``error`` aborts the whole batch, ``update`` overwrites value and timestamp,
+    ``ignore`` keeps the stored row. Conflict modes always read the written rows
+    back so run_summaries, updated in the same transaction, only counts real
+    inserts. Returns ``(points, counts)`` where ``points`` holds the written rows
+    only when ``returning="rows"``.
+    """
+    kind = KINDS[model.__table__.name]
+    if not rows:
+        return [], schemas.BatchInsertResult(inserted=0)
+
+    key_cols = [c.name for c in model.__table__.primary_key.columns]
+    unique = len({tuple(r[c] for c in key_cols) for r in rows}) if on_conflict != "error" else len(rows)
+    written = await write_points(db, model, rows, on_conflict, read_back=returning == "rows")
+    await db.commit()
+    await response_cache.invalidate((row["run_id"] for row in rows), summaries=True)
+
+    counts = count_written(len(rows), unique, written, on_conflict)
+    points = strip_flags(written)
+    await publish_points(kind, points)
+    if returning != "rows":
+        points = []
+    return points, counts
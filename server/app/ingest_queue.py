@@ -0,0 +1,210 @@
+# app/ingest_queue.py
+# Coda di ingest lato server: i punti accodati vengono scritti a gruppi da un task in background
+
+import os
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Literal, Optional
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import schemas
+from app.db import AsyncSessionLocal
+from app.cache import response_cache
+from app.metric_keys import metric_keys
+from app.instrumentation import INGEST_BATCH_SIZE, INGEST_FLUSH_SIZE
+from app.ingest import (BatchReturn, OnConflict, KINDS, insert_points, write_points,
+                        count_written, strip_flags, publish_points)
+
+logger = logging.getLogger("uvicorn")
+
+Durability = Literal["direct", "commit", "enqueue"]
+
+# direct: every request commits its own points (no queue)
+# commit: requests are acknowledged once the coalesced transaction holding their points commits
+# enqueue: requests are acknowledged (202) as soon as their points are validated and queued
+INGEST_DURABILITY: Durability = os.getenv("INGEST_DURABILITY", "direct")
+# The queue is flushed every INGEST_FLUSH_MS milliseconds, or earlier once INGEST_FLUSH_ROWS points are waiting
+INGEST_FLUSH_MS = float(os.getenv("INGEST_FLUSH_MS", "50"))
+INGEST_FLUSH_ROWS = int(os.getenv("INGEST_FLUSH_ROWS", "5000"))
+# Points allowed in the queue, counting the flush in progress, before requests are refused with 503
+INGEST_QUEUE_MAX_ROWS = int(os.getenv("INGEST_QUEUE_MAX_ROWS", "200000"))
+
+
+@dataclass
+class _Entry:
+    model: type
+    rows: list[dict]
+    returning: BatchReturn
+    on_conflict: OnConflict
+    future: Optional[asyncio.Future]
+
+
+class IngestQueue:
+    """
+    Write-behind buffer for /loss and /metric. Points of all requests queued
+    within INGEST_FLUSH_MS are written in one transaction, one INSERT per
+    table and conflict mode, so Postgres pays one commit for many requests.
+    """
+
+    def __init__(self, durability: Durability = INGEST_DURABILITY):
+        self.durability = durability
+        self._entries = []
+        self._rows = 0
+        # points of the flush in progress: still in memory, so still in the bound
+        self._inflight = 0
+        self._wake = None
+        self._full = None
+        self._stopping = False
+        self._task = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._task is not None
+
+    async def start(self):
+        if self.durability not in ("commit", "enqueue"):
+            return
+        self._wake, self._full = asyncio.Event(), asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Ingest queue enabled (ack after {self.durability})")
+
+    async def stop(self):
+        """Flush everything still queued, then stop the background task."""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        self._stopping = True
+        self._wake.set()
+        self._full.set()
+        await task
+
+    async def submit(self, model, rows: list[dict], returning: BatchReturn = "rows",
+                     on_conflict: OnConflict = "error"):
+        """Queue ``rows``; same return value as insert_points, counts carry ``queued`` when not yet written."""
+        if self._rows + self._inflight + len(rows) > INGEST_QUEUE_MAX_ROWS:
+            raise HTTPException(status_code=503, detail="Ingest queue is full", headers={"Retry-After": "1"})
+        # the arrival time is stored, not the flush time
+        now = datetime.now(timezone.utc)
+        rows = [{**row, "timestamp": now} for row in rows]
+        future = asyncio.get_running_loop().create_future() if self.durability == "commit" else None
+        self._entries.append(_Entry(model, rows, returning, on_conflict, future))
+        self._rows += len(rows)
+        self._wake.set()
+        if self._rows >= INGEST_FLUSH_ROWS:
+            self._full.set()
+
+        if future is None:
+            return (rows if returning == "rows" else []), schemas.BatchInsertResult(inserted=0, queued=len(rows))
+        return await future
+
+    async def _run(self):
+        while True:
+            await self._wake.wait()
+            if not self._stopping:
+                try:
+                    await asyncio.wait_for(self._full.wait(), INGEST_FLUSH_MS / 1000)
+                except asyncio.TimeoutError:
+                    pass
+            entries, self._entries = self._entries, []
+            self._inflight, self._rows = self._rows, 0
+            self._wake.clear()
+            self._full.clear()
+            if entries:
+                INGEST_FLUSH_SIZE.observe(self._inflight)
+                try:
+                    await self._flush(entries)
+                except Exception as e:
+                    # the task must survive: later commit-mode requests wait on it
+                    logger.exception("Ingest queue flush failed")
+                    for entry in entries:
+                        self._fail(entry, e)
+                finally:
+                    self._inflight = 0
+            if self._stopping and not self._entries:
+                return
+
+    async def _flush(self, entries: list[_Entry]):
+        groups = {}
+        for entry in entries:
+            groups.setdefault((entry.model, entry.on_conflict), []).append(entry)
+        try:
+            async with AsyncSessionLocal() as db:
+                written = [await self._write(db, model, on_conflict, group)
+                           for (model, on_conflict), group in groups.items()]
+                await db.commit()
+        except Exception as e:
+            if len(entries) == 1:
+                self._fail(entries[0], e)
+                return
+            # one bad request (unknown run, duplicate key) must not fail the others
+            logger.warning(f"Coalesced ingest of {len(entries)} requests failed ({e}), retrying one by one")
+            for entry in entries:
+                await self._flush([entry])
+            return
+
+        # the points are committed: acknowledge them before any side effect can fail
+        for _, _, results in written:
+            for entry, result in results:
+                if entry.future is not None and not entry.future.done():
+                    entry.future.set_result(result)
+        try:
+            await response_cache.invalidate((row["run_id"] for entry in entries for row in entry.rows),
+                                            summaries=True)
+        except Exception as e:
+            logger.error(f"Cache invalidation after ingest failed: {e}")
+        for kind, points, _ in written:
+            try:
+                await publish_points(kind, points)
+            except Exception as e:
+                logger.error(f"Publishing {len(points)} ingested {kind} points failed: {e}")
+
+    async def _write(self, db: AsyncSession, model, on_conflict: OnConflict, group: list[_Entry]):
+        """Write one group of requests and split the outcome back per request."""
+        key_cols = [c.name for c in model.__table__.primary_key.columns]
+        read_back = any(entry.returning == "rows" for entry in group)
+        written = await write_points(db, model, [row for entry in group for row in entry.rows],
+                                     on_conflict, read_back)
+        by_key = {tuple(row[c] for c in key_cols): row for row in written}
+
+        # as if the requests had been written one after the other: a key sent by an
+        # earlier request is an update (or a skip with ignore) for the later ones
+        results, seen = [], set()
+        for entry in group:
+            keys = list(dict.fromkeys(tuple(row[c] for c in key_cols) for row in entry.rows))
+            mine = []
+            for k in keys:
+                if k not in by_key:
+                    continue
+                if k not in seen:
+                    mine.append(by_key[k])
+                elif on_conflict == "update":
+                    mine.append({**by_key[k], "is_insert": False})
+            seen.update(keys)
+            unique = len(keys) if on_conflict != "error" else len(entry.rows)
+            counts = count_written(len(entry.rows), unique, mine, on_conflict)
+            results.append((entry, (strip_flags(mine) if entry.returning == "rows" else [], counts)))
+        return KINDS[model.__table__.name], strip_flags(written), results
+
+    def _fail(self, entry: _Entry, error: Exception):
+        if entry.future is not None:
+            if not entry.future.done():
+                entry.future.set_exception(error)
+        else:
+            logger.error(f"Dropped {len(entry.rows)} queued {KINDS[entry.model.__table__.name]} points: {error}")
+
+
+ingest_queue = IngestQueue()
+
+
+async def ingest(db: AsyncSession, model, rows: list[dict],
+                 returning: BatchReturn = "rows", on_conflict: OnConflict = "error"):
+    """Write points through the ingest queue when enabled, otherwise directly with insert_points."""
+    INGEST_BATCH_SIZE.observe(len(rows), KINDS[model.__table__.name])
+    if "metric_name" in model.__table__.c:
+        rows = await metric_keys.intern(db, rows)
+    if ingest_queue.enabled and rows:
+        return await ingest_queue.submit(model, rows, returning, on_conflict)
+    return await insert_points(db, model, rows, returning, on_conflict)
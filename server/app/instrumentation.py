@@ -0,0 +1,243 @@
+# app/instrumentation.py
+# Metriche Prometheus (latenze, ingest, pool e query) e profiler a campionamento
+
+import os
+import re
+import sys
+import time
+import bisect
+import logging
+import threading
+import collections
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger("uvicorn")
+
+# Record the metrics below (the /metrics endpoint is always mounted)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Log statements slower than this many milliseconds (0 disables)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+# Allow starting the sampling profiler through /profiler, and its sampling period
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter, one value per label combination."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram, one series per label combination."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames, self.buckets = name, help, labelnames, buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # per-bucket counts (the last one is +Inf) and the sum
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip((*self.buckets, "+Inf"), counts):
+                    cumulative += count
+                    le = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+HTTP_LATENCY = Histogram("traintrack_http_request_duration_seconds",
+                         "Time to serve a request, by route template", ("method", "route", "status"))
+INGESTED_POINTS = Counter("traintrack_ingested_points_total", "Points written to losses/metrics", ("kind",))
+INGEST_BATCH_SIZE = Histogram("traintrack_ingest_batch_points", "Points per ingest request",
+                              ("kind",), SIZE_BUCKETS)
+INGEST_FLUSH_SIZE = Histogram("traintrack_ingest_flush_points", "Points per ingest queue flush",
+                              (), SIZE_BUCKETS)
+POOL_WAIT = Histogram("traintrack_db_pool_checkout_seconds", "Time spent waiting for a pooled connection")
+QUERY_TIME = Histogram("traintrack_db_query_duration_seconds", "Statement execution time, by verb and table",
+                       ("statement",))
+
+METRICS = [HTTP_LATENCY, INGESTED_POINTS, INGEST_BATCH_SIZE, INGEST_FLUSH_SIZE, POOL_WAIT, QUERY_TIME]
+
+
+def render_metrics(engine=None) -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    pool = getattr(engine, "pool", None)
+    if pool is not None and hasattr(pool, "checkedout"):
+        lines += ["# HELP traintrack_db_pool_checked_out Connections currently checked out",
+                  "# TYPE traintrack_db_pool_checked_out gauge",
+                  f"traintrack_db_pool_checked_out {pool.checkedout()}"]
+    return "\n".join(lines) + "\n"
+
+
+class InstrumentationMiddleware:
+    """Time every HTTP request and record it under its route template (``/runs/{run_id}``)."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # the router stores the matched route in the scope; unmatched paths share one label
+            route = getattr(scope.get("route"), "path", "<unmatched>")
+            HTTP_LATENCY.observe(time.perf_counter() - start, scope["method"], route, status)
+
+
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+\"?(\w+)", re.IGNORECASE)
+
+
+def statement_label(statement: str) -> str:
+    """Low-cardinality label for a SQL statement: its verb and first table."""
+    words = statement.split(None, 1)
+    verb = words[0].upper() if words else "?"
+    match = _TABLE.search(statement)
+    return f"{verb} {match.group(1)}" if match else verb
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if METRICS_ENABLED:
+                POOL_WAIT.observe(time.perf_counter() - start)
+
+
+def instrument_engine(engine):
+    """Time every statement run through ``engine`` and log the slow ones."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        if METRICS_ENABLED:
+            QUERY_TIME.observe(elapsed, statement_label(statement))
+        if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+            logger.warning(f"Slow query ({elapsed * 1000:.1f} ms): {' '.join(statement.split())[:500]}")
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        # failed statements never reach after_cursor_execute
+        stack = context.connection.info.get("query_start") if context.connection is not None else None
+        if stack:
+            stack.pop()
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for the event loop thread: a background thread
+    snapshots its stack every ``interval`` seconds. The result is in the
+    collapsed-stack format read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self):
+        self._thread = None
+        self._stop = threading.Event()
+        self._target = None
+        self.samples = collections.Counter()
+        self.started_at = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, interval: float = PROFILER_INTERVAL_MS / 1000):
+        """Start sampling the calling thread (the event loop when called from a handler)."""
+        if self.running:
+            return
+        self._target = threading.get_ident()
+        self.samples.clear()
+        self.started_at = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="traintrack-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval: float):
+        while not self._stop.wait(interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+profiler = SamplingProfiler()
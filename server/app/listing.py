@@ -0,0 +1,88 @@
+# app/listing.py
+# Paginazione keyset e selezione dei campi per le liste di models e runs
+
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import tuple_, literal
+from sqlalchemy.orm import load_only, noload
+from app import models, schemas
+from app.search import encode_cursor, decode_cursor
+
+RUN_FIELDS = tuple(schemas.RunRead.model_fields)
+MODEL_FIELDS = tuple(schemas.ModelRead.model_fields)
+# listing order: newest runs first, models by project then name
+RUN_ORDER = (models.TrainingRun.started_at, models.TrainingRun.id)
+MODEL_ORDER = (models.Model.project_name, models.Model.name)
+
+
+def parse_fields(fields: Optional[str], allowed: tuple) -> Optional[list[str]]:
+    """``fields=id,status`` -> ["id", "status"]; None means the full schema."""
+    if not fields:
+        return None
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = sorted(set(names) - set(allowed))
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def run_load_options(fields: Optional[list[str]]) -> list:
+    """Load only the requested run columns; summaries are skipped unless asked for."""
+    if fields is None:
+        return []
+    Run = models.TrainingRun
+    columns = {c for c in fields if c != "summaries"} | {"id", "started_at"}
+    options = [load_only(*(getattr(Run, c) for c in columns))]
+    if "summaries" not in fields:
+        options.append(noload(Run.summaries))
+    return options
+
+
+def paginate(stmt, order: tuple, cursor: Optional[str], limit: Optional[int], descending: bool):
+    """Order ``stmt`` by the unique key ``order`` and resume after ``cursor``."""
+    if cursor:
+        try:
+            values = decode_cursor(cursor)
+            position = tuple_(*(literal(_parse(c, v), c.type) for c, v in zip(order, values)))
+        except (ValueError, TypeError) as e:
+            raise HTTPException(status_code=422, detail=f"Invalid cursor: {e}")
+        key = tuple_(*order)
+        stmt = stmt.where(key < position if descending else key > position)
+    stmt = stmt.order_by(*(c.desc() if descending else c.asc() for c in order))
+    return stmt.limit(limit + 1) if limit else stmt
+
+
+def _parse(column, value):
+    kind = column.type.python_type
+    if kind is datetime:
+        return datetime.fromisoformat(value)
+    if kind is UUID:
+        return UUID(value)
+    return kind(value)
+
+
+def page_response(rows: list, order: tuple, limit: Optional[int], fields: Optional[list[str]], schema):
+    """
+    Serialize one page. The cursor of the next page, if any, goes in the
+    X-Next-Cursor header so the body stays a plain list.
+    """
+    headers = {}
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor([getattr(rows[-1], c.key) for c in order])
+    if fields is None:
+        body = [schema.model_validate(r) for r in rows]
+    else:
+        body = [{f: _field(r, f) for f in fields} for r in rows]
+    return JSONResponse(jsonable_encoder(body), headers=headers)
+
+
+def _field(row, name: str):
+    value = getattr(row, name)
+    if name == "summaries":
+        return [schemas.RunSummaryRead.model_validate(s) for s in value]
+    return value
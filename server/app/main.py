@@ -1,13 +1,28 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
-from app.db import engine, Base
-from app.routers import models, runs, losses, metrics
+from app.db import engine, bulk_engine, Base
+from app.pubsub import broker
+from app.partitions import ensure_partitions
+from app.deletion import deletion_worker
+from app.retention import retention_worker
+from app.ingest_queue import ingest_queue
+from app.cache import response_cache
+from app.compression import GzipRequestMiddleware
+from app.instrumentation import InstrumentationMiddleware, render_metrics, profiler
+from app.routers import models, runs, losses, metrics, jobs, transfer, profiling
 import asyncio
 import logging
+import os
 
 logger = logging.getLogger("uvicorn")
 
+# Seconds before a request is abandoned with 504 (0 disables the limit)
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "30"))
+# Bulk uploads not covered by REQUEST_TIMEOUT: cutting them off would roll back minutes of work
+REQUEST_TIMEOUT_EXEMPT = {"/import", "/loss/batch", "/metric/batch"}
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):    
     max_retries = 10
@@ -16,6 +31,7 @@ async def lifespan(app: FastAPI):
             async with engine.begin() as conn:
                 # crea tutte le tabelle se non esistono
                 await conn.run_sync(Base.metadata.create_all)
+                await ensure_partitions(conn)
             logger.info("Tables created successfully")
             break
         except Exception as e:
@@ -23,8 +39,21 @@ async def lifespan(app: FastAPI):
             await asyncio.sleep(5)
     else:
         raise RuntimeError("Cannot connect to the database after multiple retries")
-    yield    
+    await response_cache.start()
+    await broker.start()
+    await deletion_worker.start()
+    await retention_worker.start()
+    await ingest_queue.start()
+    yield
+    # flush queued points while the pool and the broker are still up
+    await ingest_queue.stop()
+    await retention_worker.stop()
+    await asyncio.to_thread(profiler.stop)
+    await deletion_worker.stop()
+    await broker.stop()
+    await response_cache.stop()
     await engine.dispose()
+    await bulk_engine.dispose()
     logger.info("DB connection pool closed")
 
 
@@ -36,13 +65,35 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
+app.add_middleware(GzipRequestMiddleware)
+
+@app.middleware("http")
+async def request_timeout(request: Request, call_next):
+    if REQUEST_TIMEOUT <= 0 or request.url.path.rstrip("/") in REQUEST_TIMEOUT_EXEMPT:
+        return await call_next(request)
+    try:
+        # covers the handler up to the response headers, so streams are not cut off
+        return await asyncio.wait_for(call_next(request), REQUEST_TIMEOUT)
+    except asyncio.TimeoutError:
+        return JSONResponse({"detail": "Request timed out"}, status_code=504)
+
+# registered last, so outermost: times the whole request, timeouts and decompression included
+app.add_middleware(InstrumentationMiddleware)
 
 @app.get("/health")
 async def check_health():
     return {'status' : 'ok'}
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(render_metrics(engine), media_type="text/plain; version=0.0.4")
+
 app.include_router(models.router)
 app.include_router(runs.router)
 app.include_router(losses.router)
-app.include_router(metrics.router)
\ No newline at end of file
+app.include_router(metrics.router)
+app.include_router(jobs.router)
+app.include_router(transfer.router)
+app.include_router(profiling.router)
\ No newline at end of file
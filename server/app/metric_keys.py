@@ -0,0 +1,128 @@
+# app/metric_keys.py
+# Dizionario dei nomi delle metriche: le righe salvano un id SMALLINT di metric_keys
+
+import logging
+from typing import Iterable
+from fastapi import HTTPException
+from sqlalchemy import SmallInteger, String, TypeDecorator, Column, select, all_, literal, false
+from sqlalchemy.dialects.postgresql import insert, ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import Base, AsyncSessionLocal
+
+logger = logging.getLogger("uvicorn")
+
+MAX_METRIC_NAME_LENGTH = 100
+
+
+class MetricKey(Base):
+    """Interned metric name; metrics and metric_rollups store its id (SMALLINT: up to 32767 names)."""
+    __tablename__ = "metric_keys"
+
+    id = Column(SmallInteger, primary_key=True)
+    name = Column(String(MAX_METRIC_NAME_LENGTH), nullable=False, unique=True)
+
+
+class UnknownMetricKey(LookupError):
+    """A stored key this process has not synced yet: it was created by another worker since."""
+
+
+class MetricKeys:
+    """
+    Process-wide name <-> id cache of the ``metric_keys`` table. Keys are
+    never deleted or renamed, so cached entries never go stale; ids created
+    by other workers are picked up by ``sync``.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.names = {}
+
+    def _add(self, rows):
+        for key, name in rows:
+            self.ids[name] = key
+            self.names[key] = name
+
+    async def sync(self, db: AsyncSession):
+        """Fetch the keys this process has not seen yet (usually none)."""
+        stmt = select(MetricKey.id, MetricKey.name)
+        if self.names:
+            stmt = stmt.where(MetricKey.id != all_(literal(list(self.names), ARRAY(SmallInteger))))
+        self._add((await db.execute(stmt)).all())
+
+    async def execute(self, db: AsyncSession, stmt):
+        """
+        ``db.execute(stmt)`` for a read returning metric names: a key created
+        by another worker since the last ``sync`` is fetched, then the read retried.
+        """
+        try:
+            return await db.execute(stmt)
+        except UnknownMetricKey:
+            await self.sync(db)
+            return await db.execute(stmt)
+
+    def matches(self, column, name: str):
+        """``column == name``; false for a name no point was ever logged with (``sync`` first)."""
+        key = self.ids.get(name)
+        return column == key if key is not None else false()
+
+    async def resolve(self, db: AsyncSession, names: Iterable[str]) -> dict:
+        """Ids of ``names``, creating the missing keys in their own committed transaction."""
+        names = set(names)
+        if names - self.ids.keys():
+            await self.sync(db)
+        missing = names - self.ids.keys()
+        if missing:
+            # a separate session: the keys must survive a rollback of the caller's insert
+            async with AsyncSessionLocal() as own:
+                await own.execute(insert(MetricKey).values([{"name": n} for n in sorted(missing)])
+                                  .on_conflict_do_nothing(index_elements=["name"]))
+                result = await own.execute(select(MetricKey.id, MetricKey.name)
+                                           .where(MetricKey.name.in_(missing)))
+                rows = result.all()
+                await own.commit()
+            self._add(rows)
+            logger.info(f"New metric names: {', '.join(sorted(missing))}")
+        return {n: self.ids[n] for n in names}
+
+    async def intern(self, db: AsyncSession, rows: list[dict]) -> list[dict]:
+        """
+        Prepare metric rows for insertion: points sent with a ``metric_key``
+        get its name, and every name gets a key.
+        """
+        keys = {row.get("metric_key") for row in rows} - {None}
+        if keys:
+            if keys - self.names.keys():
+                await self.sync(db)
+            unknown = keys - self.names.keys()
+            if unknown:
+                raise HTTPException(status_code=422, detail=f"Unknown metric_key: {sorted(unknown)}")
+            rows = [{**row, "metric_name": self.names[row["metric_key"]]}
+                    if row.get("metric_key") is not None else row for row in rows]
+        rows = [{k: v for k, v in row.items() if k != "metric_key"} for row in rows]
+        await self.resolve(db, {row["metric_name"] for row in rows})
+        return rows
+
+
+metric_keys = MetricKeys()
+
+
+class MetricName(TypeDecorator):
+    """A metric name, stored as its SMALLINT id in ``metric_keys``."""
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        # writers resolve() their names and filters go through matches(): a miss is a bug
+        if value not in metric_keys.ids:
+            raise LookupError(f"Metric name '{value}' has no key: resolve it first")
+        return metric_keys.ids[value]
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if value not in metric_keys.names:
+            raise UnknownMetricKey(value)
+        return metric_keys.names[value]
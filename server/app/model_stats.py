@@ -0,0 +1,54 @@
+# app/model_stats.py
+# Contatori dei runs per modello, aggiornati a ogni creazione, cambio di stato o cancellazione
+
+from collections import Counter
+from sqlalchemy import select, update, exists
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+from app.enums.enums import StatusEnum
+
+COUNTERS = [s.value for s in StatusEnum]
+
+
+async def adjust(db: AsyncSession, model_id, added=(), removed=()):
+    """
+    Count ``added`` and uncount ``removed`` run statuses of a model, then
+    refresh its latest run. Runs in the caller's transaction: the upsert locks
+    the model's row, so concurrent writers apply one after the other.
+    """
+    delta = Counter(StatusEnum(s).value for s in added)
+    delta.subtract(StatusEnum(s).value for s in removed)
+    values = {c: delta[c] for c in COUNTERS}
+    values["run_count"] = sum(values.values())
+    stmt = insert(models.ModelRunStats).values(model_id=model_id, **values)
+    table = models.ModelRunStats.__table__
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["model_id"],
+        set_={c: table.c[c] + stmt.excluded[c] for c in values},
+    ))
+
+    # one step of the (model_id, started_at, id) index
+    Run = models.TrainingRun
+    latest = (await db.execute(
+        select(Run.status, Run.started_at)
+        .where(Run.model_id == model_id, ~exists().where(models.DeletingRun.run_id == Run.id))
+        .order_by(Run.started_at.desc(), Run.id.desc()).limit(1)
+    )).first()
+    await db.execute(update(models.ModelRunStats).where(models.ModelRunStats.model_id == model_id)
+                     .values(latest_status=latest.status if latest else None,
+                             latest_started_at=latest.started_at if latest else None))
+
+
+async def remove_runs(db: AsyncSession, run_ids: list):
+    """Uncount runs claimed for deletion, locking them against a concurrent status change."""
+    if not run_ids:
+        return
+    rows = (await db.execute(select(models.TrainingRun.model_id, models.TrainingRun.status)
+                             .where(models.TrainingRun.id.in_(run_ids)).with_for_update())).all()
+    by_model = {}
+    for model_id, status in rows:
+        by_model.setdefault(model_id, []).append(status)
+    # always in the same order, so that two deletions over the same models can't deadlock
+    for model_id in sorted(by_model, key=str):
+        await adjust(db, model_id, removed=by_model[model_id])
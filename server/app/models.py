@@ -1,12 +1,13 @@
 import uuid
-from sqlalchemy import Column, String, Float, DateTime, Integer, ForeignKey, PrimaryKeyConstraint, JSON, UniqueConstraint
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Float, DateTime, Integer, ForeignKey, PrimaryKeyConstraint, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from sqlalchemy import Enum, Index
 
 from app.db import Base
-from app.enums.enums import StatusEnum, SplitEnum, MetricEnum
+from app.enums.enums import StatusEnum, SplitEnum
+from app.metric_keys import MetricKey, MetricName
 
 
 class Model(Base):
@@ -16,33 +17,59 @@ class Model(Base):
     name = Column(String, nullable=False)
     project_name = Column(String, nullable=False)
 
-    runs = relationship("TrainingRun", back_populates="model", cascade="all, delete-orphan")
+    runs = relationship("TrainingRun", back_populates="model", cascade="all, delete-orphan", passive_deletes=True)
     __table_args__ = (
         UniqueConstraint("name", "project_name", name="uq_model_name_project"),
     )
 
+class ModelRunStats(Base):
+    """Run counters and latest run of a model, kept up to date by the writes that change them."""
+    __tablename__ = "model_run_stats"
+
+    model_id = Column(UUID(as_uuid=True), ForeignKey("models.id", ondelete="CASCADE"), primary_key=True)
+    run_count = Column(Integer, nullable=False, default=0)
+    running = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    latest_status = Column(Enum(StatusEnum), nullable=True)
+    latest_started_at = Column(DateTime(timezone=True), nullable=True)
+
 class TrainingRun(Base):
     __tablename__ = "training_runs"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    model_id = Column(UUID(as_uuid=True), ForeignKey("models.id"), nullable=False)
+    model_id = Column(UUID(as_uuid=True), ForeignKey("models.id", ondelete="CASCADE"), nullable=False)
 
     started_at = Column(DateTime(timezone=True), server_default=func.now())
     finished_at = Column(DateTime(timezone=True), nullable=True)
 
     status = Column(Enum(StatusEnum), nullable=False, default="running")  
-    hyperparameters = Column(JSON)
+    hyperparameters = Column(JSONB)
+    # set when the retention worker moved the points into the rollup tables
+    compacted_at = Column(DateTime(timezone=True), nullable=True)
 
     model = relationship("Model", back_populates="runs")
 
-    losses = relationship("Loss", back_populates="run", cascade="all, delete-orphan")
-    metrics = relationship("Metric", back_populates="run", cascade="all, delete-orphan")
+    # points are removed by ON DELETE CASCADE in the database, never loaded by the ORM
+    losses = relationship("Loss", back_populates="run", cascade="all, delete-orphan", passive_deletes=True)
+    metrics = relationship("Metric", back_populates="run", cascade="all, delete-orphan", passive_deletes=True)
+    summaries = relationship("RunSummary", back_populates="run", cascade="all, delete-orphan",
+                             lazy="selectin", passive_deletes=True)
+
+    __table_args__ = (
+        # jsonb_path_ops serves the @> containment used by hyperparameter equality filters
+        Index("ix_training_runs_hyperparameters", "hyperparameters",
+              postgresql_using="gin", postgresql_ops={"hyperparameters": "jsonb_path_ops"}),
+        Index("ix_training_runs_started_at", "started_at", "id"),
+        # per-model listings, newest first
+        Index("ix_training_runs_model_started", "model_id", "started_at", "id"),
+    )
 
 
 class Loss(Base):
     __tablename__ = "losses"
 
-    run_id = Column(UUID(as_uuid=True), ForeignKey("training_runs.id"), nullable=False)
+    run_id = Column(UUID(as_uuid=True), ForeignKey("training_runs.id", ondelete="CASCADE"), nullable=False)
     step = Column(Integer, nullable=False)
     split = Column(Enum(SplitEnum), nullable=False)
 
@@ -51,18 +78,19 @@ class Loss(Base):
 
     run = relationship("TrainingRun", back_populates="losses")
 
+    # the primary key also serves the (run_id, split) + ORDER BY step reads
     __table_args__ = (
-        PrimaryKeyConstraint("run_id", "step", "split"),
-        Index("idx_loss_run_split_step", "run_id", "split", "step"),
+        PrimaryKeyConstraint("run_id", "split", "step"),
+        {"postgresql_partition_by": "HASH (run_id)"},
     )
 
 class Metric(Base):
     __tablename__ = "metrics"
 
-    run_id = Column(UUID(as_uuid=True), ForeignKey("training_runs.id"), nullable=False)
+    run_id = Column(UUID(as_uuid=True), ForeignKey("training_runs.id", ondelete="CASCADE"), nullable=False)
     step = Column(Integer, nullable=False)
     split = Column(Enum(SplitEnum), nullable=False)
-    metric_name = Column(Enum(MetricEnum), nullable=False)
+    metric_name = Column(MetricName, ForeignKey("metric_keys.id"), nullable=False)
 
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     value = Column(Float, nullable=False)
@@ -70,6 +98,108 @@ class Metric(Base):
     run = relationship("TrainingRun", back_populates="metrics")
 
     __table_args__ = (
-        PrimaryKeyConstraint("run_id", "step", "split", "metric_name"),
-        Index("idx_metric_run_split_step", "run_id", "split", "step"),
+        PrimaryKeyConstraint("run_id", "split", "metric_name", "step"),
+        {"postgresql_partition_by": "HASH (run_id)"},
+    )
+
+
+class LossRollup(Base):
+    """Losses of a compacted run: the last point of every bucket of steps, with the bucket's min/max."""
+    __tablename__ = "loss_rollups"
+
+    run_id = Column(UUID(as_uuid=True), ForeignKey("training_runs.id", ondelete="CASCADE"), nullable=False)
+    step = Column(Integer, nullable=False)
+    split = Column(Enum(SplitEnum), nullable=False)
+
+    timestamp = Column(DateTime(timezone=True))
+    value = Column(Float, nullable=False)
+    min_value = Column(Float, nullable=False)
+    max_value = Column(Float, nullable=False)
+    count = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        PrimaryKeyConstraint("run_id", "split", "step"),
+    )
+
+class MetricRollup(Base):
+    """Metrics of a compacted run, bucketed like LossRollup."""
+    __tablename__ = "metric_rollups"
+
+    run_id = Column(UUID(as_uuid=True), ForeignKey("training_runs.id", ondelete="CASCADE"), nullable=False)
+    step = Column(Integer, nullable=False)
+    split = Column(Enum(SplitEnum), nullable=False)
+    metric_name = Column(MetricName, ForeignKey("metric_keys.id"), nullable=False)
+
+    timestamp = Column(DateTime(timezone=True))
+    value = Column(Float, nullable=False)
+    min_value = Column(Float, nullable=False)
+    max_value = Column(Float, nullable=False)
+    count = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        PrimaryKeyConstraint("run_id", "split", "metric_name", "step"),
     )
+
+class RetentionPending(Base):
+    """Compacted run whose raw points are still being purged; survives restarts."""
+    __tablename__ = "retention_pending"
+
+    run_id = Column(UUID(as_uuid=True), ForeignKey("training_runs.id", ondelete="CASCADE"), primary_key=True)
+
+
+class RunSummary(Base):
+    """Per-series aggregates of a run, updated in the same transaction as each ingest."""
+    __tablename__ = "run_summaries"
+
+    run_id = Column(UUID(as_uuid=True), ForeignKey("training_runs.id", ondelete="CASCADE"), nullable=False)
+    split = Column(Enum(SplitEnum), nullable=False)
+    metric = Column(String, nullable=False)  # "loss" or a metric name
+
+    count = Column(Integer, nullable=False, default=0)
+    min_value = Column(Float)
+    min_step = Column(Integer)
+    max_value = Column(Float)
+    max_step = Column(Integer)
+    last_value = Column(Float)
+    last_step = Column(Integer)
+    last_timestamp = Column(DateTime(timezone=True))
+
+    run = relationship("TrainingRun", back_populates="summaries")
+
+    __table_args__ = (
+        PrimaryKeyConstraint("run_id", "split", "metric"),
+    )
+
+
+class DeletionJob(Base):
+    """Background deletion of runs, a model or a project, removed in bounded chunks."""
+    __tablename__ = "deletion_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    kind = Column(String, nullable=False)     # "runs", "model" or "project"
+    target = Column(String, nullable=False)   # run IDs, model ID or project name
+    status = Column(String, nullable=False, default="pending")  # pending, running, completed, failed
+
+    total_runs = Column(Integer, nullable=False, default=0)
+    deleted_runs = Column(Integer, nullable=False, default=0)
+    deleted_points = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class DeletingRun(Base):
+    """Marks a run as being deleted; reads skip it. Goes away with the run itself."""
+    __tablename__ = "deleting_runs"
+
+    run_id = Column(UUID(as_uuid=True), ForeignKey("training_runs.id", ondelete="CASCADE"), primary_key=True)
+    job_id = Column(UUID(as_uuid=True), ForeignKey("deletion_jobs.id", ondelete="CASCADE"), nullable=False)
+
+
+class DeletingModel(Base):
+    """Marks a model as being deleted; reads skip it. Goes away with the model itself."""
+    __tablename__ = "deleting_models"
+
+    model_id = Column(UUID(as_uuid=True), ForeignKey("models.id", ondelete="CASCADE"), primary_key=True)
+    job_id = Column(UUID(as_uuid=True), ForeignKey("deletion_jobs.id", ondelete="CASCADE"), nullable=False)
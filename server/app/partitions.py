@@ -0,0 +1,51 @@
+# app/partitions.py
+# Partizioni hash per le tabelle losses e metrics
+
+import os
+import logging
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+logger = logging.getLogger("uvicorn")
+
+# Number of hash partitions per points table, fixed once the tables exist
+POINT_PARTITIONS = int(os.getenv("DB_POINT_PARTITIONS", "16"))
+PARTITIONED_TABLES = ("losses", "metrics")
+
+
+async def ensure_partitions(conn: AsyncConnection, partitions: int = POINT_PARTITIONS):
+    """
+    Create the hash partitions of losses and metrics if they are missing.
+
+    Every run lives in exactly one partition, so its reads, inserts and
+    deletes only touch that partition's (smaller) primary-key B-tree. Tables
+    created before partitioning was introduced are left alone; see
+    ``migrations/001_partition_points.sql`` to convert them.
+
+    Trade-off: a partition holds many runs, so deleting a run is still a
+    chunked row DELETE (app.deletion), not a DROP/DETACH of a partition.
+    One partition per run would make that a DROP, but thousands of tables
+    slow down planning of every query; time-range partitions would spread
+    each run over several partitions and force a time predicate on reads,
+    which select by run. Both were rejected in favour of per-run locality.
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    for table in PARTITIONED_TABLES:
+        is_partitioned = await conn.scalar(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = CAST(:t AS regclass))"
+        ), {"t": table})
+        if not is_partitioned:
+            logger.warning(f"Table '{table}' is not partitioned, run migrations/001_partition_points.sql")
+            continue
+        existing = await conn.scalar(text(
+            "SELECT count(*) FROM pg_inherits WHERE inhparent = CAST(:t AS regclass)"
+        ), {"t": table})
+        if existing:
+            continue
+        for i in range(partitions):
+            await conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {table}_p{i} PARTITION OF {table} "
+                f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {i})"
+            ))
+        logger.info(f"Created {partitions} hash partitions for '{table}'")
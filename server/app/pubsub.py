@@ -0,0 +1,226 @@
+# app/pubsub.py
+# Pub/sub in-process per lo streaming live dei punti, con LISTEN/NOTIFY opzionale
+
+import os
+import json
+import uuid
+import time
+import asyncio
+import logging
+import asyncpg
+from sqlalchemy import select, func
+from fastapi.encoders import jsonable_encoder
+from app.db import engine
+
+logger = logging.getLogger("uvicorn")
+
+# "local" fans out within this process only, "postgres" also relays through LISTEN/NOTIFY
+PUBSUB_BACKEND = os.getenv("PUBSUB_BACKEND", "local")
+CHANNEL = "traintrack_events"
+QUEUE_SIZE = 1000
+# NOTIFY payloads are limited to 8000 bytes
+MAX_NOTIFY_BYTES = 7000
+# Seconds between liveness checks of the LISTEN connection, and the cap on the reconnect backoff
+LISTEN_PING_SECONDS = float(os.getenv("PUBSUB_PING_SECONDS", "30"))
+LISTEN_MAX_BACKOFF = 30.0
+
+
+class Broker:
+    """
+    Fans out run events (new points, status changes) to the subscribed stream
+    handlers. With the postgres backend, workers also announce the runs they
+    have subscribers for, so that events nobody listens to are not relayed.
+    """
+
+    def __init__(self, backend: str = PUBSUB_BACKEND):
+        self.backend = backend
+        self.origin = uuid.uuid4().hex
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+        # run_id -> {origin: expiry} of the other workers' subscriptions, renewed every ping
+        self._remote: dict[str, dict[str, float]] = {}
+        self._conn = None
+        self._listener = None
+        self._stop = asyncio.Event()
+
+    def subscribe(self, run_ids: list[str]) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        new = [rid for rid in run_ids if rid not in self._subscribers]
+        for rid in run_ids:
+            self._subscribers.setdefault(rid, set()).add(queue)
+        if new and self._conn is not None:
+            asyncio.get_running_loop().create_task(self._announce(new))
+        return queue
+
+    def unsubscribe(self, run_ids: list[str], queue: asyncio.Queue):
+        for rid in run_ids:
+            subs = self._subscribers.get(rid)
+            if subs is None:
+                continue
+            subs.discard(queue)
+            if not subs:
+                del self._subscribers[rid]
+
+    def has_subscribers(self, run_id: str) -> bool:
+        """True if a stream of this worker, or (postgres backend) of another one, follows the run."""
+        if run_id in self._subscribers:
+            return True
+        origins = self._remote.get(run_id)
+        if not origins:
+            return False
+        now = time.monotonic()
+        return any(expires > now for expires in origins.values())
+
+    async def publish(self, run_id: str, event: dict):
+        if not self.has_subscribers(run_id):
+            return
+        event = jsonable_encoder({"run_id": run_id, **event})
+        self._deliver(run_id, event)
+        if self.backend == "postgres" and run_id in self._remote:
+            await self._notify(run_id, event)
+
+    def _deliver(self, run_id: str, event: dict):
+        for queue in self._subscribers.get(run_id, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # slow consumer: drop what it has not read and ask it to refetch
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"run_id": run_id, "type": "resync"})
+
+    def _payloads(self, event: dict) -> list[str]:
+        """NOTIFY payloads of ``event``, its points split so that each payload fits in MAX_NOTIFY_BYTES."""
+        points = event.get("points")
+        envelope = json.dumps({"origin": self.origin, "event": {k: v for k, v in event.items() if k != "points"}})
+        if points is None:
+            return [envelope]
+        # the points are spliced into the envelope's event object, encoded once each
+        head, tail = envelope[:-2] + ', "points": [', "]}}"
+        payloads, chunk, size = [], [], len(head) + len(tail)
+        for p in points:
+            encoded = json.dumps(p)
+            if len(head) + len(encoded) + len(tail) > MAX_NOTIFY_BYTES:
+                # cannot be relayed at all: the other workers' subscribers refetch instead
+                payloads.append(json.dumps({"origin": self.origin,
+                                            "event": {"run_id": event["run_id"], "type": "resync"}}))
+                continue
+            if chunk and size + len(encoded) + 1 > MAX_NOTIFY_BYTES:
+                payloads.append(head + ",".join(chunk) + tail)
+                chunk, size = [], len(head) + len(tail)
+            chunk.append(encoded)
+            size += len(encoded) + 1
+        if chunk:
+            payloads.append(head + ",".join(chunk) + tail)
+        return payloads
+
+    async def _notify(self, run_id: str, event: dict):
+        try:
+            async with engine.begin() as conn:
+                for message in self._payloads(event):
+                    await conn.execute(select(func.pg_notify(CHANNEL, message)))
+        except Exception as e:
+            logger.warning(f"Could not publish event for run {run_id}: {e}")
+
+    async def _announce(self, run_ids: list[str]):
+        """Tell the other workers that this one has subscribers for ``run_ids``."""
+        conn = self._conn
+        if conn is None:
+            return
+        head = json.dumps({"origin": self.origin, "subscribed": []})[:-2]
+        chunk, size = [], len(head) + 2
+        try:
+            for rid in run_ids:
+                encoded = json.dumps(rid)
+                if chunk and size + len(encoded) + 1 > MAX_NOTIFY_BYTES:
+                    await conn.execute("SELECT pg_notify($1, $2)", CHANNEL, head + ",".join(chunk) + "]}")
+                    chunk, size = [], len(head) + 2
+                chunk.append(encoded)
+                size += len(encoded) + 1
+            if chunk:
+                await conn.execute("SELECT pg_notify($1, $2)", CHANNEL, head + ",".join(chunk) + "]}")
+        except Exception as e:
+            # the next ping announces them again
+            logger.warning(f"Could not announce run subscriptions: {e}")
+
+    def _on_notify(self, connection, pid, channel, payload):
+        message = json.loads(payload)
+        if message["origin"] == self.origin:
+            return
+        if "subscribed" in message:
+            expires = time.monotonic() + 3 * LISTEN_PING_SECONDS
+            for rid in message["subscribed"]:
+                self._remote.setdefault(rid, {})[message["origin"]] = expires
+            return
+        event = message["event"]
+        self._deliver(event["run_id"], event)
+
+    def _expire_remote(self):
+        now = time.monotonic()
+        for rid in list(self._remote):
+            origins = {o: t for o, t in self._remote[rid].items() if t > now}
+            if origins:
+                self._remote[rid] = origins
+            else:
+                del self._remote[rid]
+
+    def _resync_all(self):
+        for run_id in list(self._subscribers):
+            self._deliver(run_id, {"run_id": run_id, "type": "resync"})
+
+    async def _sleep(self, seconds: float) -> bool:
+        """Wait ``seconds`` unless stopped first; True if the broker is stopping."""
+        try:
+            await asyncio.wait_for(self._stop.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+        return self._stop.is_set()
+
+    async def _listen(self):
+        """
+        LISTEN on a dedicated connection (not a pool slot, it is held for
+        good), reconnecting with backoff whenever it drops.
+        """
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        backoff, lost = 1.0, False
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = await asyncpg.connect(dsn)
+                await conn.add_listener(CHANNEL, self._on_notify)
+                self._conn = conn
+                logger.info(f"Listening for run events on '{CHANNEL}'")
+                if lost:
+                    # events sent while disconnected are gone: subscribers must refetch
+                    self._resync_all()
+                backoff = 1.0
+                await self._announce(list(self._subscribers))
+                while not await self._sleep(LISTEN_PING_SECONDS):
+                    await asyncio.wait_for(conn.fetchval("SELECT 1"), LISTEN_PING_SECONDS)
+                    # renew this worker's subscriptions before the others expire them
+                    self._expire_remote()
+                    await self._announce(list(self._subscribers))
+            except Exception as e:
+                lost = True
+                logger.warning(f"Run event listener disconnected, reconnecting in {backoff:.0f}s: {e}")
+            finally:
+                self._conn = None
+                if conn is not None:
+                    try:
+                        await conn.close(timeout=5)
+                    except Exception:
+                        conn.terminate()
+            if lost and await self._sleep(backoff):
+                return
+            backoff = min(LISTEN_MAX_BACKOFF, backoff * 2)
+
+    async def start(self):
+        if self.backend == "postgres":
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        self._stop.set()
+        if self._listener is not None:
+            await self._listener
+
+
+broker = Broker()
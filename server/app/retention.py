@@ -0,0 +1,172 @@
+# app/retention.py
+# Compattazione dei run conclusi in tabelle di rollup e pulizia dei punti grezzi
+
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException
+from sqlalchemy import select, update, delete, insert, exists, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import AsyncSessionLocal
+from app import models
+from app.deletion import DELETE_CHUNK_SIZE, _delete_chunk
+from app.cache import response_cache
+from app.enums.enums import StatusEnum
+
+logger = logging.getLogger("uvicorn")
+
+# Completed runs older than this many days are compacted (0 disables retention)
+RETENTION_DAYS = float(os.getenv("RETENTION_DAYS", "0"))
+# Steps per rollup bucket: one point (plus min/max) is kept every RETENTION_STRIDE steps
+RETENTION_STRIDE = int(os.getenv("RETENTION_STRIDE", "10"))
+# Seconds between two retention passes, and runs compacted per pass
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "3600"))
+RETENTION_BATCH_RUNS = int(os.getenv("RETENTION_BATCH_RUNS", "100"))
+
+ROLLUPS = {models.Loss: models.LossRollup, models.Metric: models.MetricRollup}
+
+
+async def compacted_runs(db: AsyncSession, run_ids: list) -> set:
+    """The subset of ``run_ids`` whose points live in the rollup tables."""
+    if not run_ids:
+        return set()
+    result = await db.execute(select(models.TrainingRun.id)
+                              .where(models.TrainingRun.id.in_(run_ids),
+                                     models.TrainingRun.compacted_at.isnot(None)))
+    return set(result.scalars())
+
+
+async def lock_writable(db: AsyncSession, run_ids) -> None:
+    """
+    Refuse points for compacted runs: their reads come from the rollups, so
+    late points (spool replays, upserts) would be invisible and would break
+    the cache-forever policy of finished runs. The runs are locked FOR KEY
+    SHARE, like the foreign key check does; _compact takes FOR UPDATE, so it
+    waits for in-flight writes and later writes see its outcome.
+    """
+    rows = (await db.execute(select(models.TrainingRun.id, models.TrainingRun.compacted_at)
+                             .where(models.TrainingRun.id.in_(set(run_ids)))
+                             .with_for_update(read=True, key_share=True))).all()
+    compacted = sorted(str(run_id) for run_id, compacted_at in rows if compacted_at is not None)
+    if compacted:
+        raise HTTPException(status_code=409, detail=f"Runs compacted by retention are read-only: {compacted}")
+
+
+async def run_source(db: AsyncSession, model, run_id):
+    """
+    ``(table, finished)`` for reading a run's points: ``model``, or its rollup
+    table once the run has been compacted, and whether the run is completed/failed.
+    Runs being deleted are hidden at once: 404 while their points go away.
+    """
+    Run = models.TrainingRun
+    deleting = exists().where(models.DeletingRun.run_id == Run.id).label("deleting")
+    row = (await db.execute(select(Run.status, Run.compacted_at, deleting)
+                            .where(Run.id == run_id))).one_or_none()
+    if row is None:
+        return model, False
+    if row.deleting:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return (ROLLUPS[model] if row.compacted_at else model), row.status in (StatusEnum.completed, StatusEnum.failed)
+
+
+def _rollup_insert(model, run_id, stride: int):
+    """INSERT ... SELECT keeping the last point and the min/max of every bucket of ``stride`` steps."""
+    table, rollup = model.__table__, ROLLUPS[model].__table__
+    series = [c for c in table.primary_key.columns if c.name not in ("run_id", "step")]
+    parts = series + [table.c.step // stride]
+    ranked = select(
+        table.c.run_id, *series, table.c.step, table.c.timestamp, table.c.value,
+        func.row_number().over(partition_by=parts, order_by=table.c.step.desc()).label("r_last"),
+        func.min(table.c.value).over(partition_by=parts).label("min_value"),
+        func.max(table.c.value).over(partition_by=parts).label("max_value"),
+        func.count().over(partition_by=parts).label("count"),
+    ).where(table.c.run_id == run_id).subquery()
+    cols = ["run_id", *(c.name for c in series), "step", "timestamp", "value", "min_value", "max_value", "count"]
+    return insert(rollup).from_select(cols, select(*(ranked.c[c] for c in cols)).where(ranked.c.r_last == 1))
+
+
+class RetentionWorker:
+    """
+    Periodically compacts completed runs older than RETENTION_DAYS: the
+    rollups are written and the run is flagged in one transaction (reads
+    switch over at that commit), then the raw points are deleted in chunks.
+    """
+
+    def __init__(self):
+        self._task = None
+
+    async def start(self):
+        if RETENTION_DAYS > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        while True:
+            try:
+                compacted = await self.run_once()
+                if compacted:
+                    logger.info(f"Retention: compacted {compacted} runs")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Retention pass failed: {e}")
+            await asyncio.sleep(RETENTION_INTERVAL)
+
+    async def run_once(self) -> int:
+        async with AsyncSessionLocal() as db:
+            # finish purges interrupted by a restart first
+            for run_id in (await db.execute(select(models.RetentionPending.run_id))).scalars().all():
+                await self._purge(db, run_id)
+
+            Run = models.TrainingRun
+            cutoff = datetime.now(timezone.utc) - timedelta(days=RETENTION_DAYS)
+            candidates = (await db.execute(
+                select(Run.id)
+                .where(Run.status == StatusEnum.completed, Run.finished_at < cutoff,
+                       Run.compacted_at.is_(None),
+                       ~exists().where(models.DeletingRun.run_id == Run.id))
+                .order_by(Run.finished_at)
+                .limit(RETENTION_BATCH_RUNS))).scalars().all()
+            for run_id in candidates:
+                await self._compact(db, run_id)
+                await self._purge(db, run_id)
+            return len(candidates)
+
+    async def _compact(self, db: AsyncSession, run_id):
+        # waits for the writes holding the run (see lock_writable) and blocks new ones until commit
+        compacted_at = (await db.execute(select(models.TrainingRun.compacted_at)
+                                         .where(models.TrainingRun.id == run_id)
+                                         .with_for_update())).scalar_one_or_none()
+        if compacted_at is not None:
+            await db.rollback()
+            return
+        for model in ROLLUPS:
+            await db.execute(_rollup_insert(model, run_id, RETENTION_STRIDE))
+        await db.execute(update(models.TrainingRun).where(models.TrainingRun.id == run_id)
+                         .values(compacted_at=func.now()))
+        db.add(models.RetentionPending(run_id=run_id))
+        await db.commit()
+        await response_cache.invalidate([run_id], listings=True)
+
+    async def _purge(self, db: AsyncSession, run_id):
+        for model in ROLLUPS:
+            while True:
+                deleted = await _delete_chunk(db, model, run_id)
+                await db.commit()
+                if deleted < DELETE_CHUNK_SIZE:
+                    break
+                # let request handlers run between chunks
+                await asyncio.sleep(0)
+        await db.execute(delete(models.RetentionPending).where(models.RetentionPending.run_id == run_id))
+        await db.commit()
+
+
+retention_worker = RetentionWorker()
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from app.db import get_db
+from app import models, schemas
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+@router.get("/{job_id}", response_model=schemas.DeletionJobRead)
+async def read_job(job_id: UUID, db: AsyncSession = Depends(get_db)):
+    job = await db.get(models.DeletionJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
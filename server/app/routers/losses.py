@@ -1,47 +1,92 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, Header
 from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import TypeAdapter
 from sqlalchemy import select, delete
 from uuid import UUID
-from app.db import get_db
+from app.db import get_db, get_bulk_db
 from app import models, schemas
-from typing import List, Optional
+from app.ingest import BatchReturn, OnConflict
+from app.ingest_queue import ingest
+from app.retention import run_source
+from app.cache import response_cache, run_tags, cache_policy
+from app.series import SeriesFormat, series_etag, etag_matches, downsample, series_response
+from datetime import datetime
+from typing import List, Optional, Union
+
+_points_json = TypeAdapter(List[schemas.LossRead])
 
 router = APIRouter(prefix="/loss", tags=["loss"])
 
 @router.post("/", response_model=schemas.LossRead)
-async def create_loss(loss: schemas.LossCreate, db: AsyncSession = Depends(get_db)):
-    loss = models.Loss(
-        run_id=loss.run_id,
-        step=loss.step,
-        split=loss.split,
-        value=loss.value        
-    )
-    db.add(loss)
-    await db.commit()
-    await db.refresh(loss)    
-    return loss
-
-@router.post("/batch", response_model=list[schemas.LossRead])
-async def create_loss_batch(loss_batch: schemas.LossBatchCreate, db: AsyncSession = Depends(get_db)):
-    losses = [models.Loss(**loss.model_dump()) for loss in loss_batch.losses]
-    db.add_all(losses)
-    await db.commit()
-    for loss in losses:
-        await db.refresh(loss)
-    return losses
+async def create_loss(loss: schemas.LossCreate, response: Response, db: AsyncSession = Depends(get_db)):
+    points, counts = await ingest(db, models.Loss, [loss.model_dump()])
+    if counts.queued:
+        response.status_code = 202
+    return points[0]
+
+@router.post("/batch", response_model=Union[list[schemas.LossRead], schemas.BatchInsertResult])
+async def create_loss_batch(
+        loss_batch: schemas.LossBatchCreate,
+        response: Response,
+        returning: BatchReturn = Query("rows", alias="return"),
+        on_conflict: OnConflict = "error",
+        db: AsyncSession = Depends(get_bulk_db)):
+    rows = [loss.model_dump() for loss in loss_batch.losses]
+    points, counts = await ingest(db, models.Loss, rows, returning, on_conflict)
+    if returning == "none":
+        return Response(status_code=202 if counts.queued else 204)
+    if counts.queued:
+        response.status_code = 202
+    if returning == "count":
+        return counts
+    return points
 
 @router.get("/", response_model=List[schemas.LossRead])
 async def get_losses(
-        run_id: str,
+        run_id: UUID,
         split: Optional[str] = None,
         limit: Optional[int] = None,
+        after_step: Optional[int] = None,
+        after_timestamp: Optional[datetime] = None,
+        max_points: Optional[int] = Query(None, ge=3),
+        format: SeriesFormat = "json",
+        if_none_match: Optional[str] = Header(None),
         db: AsyncSession = Depends(get_db)):
+    params = {
+        "run_id": str(run_id), "split": split, "limit": limit,
+        "after_step": after_step, "after_timestamp": after_timestamp, "max_points": max_points,
+        "format": format,
+    }
+
+    async def build():
+        # compacted runs are served from their rollup table
+        model, finished = await run_source(db, models.Loss, run_id)
+        conditions = [model.run_id == run_id]
+        if split:
+            conditions.append(model.split == split)
+        if after_step is not None:
+            conditions.append(model.step > after_step)
+        if after_timestamp is not None:
+            conditions.append(model.timestamp > after_timestamp)
+
+        ttl, cache_control = cache_policy(finished)
+        etag = await series_etag(db, model, conditions, params)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control}), 0
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+
+        if max_points:
+            stmt = downsample(model, conditions, [model.split], max_points)
+        else:
+            stmt = select(model).where(*conditions).order_by(model.step.desc())
+        if limit:
+            stmt = stmt.limit(limit)
+        result = await db.execute(stmt)
+        points = result.scalars().all()
+        if format != "json":
+            return series_response(points, format, str(run_id), ["split"], headers), ttl
+        body = _points_json.dump_json(_points_json.validate_python(points, from_attributes=True))
+        return Response(body, media_type="application/json", headers=headers), ttl
 
-    stmt = select(models.Loss).where(models.Loss.run_id == run_id)
-    if split:
-        stmt = stmt.where(models.Loss.split == split)
-    if limit:
-        stmt = stmt.limit(limit)
-    stmt = stmt.order_by(models.Loss.step.desc())
-    result = await db.execute(stmt)
-    return result.scalars().all()
\ No newline at end of file
+    key = response_cache.key("loss", params)
+    return await response_cache.serve(key, run_tags([run_id]), if_none_match, build)
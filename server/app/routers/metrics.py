@@ -1,44 +1,108 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, Header
 from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import TypeAdapter
 from sqlalchemy import select
-from app.db import get_db
+from uuid import UUID
+from app.db import get_db, get_bulk_db
 from app import models, schemas
-from typing import List, Optional
+from app.ingest import BatchReturn, OnConflict
+from app.ingest_queue import ingest
+from app.retention import run_source
+from app.cache import response_cache, run_tags, cache_policy
+from app.metric_keys import metric_keys
+from app.series import SeriesFormat, series_etag, etag_matches, downsample, series_response
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+_points_json = TypeAdapter(List[schemas.MetricRead])
 
 router = APIRouter(prefix="/metric", tags=["metric"])
 
 @router.post("/", response_model=schemas.MetricRead)
-async def create_metric(metric: schemas.MetricCreate, db: AsyncSession = Depends(get_db)):
-    mtc = models.Metric(**metric.model_dump())
-    db.add(mtc)
-    await db.commit()
-    await db.refresh(mtc)    
-    return mtc
-
-@router.post("/batch", response_model=list[schemas.MetricRead])
-async def create_loss_batch(metrics: schemas.MetricBatchCreate, db: AsyncSession = Depends(get_db)):
-    mtcs = [models.Metric(**mtc.model_dump()) for mtc in metrics.metrics]
-    db.add_all(mtcs)
-    await db.commit()
-    for mtc in mtcs:
-        await db.refresh(mtc)
-    return mtcs
+async def create_metric(metric: schemas.MetricCreate, response: Response, db: AsyncSession = Depends(get_db)):
+    points, counts = await ingest(db, models.Metric, [metric.model_dump()])
+    if counts.queued:
+        response.status_code = 202
+    return points[0]
+
+@router.post("/batch", response_model=Union[list[schemas.MetricRead], schemas.BatchInsertResult])
+async def create_metric_batch(
+        metrics: schemas.MetricBatchCreate,
+        response: Response,
+        returning: BatchReturn = Query("rows", alias="return"),
+        on_conflict: OnConflict = "error",
+        db: AsyncSession = Depends(get_bulk_db)):
+    rows = [mtc.model_dump() for mtc in metrics.metrics]
+    points, counts = await ingest(db, models.Metric, rows, returning, on_conflict)
+    if returning == "none":
+        return Response(status_code=202 if counts.queued else 204)
+    if counts.queued:
+        response.status_code = 202
+    if returning == "count":
+        return counts
+    return points
 
 @router.get("/", response_model=List[schemas.MetricRead])
 async def get_metrics(
-        run_id: str,
+        run_id: UUID,
         split: Optional[str] = None,
         metric_name: Optional[str] = None,
         limit: Optional[int] = None,
+        after_step: Optional[int] = None,
+        after_timestamp: Optional[datetime] = None,
+        max_points: Optional[int] = Query(None, ge=3),
+        format: SeriesFormat = "json",
+        if_none_match: Optional[str] = Header(None),
         db: AsyncSession = Depends(get_db)):
+    params = {
+        "run_id": str(run_id), "split": split, "metric_name": metric_name, "limit": limit,
+        "after_step": after_step, "after_timestamp": after_timestamp, "max_points": max_points,
+        "format": format,
+    }
+
+    async def build():
+        await metric_keys.sync(db)
+        # compacted runs are served from their rollup table
+        model, finished = await run_source(db, models.Metric, run_id)
+        conditions = [model.run_id == run_id]
+        if split:
+            conditions.append(model.split == split)
+        if metric_name:
+            conditions.append(metric_keys.matches(model.metric_name, metric_name))
+        if after_step is not None:
+            conditions.append(model.step > after_step)
+        if after_timestamp is not None:
+            conditions.append(model.timestamp > after_timestamp)
+
+        ttl, cache_control = cache_policy(finished)
+        etag = await series_etag(db, model, conditions, params)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control}), 0
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+
+        if max_points:
+            stmt = downsample(model, conditions, [model.split, model.metric_name], max_points)
+        else:
+            stmt = select(model).where(*conditions).order_by(model.step.desc())
+        if limit:
+            stmt = stmt.limit(limit)
+        result = await metric_keys.execute(db, stmt)
+        points = result.scalars().all()
+        if format != "json":
+            return series_response(points, format, str(run_id), ["split", "metric_name"], headers), ttl
+        body = _points_json.dump_json(_points_json.validate_python(points, from_attributes=True))
+        return Response(body, media_type="application/json", headers=headers), ttl
+
+    key = response_cache.key("metric", params)
+    return await response_cache.serve(key, run_tags([run_id]), if_none_match, build)
+
+@router.get("/keys", response_model=Dict[str, int])
+async def read_metric_keys(db: AsyncSession = Depends(get_db)):
+    """Every metric name with its key, for clients sending ``metric_key`` instead of the name."""
+    await metric_keys.sync(db)
+    return metric_keys.ids
 
-    stmt = select(models.Metric).where(models.Metric.run_id == run_id)
-    if split:
-        stmt = stmt.where(models.Metric.split == split)
-    if limit:
-        stmt = stmt.limit(limit)
-    if metric_name:
-        stmt = stmt.where(models.Metric.metric_name == metric_name)
-    stmt = stmt.order_by(models.Metric.step.desc())
-    result = await db.execute(stmt)
-    return result.scalars().all()
\ No newline at end of file
+@router.post("/keys", response_model=Dict[str, int])
+async def create_metric_keys(names: List[schemas.MetricNameStr], db: AsyncSession = Depends(get_db)):
+    """Keys of ``names``, registering the new ones."""
+    return await metric_keys.resolve(db, names)
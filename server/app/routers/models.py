@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Header
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, exists, func
+from typing import Optional
+from uuid import UUID
 from app.db import get_db
 from app import models, schemas
+from app.deletion import create_job
+from app.cache import response_cache, LISTINGS, RESPONSE_CACHE_LIVE_TTL
+from app.listing import MODEL_FIELDS, MODEL_ORDER, parse_fields, paginate, page_response
+from app.routers.runs import not_deleting as run_not_deleting
 
 router = APIRouter(prefix="/models", tags=["models"])
 
@@ -11,31 +17,70 @@ async def create_model(model: schemas.ModelCreate, db: AsyncSession = Depends(ge
     model = models.Model(**model.model_dump())
     db.add(model)
     await db.commit()
+    await response_cache.invalidate(listings=True)
     await db.refresh(model)
     return model
 
+# models with a pending deletion job are hidden from every read
+not_deleting = ~exists().where(models.DeletingModel.model_id == models.Model.id)
+
+
 @router.get("/", response_model=list[schemas.ModelRead])
-async def read_models(db:AsyncSession = Depends(get_db)):
-    result = await db.execute(select(models.Model))
+async def read_models(fields: Optional[str] = None,
+                      limit: Optional[int] = Query(None, ge=1, le=1000), cursor: Optional[str] = None,
+                      db: AsyncSession = Depends(get_db)):
+    """Models ordered by project and name; with ``limit`` the next cursor is in ``X-Next-Cursor``."""
+    cols = parse_fields(fields, MODEL_FIELDS)
+    stmt = paginate(select(models.Model).where(not_deleting), MODEL_ORDER, cursor, limit, descending=False)
+    result = await db.execute(stmt)
+    return page_response(result.scalars().all(), MODEL_ORDER, limit, cols, schemas.ModelRead)
+
+@router.get("/overview", response_model=list[schemas.ModelOverview])
+async def read_models_overview(limit: Optional[int] = Query(None, ge=1, le=1000), cursor: Optional[str] = None,
+                               if_none_match: Optional[str] = Header(None),
+                               db: AsyncSession = Depends(get_db)):
+    """
+    Every model with its run counts per status and latest run, for the
+    landing page. The counters are kept in model_run_stats, so a page costs
+    one join by primary key per model whatever the number of runs.
+    """
+    key = response_cache.key("overview", limit, cursor)
+    return await response_cache.serve(key, [LISTINGS], if_none_match,
+                                      lambda: _build_overview(limit, cursor, db))
+
+
+async def _build_overview(limit: Optional[int], cursor: Optional[str], db: AsyncSession):
+    stats = models.ModelRunStats
+    stmt = (select(
+        models.Model.id, models.Model.name, models.Model.project_name,
+        func.coalesce(stats.run_count, 0).label("run_count"),
+        func.coalesce(stats.running, 0).label("running"),
+        func.coalesce(stats.completed, 0).label("completed"),
+        func.coalesce(stats.failed, 0).label("failed"),
+        stats.latest_status, stats.latest_started_at,
+    ).outerjoin(stats, stats.model_id == models.Model.id).where(not_deleting))
+    result = await db.execute(paginate(stmt, MODEL_ORDER, cursor, limit, descending=False))
+    return page_response(result.all(), MODEL_ORDER, limit, None, schemas.ModelOverview), RESPONSE_CACHE_LIVE_TTL
+
+async def _runs_of(db: AsyncSession, model_ids: list):
+    # runs already claimed by another deletion job stay with that job
+    result = await db.execute(select(models.TrainingRun.id)
+                              .where(models.TrainingRun.model_id.in_(model_ids), run_not_deleting))
     return result.scalars().all()
 
-@router.delete("/{model_id}")
-async def delete_model(model_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(models.Model).where(models.Model.id == model_id))
-    model = result.scalar_one_or_none()
-    if model is None:
+@router.delete("/{model_id}", status_code=202, response_model=schemas.DeletionJobRead)
+async def delete_model(model_id: UUID, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(models.Model.id).where(models.Model.id == model_id, not_deleting))
+    mid = result.scalar_one_or_none()
+    if mid is None:
         raise HTTPException(status_code=404, detail="Model not found")
-    await db.delete(model)
-    await db.commit()
-    return {"detail": "Model deleted"}
+    return await create_job(db, "model", str(model_id), await _runs_of(db, [mid]), [mid])
 
-@router.delete("/project/{project_name}")
+@router.delete("/project/{project_name}", status_code=202, response_model=schemas.DeletionJobRead)
 async def delete_models_by_project(project_name: str, db: AsyncSession = Depends(get_db)):
-    stmt = delete(models.Model).where(models.Model.project_name == project_name)
-    result = await db.execute(stmt)
-    await db.commit()
-    
-    if result.rowcount == 0:
+    result = await db.execute(select(models.Model.id)
+                              .where(models.Model.project_name == project_name, not_deleting))
+    model_ids = result.scalars().all()
+    if not model_ids:
         raise HTTPException(status_code=404, detail="No models found for this project")
-    
-    return {"detail": f"Deleted {result.rowcount} models for project '{project_name}'"}
\ No newline at end of file
+    return await create_job(db, "project", project_name, await _runs_of(db, model_ids), model_ids)
\ No newline at end of file
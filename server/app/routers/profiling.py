@@ -0,0 +1,34 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+from app.instrumentation import PROFILER_ENABLED, profiler
+
+router = APIRouter(prefix="/profiler", tags=["profiler"])
+
+def _require_enabled():
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler disabled, set PROFILER_ENABLED=true")
+
+@router.post("/start")
+async def start_profiler(interval_ms: Optional[float] = Query(None, gt=0)):
+    """Start sampling the event loop; previous samples are discarded."""
+    _require_enabled()
+    if interval_ms:
+        profiler.start(interval_ms / 1000)
+    else:
+        profiler.start()
+    return {"running": True, "started_at": profiler.started_at}
+
+@router.post("/stop")
+async def stop_profiler():
+    _require_enabled()
+    # stop() joins the sampling thread: keep the wait off the event loop
+    await asyncio.to_thread(profiler.stop)
+    return {"running": False, "samples": sum(profiler.samples.values())}
+
+@router.get("/", response_class=PlainTextResponse)
+async def read_profile():
+    """Samples so far in collapsed-stack format (flamegraph.pl, speedscope)."""
+    _require_enabled()
+    return PlainTextResponse(profiler.collapsed())
@@ -1,10 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Query, Header
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete, update
+from fastapi import Response
+from sqlalchemy import select, delete, update, any_, literal, exists, and_, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID, insert
 from uuid import UUID
 from app.db import get_db
-from app import models, schemas
+from app import models, schemas, model_stats
+from app.pubsub import broker
+from app.deletion import create_job
+from app.series import downsample, to_columnar
+from app.aggregate import aggregate_runs, to_band
+from app.retention import ROLLUPS, compacted_runs
+from app.cache import response_cache, run_tags, listing_tags, cache_policy, RESPONSE_CACHE_LIVE_TTL
+from app.metric_keys import metric_keys
+from app.search import hyperparameter_predicate, encode_cursor, decode_cursor, SUMMARY_STATS
+from app.listing import RUN_FIELDS, RUN_ORDER, parse_fields, run_load_options, paginate, page_response
+from app.enums.enums import SplitEnum, StatusEnum
 from datetime import datetime, timezone
+from typing import List, Literal, Optional
+import asyncio
+import json
+
+KEEPALIVE_SECONDS = 15
 
 
 router = APIRouter(prefix="/runs", tags=["runs"])
@@ -12,57 +30,337 @@ router = APIRouter(prefix="/runs", tags=["runs"])
 
 @router.post("/", response_model=schemas.RunRead)
 async def create_run(run: schemas.RunCreate, db: AsyncSession = Depends(get_db)):
-    run = models.TrainingRun(
-        model_id=run.model_id,
-        hyperparameters=run.hyperparameters,
-        status = "running"        
-    )
-    db.add(run)
+    """
+    Start a run. With a client-chosen ``id`` the call is idempotent, so a
+    retry (e.g. a spool replay after a lost response) gets the same run.
+    """
+    values = {"model_id": run.model_id, "hyperparameters": run.hyperparameters, "status": StatusEnum.running}
+    if run.id is not None:
+        values["id"] = run.id
+    result = await db.execute(insert(models.TrainingRun).values(**values)
+                              .on_conflict_do_nothing(index_elements=["id"])
+                              .returning(models.TrainingRun.id))
+    created = result.scalar_one_or_none()
+    if created is not None:
+        await model_stats.adjust(db, run.model_id, added=[StatusEnum.running])
     await db.commit()
-    await db.refresh(run)
-    return run
+    if created is not None:
+        await response_cache.invalidate(listings=True)
+    row = await db.get(models.TrainingRun, created or run.id)
+    if row.model_id != run.model_id:
+        raise HTTPException(status_code=409, detail="A run with this id exists for another model")
+    return row
+
+
+# runs with a pending deletion job are hidden from every read
+not_deleting = ~exists().where(models.DeletingRun.run_id == models.TrainingRun.id)
+
+
+def parse_ids(value: str, name: str = "run_id") -> list[UUID]:
+    """Comma-separated UUIDs of a path/query parameter; 422 when one is malformed."""
+    try:
+        return [UUID(v) for v in value.split(",")]
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"Invalid {name} '{value}'")
 
 
 @router.get("/runbymodels/{model_id}", response_model=list[schemas.RunRead])
-async def read_runs(model_id: str, db: AsyncSession = Depends(get_db)):
-    run_exists = await db.execute(select(models.TrainingRun).where(models.TrainingRun.model_id == model_id))
-    result = run_exists.scalars().all()
-    if not result:
-        raise HTTPException(status_code=404, detail="Run not found")
-    return result
+async def read_runs(model_id: UUID, fields: Optional[str] = None,
+                    limit: Optional[int] = Query(None, ge=1, le=1000), cursor: Optional[str] = None,
+                    if_none_match: Optional[str] = Header(None),
+                    db: AsyncSession = Depends(get_db)):
+    """
+    Runs of a model, newest first. ``fields`` picks the returned attributes;
+    with ``limit`` the next page's cursor is sent in ``X-Next-Cursor``.
+    """
+    cols = parse_fields(fields, RUN_FIELDS)
+
+    async def build():
+        stmt = (select(models.TrainingRun).options(*run_load_options(cols))
+                .where(models.TrainingRun.model_id == model_id, not_deleting))
+        result = await db.execute(paginate(stmt, RUN_ORDER, cursor, limit, descending=True))
+        runs = result.scalars().all()
+        if not runs and not cursor:
+            raise HTTPException(status_code=404, detail="Run not found")
+        return page_response(runs, RUN_ORDER, limit, cols, schemas.RunRead), RESPONSE_CACHE_LIVE_TTL
+
+    key = response_cache.key("runbymodels", model_id, cols, limit, cursor)
+    return await response_cache.serve(key, listing_tags(cols), if_none_match, build)
 
 @router.get("/runbyproject/{project_name}", response_model=list[schemas.RunRead])
-async def read_runs_by_project(project_name: str, db: AsyncSession = Depends(get_db)):
-    project_exists = await db.execute(select(models.Model).where(models.Model.project_name == project_name))
-    if not project_exists.scalar_one_or_none():
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    stmt = (select(models.TrainingRun)
-    .join(models.Model, models.TrainingRun.model_id == models.Model.id)
-    .where(models.Model.project_name == project_name)
-    )
-    result = await db.execute(stmt)
-    return result.scalars().all()
+async def read_runs_by_project(project_name: str, fields: Optional[str] = None,
+                               limit: Optional[int] = Query(None, ge=1, le=1000), cursor: Optional[str] = None,
+                               if_none_match: Optional[str] = Header(None),
+                               db: AsyncSession = Depends(get_db)):
+    """Runs of every model in a project, newest first, paginated like /runbymodels."""
+    cols = parse_fields(fields, RUN_FIELDS)
+
+    async def build():
+        project_exists = await db.scalar(select(exists().where(models.Model.project_name == project_name)))
+        if not project_exists:
+            raise HTTPException(status_code=404, detail="Project not found")
+        stmt = (select(models.TrainingRun).options(*run_load_options(cols))
+                .join(models.Model, models.TrainingRun.model_id == models.Model.id)
+                .where(models.Model.project_name == project_name, not_deleting))
+        result = await db.execute(paginate(stmt, RUN_ORDER, cursor, limit, descending=True))
+        return page_response(result.scalars().all(), RUN_ORDER, limit, cols, schemas.RunRead), RESPONSE_CACHE_LIVE_TTL
+
+    key = response_cache.key("runbyproject", project_name, cols, limit, cursor)
+    return await response_cache.serve(key, listing_tags(cols), if_none_match, build)
+
+
+@router.get("/search", response_model=schemas.RunSearchPage)
+async def search_runs(hp: List[str] = Query([], description="key:op:value, e.g. lr:lt:0.001"),
+                      status: Optional[str] = None, model_id: Optional[UUID] = None,
+                      project_name: Optional[str] = None,
+                      started_after: Optional[datetime] = None, started_before: Optional[datetime] = None,
+                      finished_after: Optional[datetime] = None, finished_before: Optional[datetime] = None,
+                      sort: str = "started_at", order: Literal["asc", "desc"] = "desc",
+                      limit: int = Query(50, ge=1, le=500), cursor: Optional[str] = None,
+                      db: AsyncSession = Depends(get_db)):
+    """
+    Filter runs by typed hyperparameter predicates (``hp`` is repeatable),
+    comma-separated statuses, model/project and start/finish time. ``sort`` is
+    started_at, finished_at or ``<split>.<metric>.<stat>`` over the run
+    summaries (e.g. validation.accuracy.max_value); runs without that value
+    are left out. Pages are keyset-based: pass back ``next_cursor``.
+    """
+    Run = models.TrainingRun
+    stmt = select(Run).where(not_deleting)
+    try:
+        for expr in hp:
+            stmt = stmt.where(hyperparameter_predicate(Run.hyperparameters, expr))
+        if status:
+            stmt = stmt.where(Run.status.in_([StatusEnum(s) for s in status.split(",")]))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if model_id:
+        stmt = stmt.where(Run.model_id == model_id)
+    if project_name:
+        stmt = (stmt.join(models.Model, Run.model_id == models.Model.id)
+                .where(models.Model.project_name == project_name))
+    for column, bound, after in ((Run.started_at, started_after, True), (Run.started_at, started_before, False),
+                                 (Run.finished_at, finished_after, True), (Run.finished_at, finished_before, False)):
+        if bound is not None:
+            stmt = stmt.where(column >= bound if after else column < bound)
+
+    if sort in ("started_at", "finished_at"):
+        key, parse = getattr(Run, sort), datetime.fromisoformat
+    else:
+        split, _, rest = sort.partition(".")
+        metric, _, stat = rest.rpartition(".")
+        if split not in SplitEnum.__members__ or not metric or stat not in SUMMARY_STATS:
+            raise HTTPException(status_code=422, detail=f"Invalid sort '{sort}'")
+        summary = models.RunSummary
+        stmt = stmt.join(summary, and_(summary.run_id == Run.id, summary.split == SplitEnum(split),
+                                       summary.metric == metric))
+        key, parse = getattr(summary, stat), (int if stat == "count" else float)
+    stmt = stmt.add_columns(key.label("sort_key")).where(key.isnot(None))
+
+    if cursor:
+        try:
+            value, last_id = decode_cursor(cursor)
+            position = tuple_(parse(value), UUID(last_id))
+        except (ValueError, TypeError) as e:
+            raise HTTPException(status_code=422, detail=f"Invalid cursor: {e}")
+        stmt = stmt.where(tuple_(key, Run.id) < position if order == "desc" else tuple_(key, Run.id) > position)
+    direction = (lambda c: c.desc()) if order == "desc" else (lambda c: c.asc())
+    stmt = stmt.order_by(direction(key), direction(Run.id)).limit(limit + 1)
+
+    rows = (await db.execute(stmt)).all()
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor([page[-1].sort_key, str(page[-1].TrainingRun.id)])
+    return {"items": [row.TrainingRun for row in page], "next_cursor": next_cursor}
 
 
-@router.delete("/{run_id}")
+@router.post("/series")
+async def read_runs_series(query: schemas.RunSeriesQuery, if_none_match: Optional[str] = Header(None),
+                           db: AsyncSession = Depends(get_db)):
+    """
+    Statuses and columnar loss/metric series of many runs in one response,
+    with one query per table filtered on ``run_id = ANY(...)``. Compacted
+    runs are read from the rollup tables.
+    """
+    key = response_cache.key("series", sorted(map(str, query.run_ids)), query.model_dump(exclude={"run_ids"}))
+    return await response_cache.serve(key, run_tags(query.run_ids), if_none_match,
+                                      lambda: _build_series(query, db))
+
+
+async def _build_series(query: schemas.RunSeriesQuery, db: AsyncSession):
+    await metric_keys.sync(db)
+    run_rows = (await db.execute(
+        select(models.TrainingRun.id, models.TrainingRun.status, models.TrainingRun.finished_at,
+               models.TrainingRun.compacted_at)
+        .where(models.TrainingRun.id == any_(literal(query.run_ids, ARRAY(PG_UUID(as_uuid=True)))),
+               not_deleting))).all()
+    compacted = [row.id for row in run_rows if row.compacted_at]
+    raw = [row.id for row in run_rows if not row.compacted_at]
+
+    async def fetch(raw_model, key_attrs):
+        by_run = {}
+        for model, run_ids in ((raw_model, raw), (ROLLUPS[raw_model], compacted)):
+            if run_ids:
+                for series in await fetch_series(model, run_ids, key_attrs):
+                    by_run.setdefault(series.pop("run_id"), []).append(series)
+        return by_run
+
+    async def fetch_series(model, run_ids, key_attrs):
+        conditions = [model.run_id == any_(literal(run_ids, ARRAY(PG_UUID(as_uuid=True))))]
+        if query.split:
+            conditions.append(model.split == query.split)
+        if query.min_step is not None:
+            conditions.append(model.step >= query.min_step)
+        if query.max_step is not None:
+            conditions.append(model.step <= query.max_step)
+        if query.after_timestamp is not None:
+            conditions.append(model.timestamp > query.after_timestamp)
+        if "metric_name" in key_attrs and query.metric_name:
+            conditions.append(metric_keys.matches(model.metric_name, query.metric_name))
+        if query.max_points:
+            partition_cols = [getattr(model, a) for a in key_attrs]
+            stmt = downsample(model, conditions, partition_cols, query.max_points)
+        else:
+            stmt = select(model).where(*conditions).order_by(model.step.desc())
+        result = await metric_keys.execute(db, stmt)
+        return to_columnar(result.scalars().all(), key_attrs)
+
+    losses = await fetch(models.Loss, ["run_id", "split"])
+    metrics = await fetch(models.Metric, ["run_id", "split", "metric_name"])
+
+    runs = [{
+        "id": row.id,
+        "status": row.status.value,
+        "finished_at": row.finished_at.isoformat() if row.finished_at else None,
+        "losses": losses.get(row.id, []),
+        "metrics": metrics.get(row.id, []),
+    } for row in run_rows]
+    body = json.dumps({"timestamp_unit": "ms", "runs": runs}, default=str)
+    # the response is immutable once every requested run has finished
+    finished = len(run_rows) == len(set(query.run_ids)) and all(
+        row.status in (StatusEnum.completed, StatusEnum.failed) for row in run_rows)
+    ttl, cache_control = cache_policy(finished)
+    return Response(body, media_type="application/json", headers={"Cache-Control": cache_control}), ttl
+
+@router.post("/aggregate")
+async def aggregate_runs_series(query: schemas.RunAggregateQuery, db: AsyncSession = Depends(get_db)):
+    """
+    Per-step mean, std, min, max and quantiles of one series across many runs
+    (e.g. seeds), computed in Postgres. Runs are selected by ``run_ids`` and/or
+    model, project and hyperparameter equality; with ``align=interpolate``
+    every run is linearly interpolated onto a shared step grid first.
+    """
+    if not (query.run_ids or query.model_id or query.project_name or query.hyperparameters):
+        raise HTTPException(status_code=422, detail="Select runs with run_ids, model_id, project_name or hyperparameters")
+
+    stmt = select(models.TrainingRun.id).where(not_deleting)
+    if query.run_ids:
+        stmt = stmt.where(models.TrainingRun.id.in_(query.run_ids))
+    if query.model_id:
+        stmt = stmt.where(models.TrainingRun.model_id == query.model_id)
+    if query.project_name:
+        stmt = (stmt.join(models.Model, models.TrainingRun.model_id == models.Model.id)
+                .where(models.Model.project_name == query.project_name))
+    if query.hyperparameters:
+        stmt = stmt.where(models.TrainingRun.hyperparameters.contains(query.hyperparameters))
+    run_ids = (await db.execute(stmt)).scalars().all()
+    if not run_ids:
+        raise HTTPException(status_code=404, detail="No runs match the selection")
+
+    def series_conditions(model):
+        conditions = [model.split == query.split]
+        if query.metric_name:
+            conditions.append(metric_keys.matches(model.metric_name, query.metric_name))
+        if query.min_step is not None:
+            conditions.append(model.step >= query.min_step)
+        if query.max_step is not None:
+            conditions.append(model.step <= query.max_step)
+        return conditions
+
+    # compacted runs contribute their rollup points
+    model = models.Metric if query.metric_name else models.Loss
+    if query.metric_name:
+        await metric_keys.sync(db)
+    compacted = await compacted_runs(db, run_ids)
+    sources = [(m, ids, series_conditions(m))
+               for m, ids in ((model, [r for r in run_ids if r not in compacted]),
+                              (ROLLUPS[model], list(compacted)))
+               if ids]
+    result = await db.execute(aggregate_runs(sources, query.quantiles, query.align, query.max_points))
+    body = {
+        "run_ids": run_ids,
+        "split": query.split.value,
+        "metric_name": query.metric_name,
+        "align": query.align,
+        **to_band(result.all(), query.quantiles),
+    }
+    return Response(json.dumps(body, default=str), media_type="application/json")
+
+@router.delete("/{run_id}", status_code=202, response_model=schemas.DeletionJobRead)
 async def delete_run(run_id: str, db: AsyncSession = Depends(get_db)):
-    ids = [UUID(r) for r in run_id.split(",")]
-    result = delete(models.TrainingRun).where(models.TrainingRun.id.in_(ids))
-    result = await db.execute(result)
-    await db.commit()
-    return {"detail": "Run deleted", "Affected row" : result.rowcount}
+    ids = parse_ids(run_id)
+    result = await db.execute(select(models.TrainingRun.id)
+                              .where(models.TrainingRun.id.in_(ids), not_deleting))
+    found = result.scalars().all()
+    if not found:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return await create_job(db, "runs", run_id, found)
 
 @router.patch("/update_status")
 async def update_status(payload: schemas.RunStatusUpdate, db: AsyncSession = Depends(get_db)):
     run_id = payload.run_id
     new_status = payload.new_status
+    finished_at = None
+    # lock the run: its old status is uncounted by this update or by a deletion, never both
+    current = (await db.execute(select(models.TrainingRun.model_id, models.TrainingRun.status)
+                                .where(models.TrainingRun.id == run_id).with_for_update())).first()
     if new_status == 'completed':
+        finished_at = datetime.now(timezone.utc)
         stmt = (update(models.TrainingRun).where(models.TrainingRun.id==run_id)
                 .values(status=new_status)
-                .values(finished_at=datetime.now(timezone.utc)))
+                .values(finished_at=finished_at))
     else:
         stmt = update(models.TrainingRun).where(models.TrainingRun.id==run_id).values(status=new_status)
     result = await db.execute(stmt)
+    if current is not None and current.status != StatusEnum(new_status):
+        deleting = await db.scalar(select(exists().where(models.DeletingRun.run_id == run_id)))
+        if not deleting:
+            await model_stats.adjust(db, current.model_id, added=[new_status], removed=[current.status])
     await db.commit()
-    return {"rows_updated": result.rowcount}  
+    await response_cache.invalidate([run_id], listings=True)
+    if result.rowcount:
+        await broker.publish(str(run_id), {"type": "status", "status": new_status, "finished_at": finished_at})
+    return {"rows_updated": result.rowcount}
+
+@router.get("/{run_id}/stream")
+async def stream_run(run_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Server-Sent Events stream of new loss/metric points and status changes
+    for one or more runs (comma-separated IDs).
+    """
+    uuids = parse_ids(run_id)
+    ids = [str(u) for u in uuids]
+    deleting = await db.execute(select(models.DeletingRun.run_id)
+                                .where(models.DeletingRun.run_id.in_(uuids)).limit(1))
+    if deleting.first() is not None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    # the stream may stay open for hours: don't hold a connection for it
+    await db.close()
+
+    async def events():
+        queue = broker.subscribe(ids)
+        try:
+            yield ": connected\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            broker.unsubscribe(ids, queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})  
@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import Optional
+from app.db import get_db, get_bulk_db
+from app import models, schemas
+from app.routers.runs import not_deleting, parse_ids
+from app.transfer import TransferFormat, MEDIA_TYPES, EXTENSIONS, export_header, export_stream, import_file
+import tempfile
+
+router = APIRouter(tags=["transfer"])
+
+
+@router.get("/export")
+async def export_runs(project: Optional[str] = None, model_id: Optional[str] = None,
+                      run_id: Optional[str] = None, format: TransferFormat = "parquet",
+                      db: AsyncSession = Depends(get_db)):
+    """
+    Stream the points of the selected runs as a Parquet or Arrow IPC file.
+    project, model_id and run_id take comma-separated lists and are combined
+    with AND; models and runs metadata travel in the file schema metadata.
+    """
+    stmt = (select(models.TrainingRun.id)
+            .join(models.Model, models.TrainingRun.model_id == models.Model.id)
+            .where(not_deleting))
+    if project:
+        stmt = stmt.where(models.Model.project_name.in_(project.split(",")))
+    if model_id:
+        stmt = stmt.where(models.Model.id.in_(parse_ids(model_id, "model_id")))
+    if run_id:
+        stmt = stmt.where(models.TrainingRun.id.in_(parse_ids(run_id)))
+    run_ids = (await db.execute(stmt)).scalars().all()
+    if not run_ids:
+        raise HTTPException(status_code=404, detail="No runs match the selection")
+
+    header = await export_header(db, run_ids)
+    filename = f"traintrack-export.{EXTENSIONS[format]}"
+    return StreamingResponse(export_stream(run_ids, header, format), media_type=MEDIA_TYPES[format],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+@router.post("/import", response_model=schemas.ImportResult)
+async def import_runs(request: Request, format: TransferFormat = "parquet", skip_existing: bool = True,
+                      db: AsyncSession = Depends(get_bulk_db)):
+    """
+    Load a file produced by GET /export (sent as the raw request body).
+    Points are bulk-loaded with COPY in a single transaction.
+    """
+    with tempfile.NamedTemporaryFile(suffix=f".{EXTENSIONS[format]}") as tmp:
+        async for chunk in request.stream():
+            tmp.write(chunk)
+        tmp.flush()
+        try:
+            return await import_file(db, tmp.name, format, skip_existing)
+        except FileExistsError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except (ValueError, KeyError, OSError) as e:
+            raise HTTPException(status_code=422, detail=f"Invalid export file: {e}")
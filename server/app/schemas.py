@@ -1,11 +1,15 @@
 # app/schemas.py
 # Schemi Pydantic per validazione e serializzazione
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from uuid import UUID
 from datetime import datetime
-from typing import Optional, Dict, Literal, List
-from app.enums.enums import SplitEnum, StatusEnum, MetricEnum
+from typing import Annotated, Optional, Dict, Literal, List
+from app.enums.enums import SplitEnum, StatusEnum
+from app.metric_keys import MAX_METRIC_NAME_LENGTH
+
+# any user-defined metric name ("accuracy", "top5", "bleu", ...)
+MetricNameStr = Annotated[str, Field(min_length=1, max_length=MAX_METRIC_NAME_LENGTH)]
 
 #############################################################
 ##                   SCHEMI PER MODELS                     ##
@@ -22,11 +26,27 @@ class ModelRead(BaseModel):
     class Config:
         from_attributes = True
 
+class ModelOverview(BaseModel):
+    id: UUID
+    name: str
+    project_name: str
+    run_count: int
+    running: int
+    completed: int
+    failed: int
+    latest_status: Optional[StatusEnum] = None
+    latest_started_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
 ##############################################################
 ##                   SCHEMI PER TRAINING RUNS              ##
 ##############################################################
 
 class RunCreate(BaseModel):
+    # optional client-chosen ID: creating the same run twice returns the first one
+    id: Optional[UUID] = None
     model_id: UUID
     hyperparameters: Optional[Dict] = None
 
@@ -34,6 +54,45 @@ class RunStatusUpdate(BaseModel):
     run_id : UUID
     new_status : StatusEnum
 
+class RunSeriesQuery(BaseModel):
+    run_ids: List[UUID] = Field(min_length=1)
+    split: Optional[SplitEnum] = None
+    metric_name: Optional[MetricNameStr] = None
+    min_step: Optional[int] = None
+    max_step: Optional[int] = None
+    after_timestamp: Optional[datetime] = None
+    max_points: Optional[int] = Field(None, ge=3)
+
+class RunAggregateQuery(BaseModel):
+    # runs: explicit IDs and/or filters, combined with AND
+    run_ids: Optional[List[UUID]] = None
+    model_id: Optional[UUID] = None
+    project_name: Optional[str] = None
+    hyperparameters: Optional[dict] = None
+    # series: the loss of a split, or one metric when metric_name is set
+    split: SplitEnum
+    metric_name: Optional[MetricNameStr] = None
+    min_step: Optional[int] = None
+    max_step: Optional[int] = None
+    quantiles: List[Annotated[float, Field(ge=0, le=1)]] = [0.25, 0.5, 0.75]
+    align: Literal["exact", "interpolate"] = "interpolate"
+    max_points: Optional[int] = Field(None, ge=2)
+
+class RunSummaryRead(BaseModel):
+    split: SplitEnum
+    metric: str
+    count: int
+    min_value: Optional[float] = None
+    min_step: Optional[int] = None
+    max_value: Optional[float] = None
+    max_step: Optional[int] = None
+    last_value: Optional[float] = None
+    last_step: Optional[int] = None
+    last_timestamp: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
 class RunRead(BaseModel):
     id: UUID
     model_id: UUID
@@ -41,10 +100,16 @@ class RunRead(BaseModel):
     started_at: datetime
     finished_at: Optional[datetime]
     hyperparameters: Optional[Dict] = None
+    compacted_at: Optional[datetime] = None
+    summaries: List[RunSummaryRead] = []
 
     class Config:
         from_attributes = True
 
+class RunSearchPage(BaseModel):
+    items: List[RunRead]
+    next_cursor: Optional[str] = None
+
 ##############################################################
 ##                   SCHEMI PER LOSSES                     ##
 ##############################################################
@@ -69,6 +134,13 @@ class LossRead(BaseModel):
     class Config:
         from_attributes = True
 
+class BatchInsertResult(BaseModel):
+    inserted: int
+    updated: int = 0
+    skipped: int = 0
+    # points accepted by the ingest queue but not written yet (INGEST_DURABILITY=enqueue)
+    queued: int = 0
+
 ###############################################################
 ##                   SCHEMI PER METRICS                     ##
 ###############################################################
@@ -77,9 +149,17 @@ class MetricCreate(BaseModel):
     run_id : UUID
     step: int
     split: SplitEnum
-    metric_name: MetricEnum
+    # the name, or its id from /metric/keys (shorter payloads for clients caching the mapping)
+    metric_name: Optional[MetricNameStr] = None
+    metric_key: Optional[int] = None
     value: float
 
+    @model_validator(mode="after")
+    def _name_or_key(self):
+        if (self.metric_name is None) == (self.metric_key is None):
+            raise ValueError("Set exactly one of metric_name and metric_key")
+        return self
+
 class MetricBatchCreate(BaseModel):
     run_id : UUID    
     metrics: List[MetricCreate]
@@ -88,9 +168,39 @@ class MetricRead(BaseModel):
     run_id: UUID
     step: int
     split: SplitEnum
-    metric_name: MetricEnum
+    metric_name: str
     timestamp: datetime
     value: float
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+###############################################################
+##                   SCHEMI PER DELETION JOBS               ##
+###############################################################
+
+class DeletionJobRead(BaseModel):
+    id: UUID
+    kind: str
+    target: str
+    status: str
+    total_runs: int
+    deleted_runs: int
+    deleted_points: int
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+###############################################################
+##                   SCHEMI PER EXPORT/IMPORT                ##
+###############################################################
+
+class ImportResult(BaseModel):
+    models_created: int
+    runs_imported: int
+    runs_skipped: int
+    losses: int
+    metrics: int
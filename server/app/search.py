@@ -0,0 +1,64 @@
+# app/search.py
+# Filtri tipizzati sugli iperparametri e cursori per la ricerca dei run
+
+import base64
+import json
+import operator
+from sqlalchemy import case, func
+
+RANGE_OPS = {"lt": operator.lt, "le": operator.le, "gt": operator.gt, "ge": operator.ge}
+SUMMARY_STATS = ("count", "min_value", "max_value", "last_value")
+
+
+def _parse_value(raw: str):
+    """Typed predicate value: JSON literals (numbers, true/false/null, quoted strings) or a bare string."""
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw
+
+
+def hyperparameter_predicate(column, expr: str):
+    """
+    Turn ``key:op:value`` into a condition on a JSONB column. ``key`` may be a
+    dotted path into nested objects; ``op`` is eq, ne, lt, le, gt, ge or exists.
+    eq/ne use @> containment and are served by the GIN index; ranges compare
+    numbers numerically and strings lexically, skipping values of other types.
+    """
+    key, _, rest = expr.partition(":")
+    op, _, raw = rest.partition(":")
+    if not key or not op:
+        raise ValueError(f"Invalid hyperparameter filter '{expr}', expected key:op:value")
+    path = key.split(".")
+    field = column[path[0]] if len(path) == 1 else column[tuple(path)]
+
+    if op == "exists":
+        return field.isnot(None)
+    value = _parse_value(raw)
+    if op in ("eq", "ne"):
+        nested = value
+        for part in reversed(path):
+            nested = {part: nested}
+        if op == "eq":
+            return column.contains(nested)
+        # runs without hyperparameters are "not equal" too
+        return ~func.coalesce(column.contains(nested), False)
+    if op not in RANGE_OPS:
+        raise ValueError(f"Unknown operator '{op}' in '{expr}'")
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"Range filter '{expr}' needs a number or a string")
+    json_type = "number" if not isinstance(value, str) else "string"
+    typed = field.as_float() if json_type == "number" else field.as_string()
+    # CASE keeps the cast away from values of another JSON type
+    return RANGE_OPS[op](case((func.jsonb_typeof(field) == json_type, typed)), value)
+
+
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError as e:
+        raise ValueError("Invalid cursor") from e
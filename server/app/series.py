@@ -0,0 +1,131 @@
+# app/series.py
+# Helper condivisi per la lettura delle serie di losses e metrics
+
+import sys
+import json
+import struct
+import hashlib
+from array import array
+from typing import Literal, Optional
+from fastapi import Response
+from sqlalchemy import select, func, or_, cast, BigInteger
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+
+SeriesFormat = Literal["json", "columnar", "binary"]
+
+
+async def series_etag(db: AsyncSession, model, conditions: list, params: dict) -> str:
+    """
+    Build an ETag for a series read from its row count and newest timestamp.
+
+    Both change on every insert, upsert and delete touching the filtered rows,
+    so polling clients can skip the full query when nothing happened.
+    """
+    stmt = select(func.count(), func.max(model.timestamp)).where(*conditions)
+    count, last = (await db.execute(stmt)).one()
+    raw = f"{sorted(params.items())}|{count}|{last.isoformat() if last else ''}"
+    return f'"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def downsample(model, conditions: list, partition_cols: list, max_points: int):
+    """
+    Build a SELECT returning at most ``max_points`` rows per series.
+
+    Each series (one per combination of ``partition_cols``) is split into
+    ``max_points // 3`` equal-width step buckets and only the minimum, maximum
+    and last point of every bucket are kept, so spikes and the end of the
+    curve survive while the payload stays bounded. Everything runs in
+    Postgres with window functions; the result maps back onto ``model``.
+    """
+    n_buckets = max(1, max_points // 3)
+    names = [c.key for c in partition_cols]
+
+    base = select(
+        *model.__table__.c,
+        func.min(model.step).over(partition_by=partition_cols).label("lo"),
+        func.max(model.step).over(partition_by=partition_cols).label("hi"),
+    ).where(*conditions).subquery()
+
+    span = cast(base.c.step - base.c.lo, BigInteger) * n_buckets
+    bucketed = select(base, (span // (base.c.hi - base.c.lo + 1)).label("bucket")).subquery()
+
+    parts = [bucketed.c[n] for n in names] + [bucketed.c.bucket]
+    ranked = select(
+        bucketed,
+        func.row_number().over(partition_by=parts, order_by=bucketed.c.value.asc()).label("r_min"),
+        func.row_number().over(partition_by=parts, order_by=bucketed.c.value.desc()).label("r_max"),
+        func.row_number().over(partition_by=parts, order_by=bucketed.c.step.desc()).label("r_last"),
+    ).subquery()
+
+    point = aliased(model, ranked, adapt_on_names=True)
+    return (select(point)
+            .where(or_(ranked.c.r_min == 1, ranked.c.r_max == 1, ranked.c.r_last == 1))
+            .order_by(ranked.c.step.desc()))
+
+
+def to_columnar(points, key_attrs: list[str]) -> list[dict]:
+    """
+    Group points into one entry per series with parallel arrays.
+
+    ``points`` arrive newest first; each series is returned in ascending step
+    order with timestamps as epoch milliseconds.
+    """
+    series = {}
+    for p in reversed(points):
+        key = tuple(getattr(p, a) for a in key_attrs)
+        entry = series.get(key)
+        if entry is None:
+            entry = {a: getattr(v, "value", v) for a, v in zip(key_attrs, key)}
+            entry.update(steps=[], values=[], timestamps=[])
+            series[key] = entry
+        entry["steps"].append(p.step)
+        entry["values"].append(p.value)
+        entry["timestamps"].append(p.timestamp.timestamp() * 1000 if p.timestamp else None)
+    return list(series.values())
+
+
+def _packed(typecode: str, values: list) -> bytes:
+    arr = array(typecode, values)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def encode_binary(run_id: str, series: list[dict]) -> bytes:
+    """
+    Pack columnar series into little-endian binary.
+
+    Layout: uint32 header length, JSON header padded to 8 bytes, then all
+    ``values`` as float64, all ``timestamps`` (epoch ms) as float64 and all
+    ``steps`` as int32, series after series. The header lists each series'
+    keys and ``length`` so the arrays can be sliced.
+    """
+    header = {"run_id": run_id, "series": [
+        {k: v for k, v in s.items() if k not in ("steps", "values", "timestamps")} | {"length": len(s["steps"])}
+        for s in series
+    ]}
+    head = json.dumps(header).encode()
+    head += b" " * (-(4 + len(head)) % 8)
+    values = [v for s in series for v in s["values"]]
+    timestamps = [t if t is not None else float("nan") for s in series for t in s["timestamps"]]
+    steps = [st for s in series for st in s["steps"]]
+    return (struct.pack("<I", len(head)) + head
+            + _packed("d", values) + _packed("d", timestamps) + _packed("i", steps))
+
+
+def series_response(points, fmt: SeriesFormat, run_id: str, key_attrs: list[str], headers: dict):
+    """Serialize points as columnar JSON or packed binary, bypassing per-row Pydantic models."""
+    series = to_columnar(points, key_attrs)
+    if fmt == "binary":
+        return Response(encode_binary(run_id, series), media_type="application/octet-stream", headers=headers)
+    body = json.dumps({"run_id": run_id, "timestamp_unit": "ms", "series": series})
+    return Response(body, media_type="application/json", headers=headers)
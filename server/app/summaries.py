@@ -0,0 +1,66 @@
+# app/summaries.py
+# Aggiornamento incrementale della tabella run_summaries
+
+from datetime import datetime, timezone
+from sqlalchemy import func, case
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+
+
+def _aggregate(kind: str, rows: list[dict]) -> list[dict]:
+    """Fold a batch into one summary row per (run, split, metric)."""
+    now = datetime.now(timezone.utc)
+    agg = {}
+    for row in rows:
+        metric = "loss" if kind == "loss" else getattr(row["metric_name"], "value", row["metric_name"])
+        key = (row["run_id"], row["split"], metric)
+        value, step = row["value"], row["step"]
+        inserted = 1 if row.get("is_insert", True) else 0
+        s = agg.get(key)
+        if s is None:
+            agg[key] = {
+                "run_id": row["run_id"], "split": row["split"], "metric": metric, "count": inserted,
+                "min_value": value, "min_step": step, "max_value": value, "max_step": step,
+                "last_value": value, "last_step": step, "last_timestamp": now,
+            }
+            continue
+        s["count"] += inserted
+        if value < s["min_value"]:
+            s["min_value"], s["min_step"] = value, step
+        if value > s["max_value"]:
+            s["max_value"], s["max_step"] = value, step
+        if step >= s["last_step"]:
+            s["last_value"], s["last_step"] = value, step
+    # a stable order keeps concurrent batches from deadlocking on the summary rows
+    return [agg[k] for k in sorted(agg, key=lambda k: tuple(str(p) for p in k))]
+
+
+async def update_summaries(db: AsyncSession, kind: str, rows: list[dict]):
+    """
+    Merge a batch of written points into run_summaries without committing.
+
+    Rows flagged ``is_insert=False`` (upsert overwrites) do not add to the
+    count but still take part in min/max/last. Min and max are the extremes
+    ever written, so an overwrite does not retract a previous extreme.
+    """
+    values = _aggregate(kind, rows)
+    if not values:
+        return
+    table = models.RunSummary.__table__
+    stmt = insert(table)
+    cur, new = table.c, stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["run_id", "split", "metric"],
+        set_={
+            "count": cur.count + new.count,
+            "min_step": case((new.min_value < cur.min_value, new.min_step), else_=cur.min_step),
+            "min_value": func.least(cur.min_value, new.min_value),
+            "max_step": case((new.max_value > cur.max_value, new.max_step), else_=cur.max_step),
+            "max_value": func.greatest(cur.max_value, new.max_value),
+            "last_value": case((new.last_step >= cur.last_step, new.last_value), else_=cur.last_value),
+            "last_step": func.greatest(cur.last_step, new.last_step),
+            "last_timestamp": new.last_timestamp,
+        },
+    )
+    await db.execute(stmt, values)
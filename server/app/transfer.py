@@ -0,0 +1,256 @@
+# app/transfer.py
+# Export/import di run in formato Parquet o Arrow IPC
+
+import json
+import os
+from datetime import datetime, timezone
+from typing import AsyncIterator, Literal
+from uuid import UUID
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import select, insert as sa_insert, any_, literal
+from sqlalchemy.dialects.postgresql import insert, ARRAY, UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models, model_stats
+from app.db import AsyncSessionLocal
+from app.retention import ROLLUPS, compacted_runs
+from app.cache import response_cache
+from app.metric_keys import MetricKey, metric_keys
+from app.enums.enums import SplitEnum, StatusEnum
+from app.summaries import update_summaries
+
+TransferFormat = Literal["parquet", "arrow"]
+MEDIA_TYPES = {"parquet": "application/vnd.apache.parquet", "arrow": "application/vnd.apache.arrow.stream"}
+EXTENSIONS = {"parquet": "parquet", "arrow": "arrows"}
+
+# Points per Parquet row group / Arrow record batch
+TRANSFER_BATCH_ROWS = int(os.getenv("TRANSFER_BATCH_ROWS", "100000"))
+HEADER_KEY = b"traintrack"
+
+POINT_SCHEMA = pa.schema([
+    ("run_id", pa.string()),
+    ("kind", pa.string()),
+    ("split", pa.string()),
+    ("metric_name", pa.string()),
+    ("step", pa.int32()),
+    ("timestamp", pa.timestamp("us", tz="UTC")),
+    ("value", pa.float64()),
+    # set on the rollup points of compacted runs only
+    ("min_value", pa.float64()),
+    ("max_value", pa.float64()),
+    ("count", pa.int32()),
+])
+
+
+class _ChunkSink:
+    """Write-only file object that hands the bytes written so far to the response."""
+
+    def __init__(self):
+        self._chunks = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _points_batch(kind: str, rows) -> pa.RecordBatch:
+    return pa.record_batch([
+        pa.array([str(r.run_id) for r in rows], pa.string()),
+        pa.array([kind] * len(rows), pa.string()),
+        pa.array([r.split.value for r in rows], pa.string()),
+        pa.array([r.metric_name if kind == "metric" else None for r in rows], pa.string()),
+        pa.array([r.step for r in rows], pa.int32()),
+        pa.array([r.timestamp for r in rows], pa.timestamp("us", tz="UTC")),
+        pa.array([r.value for r in rows], pa.float64()),
+        pa.array([getattr(r, "min_value", None) for r in rows], pa.float64()),
+        pa.array([getattr(r, "max_value", None) for r in rows], pa.float64()),
+        pa.array([getattr(r, "count", None) for r in rows], pa.int32()),
+    ], schema=POINT_SCHEMA)
+
+
+async def export_header(db: AsyncSession, run_ids: list[UUID]) -> dict:
+    """Models and runs metadata stored in the file schema, needed to import the points back."""
+    Run, Model = models.TrainingRun, models.Model
+    result = await db.execute(select(Run, Model).join(Model, Run.model_id == Model.id)
+                              .where(Run.id.in_(run_ids)))
+    header_models, header_runs = {}, []
+    for run, model in result.all():
+        header_models[model.id] = {"id": model.id, "name": model.name, "project_name": model.project_name}
+        header_runs.append({
+            "id": run.id, "model_id": run.model_id, "status": run.status.value,
+            "started_at": run.started_at, "finished_at": run.finished_at,
+            "compacted_at": run.compacted_at, "hyperparameters": run.hyperparameters,
+        })
+    return {"version": 1, "models": list(header_models.values()), "runs": header_runs}
+
+
+async def export_stream(run_ids: list[UUID], header: dict, fmt: TransferFormat,
+                        batch_rows: int = TRANSFER_BATCH_ROWS) -> AsyncIterator[bytes]:
+    """
+    Stream the points of ``run_ids`` as one Parquet or Arrow IPC file,
+    one row group / record batch at a time, from a server-side cursor.
+    Compacted runs export their rollup points.
+    """
+    schema = POINT_SCHEMA.with_metadata({HEADER_KEY: json.dumps(header, default=str)})
+    sink = _ChunkSink()
+    out = pa.PythonFile(sink, mode="w")
+    writer = pq.ParquetWriter(out, schema, compression="zstd") if fmt == "parquet" else pa.ipc.new_stream(out, schema)
+
+    # the request session is gone once streaming starts, so use a dedicated one
+    async with AsyncSessionLocal() as db:
+        compacted = await compacted_runs(db, run_ids)
+        raw = [r for r in run_ids if r not in compacted]
+        for kind, raw_model in (("loss", models.Loss), ("metric", models.Metric)):
+            for model, source_ids in ((raw_model, raw), (ROLLUPS[raw_model], list(compacted))):
+                if not source_ids:
+                    continue
+                cols = [model.run_id, model.split, model.step, model.timestamp, model.value]
+                if model in ROLLUPS.values():
+                    cols += [model.min_value, model.max_value, model.count]
+                order = [model.run_id, model.split, model.step]
+                if kind == "metric":
+                    # names joined in SQL: a key created during the export can't miss the cache
+                    cols.append(MetricKey.name.label("metric_name"))
+                    order.insert(2, model.metric_name)
+                ids = literal(source_ids, ARRAY(PG_UUID(as_uuid=True)))
+                stmt = select(*cols).where(model.run_id == any_(ids)).order_by(*order)
+                if kind == "metric":
+                    stmt = stmt.join(MetricKey, MetricKey.id == model.metric_name)
+                result = await db.stream(stmt.execution_options(yield_per=batch_rows))
+                async for rows in result.partitions():
+                    writer.write_batch(_points_batch(kind, rows))
+                    yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+def _open(path: str, fmt: TransferFormat):
+    """Return (header, record batch iterator) of an exported file."""
+    if fmt == "parquet":
+        pf = pq.ParquetFile(path)
+        metadata, batches = pf.schema_arrow.metadata, pf.iter_batches(batch_size=TRANSFER_BATCH_ROWS)
+    else:
+        reader = pa.ipc.open_stream(pa.memory_map(path))
+        metadata, batches = reader.schema.metadata, reader
+    if not metadata or HEADER_KEY not in metadata:
+        raise ValueError("Not a TrainTrack export: missing the traintrack schema metadata")
+    return json.loads(metadata[HEADER_KEY]), batches
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def _or(value, default):
+    return default if value is None else value
+
+
+async def _copy(db: AsyncSession, model, rows: list[dict]):
+    """Bulk-load points with COPY on Postgres, a multi-row INSERT elsewhere."""
+    if not rows:
+        return
+    conn = await db.connection()
+    if conn.dialect.name != "postgresql":
+        await db.execute(sa_insert(model.__table__), rows)
+        return
+    columns = list(rows[0])
+    # SQLAlchemy stores enum member names as the Postgres enum labels
+    records = [tuple(getattr(r[c], "name", r[c]) for c in columns) for r in rows]
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(model.__tablename__, records=records, columns=columns)
+
+
+async def import_file(db: AsyncSession, path: str, fmt: TransferFormat, skip_existing: bool) -> dict:
+    """
+    Load an exported file in one transaction. Models are matched on
+    (name, project_name); runs keep their IDs, and a run that already
+    exists is skipped (``skip_existing``) or fails the whole import.
+    """
+    header, batches = _open(path, fmt)
+    counts = {"models_created": 0, "runs_imported": 0, "runs_skipped": 0, "losses": 0, "metrics": 0}
+
+    model_ids = {}
+    for m in header["models"]:
+        created = await db.execute(insert(models.Model)
+                                   .values(name=m["name"], project_name=m["project_name"])
+                                   .on_conflict_do_nothing(index_elements=["name", "project_name"])
+                                   .returning(models.Model.id))
+        counts["models_created"] += len(created.all())
+        result = await db.execute(select(models.Model.id).where(models.Model.name == m["name"],
+                                                                models.Model.project_name == m["project_name"]))
+        model_ids[m["id"]] = result.scalar_one()
+
+    imported, compacted, statuses = set(), set(), {}
+    for r in header["runs"]:
+        finished_at = _parse_time(r["finished_at"])
+        # listings and their cursors order by started_at: it must not be NULL
+        started_at = _parse_time(r["started_at"]) or finished_at or datetime.now(timezone.utc)
+        compacted_at = _parse_time(r.get("compacted_at"))
+        result = await db.execute(insert(models.TrainingRun).values(
+            id=UUID(r["id"]), model_id=model_ids[r["model_id"]], status=StatusEnum(r["status"]),
+            started_at=started_at, finished_at=finished_at, compacted_at=compacted_at,
+            hyperparameters=r["hyperparameters"],
+        ).on_conflict_do_nothing(index_elements=["id"]).returning(models.TrainingRun.id))
+        if result.first() is None:
+            if not skip_existing:
+                raise FileExistsError(f"Run {r['id']} already exists")
+            counts["runs_skipped"] += 1
+            continue
+        imported.add(r["id"])
+        if compacted_at is not None:
+            compacted.add(r["id"])
+        statuses.setdefault(model_ids[r["model_id"]], []).append(r["status"])
+    counts["runs_imported"] = len(imported)
+    for model_id in sorted(statuses, key=str):
+        await model_stats.adjust(db, model_id, added=statuses[model_id])
+
+    for batch in batches:
+        points = {model: [] for model in (models.Loss, models.Metric, *ROLLUPS.values())}
+        for p in batch.to_pylist():
+            if p["run_id"] not in imported:
+                continue
+            row = {"run_id": UUID(p["run_id"]), "split": SplitEnum(p["split"]), "step": p["step"],
+                   "timestamp": p["timestamp"], "value": p["value"]}
+            if p["kind"] != "loss":
+                row["metric_name"] = p["metric_name"]
+            model = models.Loss if p["kind"] == "loss" else models.Metric
+            if p["run_id"] in compacted:
+                # rolled-up runs stay rolled up: the retention worker must not compact them again
+                model = ROLLUPS[model]
+                row.update(min_value=_or(p.get("min_value"), p["value"]),
+                           max_value=_or(p.get("max_value"), p["value"]), count=p.get("count") or 1)
+            points[model].append(row)
+        # COPY bypasses the column types: send the metric keys themselves
+        keys = await metric_keys.resolve(db, {m["metric_name"] for model in (models.Metric, models.MetricRollup)
+                                              for m in points[model]})
+        for model, rows in points.items():
+            if "metric_name" in model.__table__.c:
+                rows = [{**m, "metric_name": keys[m["metric_name"]]} for m in rows]
+            await _copy(db, model, rows)
+        losses = points[models.Loss] + points[models.LossRollup]
+        metrics = points[models.Metric] + points[models.MetricRollup]
+        await update_summaries(db, "loss", losses)
+        await update_summaries(db, "metric", metrics)
+        counts["losses"] += len(losses)
+        counts["metrics"] += len(metrics)
+
+    await db.commit()
+    await response_cache.invalidate(imported, listings=True, summaries=True)
+    return counts
@@ -0,0 +1,64 @@
+-- Convert the losses and metrics heap tables into hash-partitioned tables.
+--
+-- New databases get partitioned tables from the API startup; run this once on
+-- a database created by an older version, with the API stopped:
+--
+--   psql "$DATABASE_URL" -v partitions=16 -f migrations/001_partition_points.sql
+--
+-- Keep `partitions` equal to DB_POINT_PARTITIONS (default 16).
+
+\set ON_ERROR_STOP on
+\if :{?partitions}
+\else
+  \set partitions 16
+\endif
+
+BEGIN;
+
+ALTER TABLE losses RENAME TO losses_old;
+ALTER TABLE metrics RENAME TO metrics_old;
+ALTER TABLE losses_old DROP CONSTRAINT losses_pkey;
+ALTER TABLE metrics_old DROP CONSTRAINT metrics_pkey;
+DROP INDEX IF EXISTS idx_loss_run_split_step;
+DROP INDEX IF EXISTS idx_metric_run_split_step;
+
+CREATE TABLE losses (
+    run_id UUID NOT NULL REFERENCES training_runs (id) ON DELETE CASCADE,
+    step INTEGER NOT NULL,
+    split splitenum NOT NULL,
+    timestamp TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    value FLOAT NOT NULL,
+    PRIMARY KEY (run_id, split, step)
+) PARTITION BY HASH (run_id);
+
+CREATE TABLE metrics (
+    run_id UUID NOT NULL REFERENCES training_runs (id) ON DELETE CASCADE,
+    step INTEGER NOT NULL,
+    split splitenum NOT NULL,
+    metric_name metricenum NOT NULL,
+    timestamp TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    value FLOAT NOT NULL,
+    PRIMARY KEY (run_id, split, metric_name, step)
+) PARTITION BY HASH (run_id);
+
+SELECT format('CREATE TABLE losses_p%s PARTITION OF losses FOR VALUES WITH (MODULUS %s, REMAINDER %s)',
+              i, :partitions, i)
+FROM generate_series(0, :partitions - 1) AS i \gexec
+SELECT format('CREATE TABLE metrics_p%s PARTITION OF metrics FOR VALUES WITH (MODULUS %s, REMAINDER %s)',
+              i, :partitions, i)
+FROM generate_series(0, :partitions - 1) AS i \gexec
+
+INSERT INTO losses (run_id, step, split, timestamp, value)
+SELECT run_id, step, split, timestamp, value FROM losses_old;
+INSERT INTO metrics (run_id, step, split, metric_name, timestamp, value)
+SELECT run_id, step, split, metric_name, timestamp, value FROM metrics_old;
+
+DROP TABLE losses_old;
+DROP TABLE metrics_old;
+
+-- older versions created these foreign keys without ON DELETE CASCADE
+ALTER TABLE training_runs DROP CONSTRAINT IF EXISTS training_runs_model_id_fkey;
+ALTER TABLE training_runs ADD CONSTRAINT training_runs_model_id_fkey
+    FOREIGN KEY (model_id) REFERENCES models (id) ON DELETE CASCADE;
+
+COMMIT;
@@ -0,0 +1,20 @@
+-- Store training_runs.hyperparameters as JSONB with a GIN index, for /runs/search.
+--
+-- New databases get the JSONB column and the indexes from the API startup; run
+-- this once on a database created by an older version:
+--
+--   psql "$DATABASE_URL" -f migrations/002_hyperparameters_jsonb.sql
+
+\set ON_ERROR_STOP on
+
+BEGIN;
+
+ALTER TABLE training_runs ALTER COLUMN hyperparameters TYPE JSONB USING hyperparameters::jsonb;
+
+COMMIT;
+
+-- outside the transaction so the indexes build without blocking ingestion
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_training_runs_hyperparameters
+    ON training_runs USING gin (hyperparameters jsonb_path_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_training_runs_started_at
+    ON training_runs (started_at, id);
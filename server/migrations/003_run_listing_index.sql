@@ -0,0 +1,11 @@
+-- Index behind the paginated per-model run listings (/runs/runbymodels).
+--
+-- New databases get it from the API startup; run this once on a database
+-- created by an older version:
+--
+--   psql "$DATABASE_URL" -f migrations/003_run_listing_index.sql
+
+\set ON_ERROR_STOP on
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_training_runs_model_started
+    ON training_runs (model_id, started_at, id);
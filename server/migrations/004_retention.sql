@@ -0,0 +1,11 @@
+-- Column flagging runs whose points were compacted into loss_rollups /
+-- metric_rollups by the retention worker (RETENTION_DAYS).
+--
+-- The rollup tables themselves are created by the API startup; run this once
+-- on a database created by an older version:
+--
+--   psql "$DATABASE_URL" -f migrations/004_retention.sql
+
+\set ON_ERROR_STOP on
+
+ALTER TABLE training_runs ADD COLUMN IF NOT EXISTS compacted_at TIMESTAMPTZ;
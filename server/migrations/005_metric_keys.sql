@@ -0,0 +1,53 @@
+-- Intern metric names: metrics.metric_name and metric_rollups.metric_name
+-- become a SMALLINT key into metric_keys instead of the metricenum type, so
+-- any metric name can be logged without a schema change.
+--
+-- Run once on a database created by an older version, with the API stopped
+-- (every metrics row is rewritten):
+--
+--   psql "$DATABASE_URL" -f migrations/005_metric_keys.sql
+
+\set ON_ERROR_STOP on
+
+SELECT to_regclass('metric_rollups') IS NOT NULL AS has_rollups \gset
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS metric_keys (
+    id SMALLSERIAL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL UNIQUE
+);
+
+-- SQLAlchemy stored the enum member names; the API exposes their values
+CREATE TEMP TABLE metric_labels (label TEXT PRIMARY KEY, name TEXT NOT NULL) ON COMMIT DROP;
+INSERT INTO metric_labels VALUES
+    ('accuracy', 'accuracy'), ('f1_score', 'f1-score'), ('recall', 'recall'), ('precision', 'precision'),
+    ('balanced_accuracy', 'balanced accuracy'), ('mse', 'mse'), ('mae', 'mae');
+INSERT INTO metric_keys (name) SELECT name FROM metric_labels ORDER BY label ON CONFLICT (name) DO NOTHING;
+
+ALTER TABLE metrics ADD COLUMN metric_key SMALLINT;
+UPDATE metrics m SET metric_key = k.id
+FROM metric_labels l JOIN metric_keys k ON k.name = l.name
+WHERE l.label = m.metric_name::text;
+-- drops the primary key too
+ALTER TABLE metrics DROP COLUMN metric_name;
+ALTER TABLE metrics RENAME COLUMN metric_key TO metric_name;
+ALTER TABLE metrics ALTER COLUMN metric_name SET NOT NULL;
+ALTER TABLE metrics ADD PRIMARY KEY (run_id, split, metric_name, step);
+ALTER TABLE metrics ADD FOREIGN KEY (metric_name) REFERENCES metric_keys (id);
+
+\if :has_rollups
+ALTER TABLE metric_rollups ADD COLUMN metric_key SMALLINT;
+UPDATE metric_rollups m SET metric_key = k.id
+FROM metric_labels l JOIN metric_keys k ON k.name = l.name
+WHERE l.label = m.metric_name::text;
+ALTER TABLE metric_rollups DROP COLUMN metric_name;
+ALTER TABLE metric_rollups RENAME COLUMN metric_key TO metric_name;
+ALTER TABLE metric_rollups ALTER COLUMN metric_name SET NOT NULL;
+ALTER TABLE metric_rollups ADD PRIMARY KEY (run_id, split, metric_name, step);
+ALTER TABLE metric_rollups ADD FOREIGN KEY (metric_name) REFERENCES metric_keys (id);
+\endif
+
+DROP TYPE metricenum;
+
+COMMIT;
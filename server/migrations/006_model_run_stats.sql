@@ -0,0 +1,40 @@
+-- Per-model run counters behind /models/overview, maintained by the API on
+-- run creation, status change, deletion and import.
+--
+-- New databases get the table from the API startup; run this once on a
+-- database created by an older version, with the API stopped (the counters
+-- are filled from the existing runs):
+--
+--   psql "$DATABASE_URL" -f migrations/006_model_run_stats.sql
+
+\set ON_ERROR_STOP on
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS model_run_stats (
+    model_id UUID PRIMARY KEY REFERENCES models (id) ON DELETE CASCADE,
+    run_count INTEGER NOT NULL DEFAULT 0,
+    running INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    latest_status statusenum,
+    latest_started_at TIMESTAMPTZ
+);
+
+INSERT INTO model_run_stats (model_id, run_count, running, completed, failed, latest_status, latest_started_at)
+SELECT r.model_id,
+       count(*),
+       count(*) FILTER (WHERE r.status = 'running'),
+       count(*) FILTER (WHERE r.status = 'completed'),
+       count(*) FILTER (WHERE r.status = 'failed'),
+       (array_agg(r.status ORDER BY r.started_at DESC, r.id DESC))[1],
+       max(r.started_at)
+FROM training_runs r
+WHERE NOT EXISTS (SELECT 1 FROM deleting_runs d WHERE d.run_id = r.id)
+GROUP BY r.model_id
+ON CONFLICT (model_id) DO UPDATE SET
+    run_count = EXCLUDED.run_count, running = EXCLUDED.running, completed = EXCLUDED.completed,
+    failed = EXCLUDED.failed, latest_status = EXCLUDED.latest_status,
+    latest_started_at = EXCLUDED.latest_started_at;
+
+COMMIT;
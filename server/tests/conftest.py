@@ -0,0 +1,48 @@
+import asyncio
+import os
+import sys
+import pytest
+
+# run from anywhere: the app is imported as the top-level package ``app``
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+# importing app.db creates the engine; tests that need a database bring their own
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.db import Base, get_db, get_bulk_db
+from app.main import app
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_on_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+@pytest.fixture
+def database():
+    """
+    A fresh in-memory SQLite database behind ``get_db`` and ``get_bulk_db``,
+    yielding its session factory. Good for the ORM paths; Postgres-only SQL still needs Postgres.
+    """
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    Session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def session():
+        async with Session() as db:
+            yield db
+
+    asyncio.run(create())
+    app.dependency_overrides[get_db] = session
+    app.dependency_overrides[get_bulk_db] = session
+    yield Session
+    app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_bulk_db, None)
+    asyncio.run(engine.dispose())
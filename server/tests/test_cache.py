@@ -0,0 +1,68 @@
+import asyncio
+import pickle
+from app.cache import MemoryBackend, RedisBackend, CachedResponse
+
+
+def test_generations_stay_bounded_and_never_revive_stale_entries():
+    async def scenario():
+        backend = MemoryBackend(1024 * 1024)
+        backend.TAG_SLACK = 4
+        built = await backend.generations(["run:a"])
+        await backend.set("a", CachedResponse(b"old", {}, built), None)
+        await backend.bump(["run:a"])
+        for i in range(100):
+            await backend.bump([f"run:{i}"])
+        sizes = len(backend._generations)
+        entry = await backend.get("a")
+        return entry, built, await backend.generations(["run:a"]), sizes
+
+    entry, built, now, sizes = asyncio.run(scenario())
+    assert sizes <= 2 * (1 + 4)
+    # run:a was forgotten, but its entry still reads as stale
+    assert entry.generations == built and now != built
+
+
+def test_untouched_tags_keep_their_entries_valid():
+    async def scenario():
+        backend = MemoryBackend(1024 * 1024)
+        await backend.bump(["run:a"])
+        before = await backend.generations(["run:a", "run:b"])
+        await backend.bump(["run:c"])
+        return before, await backend.generations(["run:a", "run:b"])
+
+    before, after = asyncio.run(scenario())
+    assert before == after
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, px=None):
+        self.values[key] = value
+
+
+def redis_backend() -> RedisBackend:
+    backend = RedisBackend.__new__(RedisBackend)
+    backend._redis = FakeRedis()
+    return backend
+
+
+def test_redis_entries_are_data_not_pickles():
+    backend = redis_backend()
+    entry = CachedResponse(b'{"a":\n1}', {"etag": '"x"', "content-type": "application/json"}, [3, 0])
+
+    async def scenario():
+        await backend.set("k", entry, None)
+        stored = backend._redis.values[RedisBackend.PREFIX + "k"]
+        # a payload planted by whoever can write to the shared Redis is never unpickled
+        backend._redis.values[RedisBackend.PREFIX + "evil"] = pickle.dumps(entry)
+        return stored, await backend.get("k"), await backend.get("evil")
+
+    stored, loaded, planted = asyncio.run(scenario())
+    assert not stored.startswith(b"\x80")
+    assert loaded == entry
+    assert planted is None
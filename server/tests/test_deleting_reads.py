@@ -0,0 +1,29 @@
+import uuid
+from fastapi.testclient import TestClient
+from app.main import app
+
+
+def test_runs_being_deleted_are_hidden_from_reads(database):
+    client = TestClient(app)
+    model = client.post("/models/", json={"name": "resnet", "project_name": "vision"}).json()
+    run_id = client.post("/runs/", json={"model_id": model["id"]}).json()["id"]
+    other_id = client.post("/runs/", json={"model_id": model["id"]}).json()["id"]
+
+    assert client.get("/loss/", params={"run_id": run_id}).status_code == 200
+    assert client.delete(f"/runs/{run_id}").status_code == 202
+
+    # the deletion worker has not run yet: the points are still there, but hidden
+    assert client.get("/loss/", params={"run_id": run_id}).status_code == 404
+    assert client.get("/metric/", params={"run_id": run_id}).status_code == 404
+    assert client.get(f"/runs/{run_id}/stream").status_code == 404
+    assert client.get(f"/runs/{other_id},{run_id}/stream").status_code == 404
+    # unknown runs keep answering with an empty series
+    assert client.get("/loss/", params={"run_id": str(uuid.uuid4())}).json() == []
+
+
+def test_malformed_run_ids_are_rejected(database):
+    client = TestClient(app)
+    assert client.delete("/runs/not-a-uuid").status_code == 422
+    assert client.get(f"/runs/{uuid.uuid4()},oops/stream").status_code == 422
+    assert client.get("/export", params={"model_id": "oops"}).status_code == 422
+    assert client.get("/export", params={"run_id": f"{uuid.uuid4()},oops"}).status_code == 422
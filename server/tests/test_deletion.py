@@ -0,0 +1,33 @@
+from fastapi.testclient import TestClient
+from app.main import app
+
+
+def create_run(client: TestClient, name: str = "resnet") -> tuple[str, str]:
+    model = client.post("/models/", json={"name": name, "project_name": "vision"}).json()
+    run = client.post("/runs/", json={"model_id": model["id"]}).json()
+    return model["id"], run["id"]
+
+
+def test_model_delete_after_run_delete(database):
+    client = TestClient(app)
+    model_id, run_id = create_run(client)
+
+    assert client.delete(f"/runs/{run_id}").status_code == 202
+    response = client.delete(f"/models/{model_id}")
+
+    assert response.status_code == 202
+    # the run stays with the first job
+    assert response.json()["total_runs"] == 0
+
+
+def test_project_delete_after_model_delete(database):
+    client = TestClient(app)
+    model_id, _ = create_run(client)
+    other_id, _ = create_run(client, "vit")
+    client.post("/runs/", json={"model_id": other_id})
+
+    assert client.delete(f"/models/{model_id}").json()["total_runs"] == 1
+    response = client.delete("/models/project/vision")
+
+    assert response.status_code == 202
+    assert response.json()["total_runs"] == 2
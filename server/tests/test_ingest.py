@@ -0,0 +1,52 @@
+import asyncio
+import uuid
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from app import ingest, models
+
+
+class UniqueViolation(Exception):
+    sqlstate = "23505"
+
+
+class FakeSession:
+    """Runs lock_writable's SELECT, then fails the INSERT like asyncpg does on a duplicate key."""
+
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    async def execute(self, stmt, params=None):
+        self.calls += 1
+        if self.calls == 1:
+            return FakeResult()
+        raise self.error
+
+
+class FakeResult:
+    def all(self):
+        return []
+
+
+def duplicate_error():
+    cause = Exception()
+    cause.detail = "Key (run_id, split, step)=(42, train, 3) already exists."
+    orig = UniqueViolation("duplicate key value violates unique constraint")
+    orig.__cause__ = cause
+    return IntegrityError("INSERT INTO losses ...", {}, orig)
+
+
+def test_duplicate_point_is_a_conflict():
+    rows = [{"run_id": uuid.uuid4(), "split": "train", "step": 3, "value": 0.1}]
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(ingest.write_points(FakeSession(duplicate_error()), models.Loss, rows, read_back=False))
+    assert e.value.status_code == 409
+    assert "(run_id, split, step)=(42, train, 3)" in e.value.detail
+
+
+def test_other_integrity_errors_are_not_conflicts():
+    error = IntegrityError("INSERT INTO losses ...", {}, Exception("foreign key violation"))
+    rows = [{"run_id": uuid.uuid4(), "split": "train", "step": 3, "value": 0.1}]
+    with pytest.raises(IntegrityError):
+        asyncio.run(ingest.write_points(FakeSession(error), models.Loss, rows, read_back=False))
@@ -0,0 +1,126 @@
+import asyncio
+import uuid
+from app import ingest_queue as iq, models, schemas
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def commit(self):
+        pass
+
+
+async def fake_write(self, db, model, on_conflict, group):
+    results = [(entry, ([], schemas.BatchInsertResult(inserted=len(entry.rows)))) for entry in group]
+    return "loss", [row for entry in group for row in entry.rows], results
+
+
+async def broken(*args, **kwargs):
+    raise ConnectionError("redis is down")
+
+
+def points(n=3):
+    run_id = uuid.uuid4()
+    return [{"run_id": run_id, "step": s, "split": "train", "value": 0.5} for s in range(n)]
+
+
+def commit_queue(monkeypatch) -> iq.IngestQueue:
+    monkeypatch.setattr(iq, "AsyncSessionLocal", FakeSession)
+    monkeypatch.setattr(iq.IngestQueue, "_write", fake_write)
+    monkeypatch.setattr(iq, "INGEST_FLUSH_MS", 1)
+    return iq.IngestQueue("commit")
+
+
+def test_side_effect_failures_do_not_block_acknowledgements(monkeypatch):
+    queue = commit_queue(monkeypatch)
+    monkeypatch.setattr(iq.response_cache, "invalidate", broken)
+    monkeypatch.setattr(iq, "publish_points", broken)
+
+    async def scenario():
+        await queue.start()
+        first = await asyncio.wait_for(queue.submit(models.Loss, points(), "count"), 2)
+        second = await asyncio.wait_for(queue.submit(models.Loss, points(2), "count"), 2)
+        await queue.stop()
+        return first, second
+
+    (_, first), (_, second) = asyncio.run(scenario())
+    assert (first.inserted, second.inserted) == (3, 2)
+
+
+def test_failed_flush_keeps_the_queue_running(monkeypatch):
+    queue = commit_queue(monkeypatch)
+    flush = iq.IngestQueue._flush
+    calls = []
+
+    async def flaky_flush(self, entries):
+        calls.append(len(entries))
+        if len(calls) == 1:
+            raise RuntimeError("unexpected")
+        await flush(self, entries)
+
+    monkeypatch.setattr(iq.IngestQueue, "_flush", flaky_flush)
+
+    async def scenario():
+        await queue.start()
+        try:
+            await asyncio.wait_for(queue.submit(models.Loss, points(), "count"), 2)
+        except RuntimeError as e:
+            failed = e
+        _, counts = await asyncio.wait_for(queue.submit(models.Loss, points(), "count"), 2)
+        await queue.stop()
+        return failed, counts
+
+    failed, counts = asyncio.run(scenario())
+    assert str(failed) == "unexpected"
+    assert counts.inserted == 3
+
+
+def test_coalesced_duplicates_count_as_written_once(monkeypatch):
+    async def write_points(db, model, rows, on_conflict, read_back):
+        # the one key the two requests share is new: the database inserted it once
+        unique = {(r["run_id"], r["split"], r["step"]): r for r in rows}
+        return [{**r, "is_insert": True} for r in unique.values()]
+
+    monkeypatch.setattr(iq, "write_points", write_points)
+    shared = points(1)
+    entries = lambda mode: [iq._Entry(models.Loss, shared, "count", mode, None),
+                            iq._Entry(models.Loss, shared + points(1), "count", mode, None)]
+
+    _, _, updated = asyncio.run(iq.IngestQueue("commit")._write(None, models.Loss, "update", entries("update")))
+    _, _, ignored = asyncio.run(iq.IngestQueue("commit")._write(None, models.Loss, "ignore", entries("ignore")))
+
+    counts = lambda results: [(c.inserted, c.updated, c.skipped) for _, (_, c) in results]
+    assert counts(updated) == [(1, 0, 0), (1, 1, 0)]
+    assert counts(ignored) == [(1, 0, 0), (1, 0, 1)]
+
+
+def test_rows_being_flushed_count_toward_the_bound(monkeypatch):
+    monkeypatch.setattr(iq, "INGEST_QUEUE_MAX_ROWS", 5)
+    monkeypatch.setattr(iq, "INGEST_FLUSH_MS", 1)
+
+    async def scenario():
+        writing, done = asyncio.Event(), asyncio.Event()
+
+        async def slow_flush(self, entries):
+            writing.set()
+            await done.wait()
+
+        monkeypatch.setattr(iq.IngestQueue, "_flush", slow_flush)
+        queue = iq.IngestQueue("enqueue")
+        await queue.start()
+        await queue.submit(models.Loss, points(4), "none")
+        await asyncio.wait_for(writing.wait(), 2)
+        try:
+            await queue.submit(models.Loss, points(2), "none")
+        except iq.HTTPException as e:
+            refused = e.status_code
+        done.set()
+        await queue.stop()
+        # once the flush is over there is room again
+        return refused, queue._inflight
+
+    assert asyncio.run(scenario()) == (503, 0)
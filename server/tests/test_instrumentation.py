@@ -0,0 +1,44 @@
+import asyncio
+import gzip
+from fastapi.testclient import TestClient
+from app import main
+from app.db import get_db
+from app.instrumentation import HTTP_LATENCY
+from app.routers import transfer
+
+
+async def fake_import(db, path, format, skip_existing):
+    with open(path, "rb") as f:
+        assert f.read() == b"PAR1"
+    return {"models_created": 0, "runs_imported": 1, "runs_skipped": 0, "losses": 0, "metrics": 0}
+
+
+async def slow_db():
+    await asyncio.sleep(0.3)
+    yield None
+
+
+def recorded(method: str, route: str, status: int) -> int:
+    series = HTTP_LATENCY._series.get((method, route, status))
+    return sum(series[0]) if series else 0
+
+
+def test_gzip_body_keeps_route_label(monkeypatch):
+    monkeypatch.setattr(transfer, "import_file", fake_import)
+    before = recorded("POST", "/import", 200)
+    response = TestClient(main.app).post("/import", content=gzip.compress(b"PAR1"),
+                                         headers={"Content-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert recorded("POST", "/import", 200) == before + 1
+
+
+def test_timed_out_request_is_recorded_as_504(monkeypatch):
+    monkeypatch.setattr(main, "REQUEST_TIMEOUT", 0.1)
+    main.app.dependency_overrides[get_db] = slow_db
+    before = recorded("GET", "/models/overview", 504)
+    try:
+        response = TestClient(main.app, raise_server_exceptions=False).get("/models/overview")
+    finally:
+        main.app.dependency_overrides.clear()
+    assert response.status_code == 504
+    assert recorded("GET", "/models/overview", 504) == before + 1
@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import column
+from app.metric_keys import MetricKeys, MetricName, UnknownMetricKey
+
+
+def cached(**keys) -> MetricKeys:
+    """A cache that already knows ``keys``: no database round trip is needed."""
+    cache = MetricKeys()
+    cache._add((key, name) for name, key in keys.items())
+    return cache
+
+
+def test_intern_maps_keys_back_to_names():
+    cache = cached(accuracy=1, top5=2)
+    rows = [{"run_id": "r", "step": 1, "split": "train", "metric_key": 2, "value": 0.5},
+            {"run_id": "r", "step": 1, "split": "train", "metric_name": "accuracy", "value": 0.5}]
+
+    interned = asyncio.run(cache.intern(None, rows))
+
+    assert [r["metric_name"] for r in interned] == ["top5", "accuracy"]
+    assert all("metric_key" not in r for r in interned)
+
+
+def test_intern_rejects_unknown_keys(monkeypatch):
+    cache = cached(accuracy=1)
+
+    async def sync(db):
+        pass
+
+    monkeypatch.setattr(cache, "sync", sync)
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(cache.intern(None, [{"metric_key": 7, "value": 0.5}]))
+    assert e.value.status_code == 422
+
+
+def test_metric_name_column_stores_keys(monkeypatch):
+    from app import metric_keys
+    monkeypatch.setattr(metric_keys, "metric_keys", cached(accuracy=1))
+    column = MetricName()
+
+    assert column.process_bind_param("accuracy", None) == 1
+    assert column.process_result_value(1, None) == "accuracy"
+    # unresolved names and unsynced keys are errors, never a made-up key or name
+    with pytest.raises(LookupError):
+        column.process_bind_param("never-logged", None)
+    with pytest.raises(UnknownMetricKey):
+        column.process_result_value(17, None)
+
+
+def test_filters_on_unknown_names_match_nothing():
+    cache = cached(accuracy=1)
+    metric = column("metric_name")
+    assert str(cache.matches(metric, "accuracy").compile(compile_kwargs={"literal_binds": True})) == "metric_name = 1"
+    assert str(cache.matches(metric, "never-logged").compile()) == "false"
+
+
+def test_reads_resync_on_keys_created_elsewhere():
+    cache = cached(accuracy=1)
+
+    class Session:
+        calls = 0
+
+        async def execute(self, stmt):
+            self.calls += 1
+            if 2 not in cache.names:
+                raise UnknownMetricKey(2)
+            return "rows"
+
+    async def sync(db):
+        # another worker created top5 after this one's last sync
+        cache._add([(2, "top5")])
+
+    cache.sync = sync
+    session = Session()
+    assert asyncio.run(cache.execute(session, "SELECT ...")) == "rows"
+    assert session.calls == 2
@@ -0,0 +1,62 @@
+import uuid
+import asyncio
+from sqlalchemy import update
+from fastapi.testclient import TestClient
+from app.main import app
+from app import models
+from app.cache import response_cache, MemoryBackend
+from app.enums.enums import SplitEnum, StatusEnum
+
+
+def overview(client):
+    return {m["name"]: m for m in client.get("/models/overview").json()}
+
+
+def test_overview_counters_follow_run_writes(database):
+    client = TestClient(app)
+    model = client.post("/models/", json={"name": "resnet", "project_name": "vision"}).json()
+    client.post("/models/", json={"name": "vit", "project_name": "vision"})
+    first = client.post("/runs/", json={"model_id": model["id"]}).json()["id"]
+    second = client.post("/runs/", json={"model_id": model["id"]}).json()["id"]
+    # a retried create is not counted twice
+    client.post("/runs/", json={"model_id": model["id"], "id": second})
+
+    stats = overview(client)
+    assert stats["vit"]["run_count"] == 0 and stats["vit"]["latest_status"] is None
+    assert (stats["resnet"]["run_count"], stats["resnet"]["running"]) == (2, 2)
+
+    client.patch("/runs/update_status", json={"run_id": second, "new_status": "failed"})
+    client.patch("/runs/update_status", json={"run_id": first, "new_status": "completed"})
+    client.patch("/runs/update_status", json={"run_id": first, "new_status": "completed"})
+    stats = overview(client)["resnet"]
+    assert (stats["running"], stats["completed"], stats["failed"]) == (0, 1, 1)
+
+    assert client.delete(f"/runs/{second}").status_code == 202
+    stats = overview(client)["resnet"]
+    assert (stats["run_count"], stats["failed"], stats["latest_status"]) == (1, 0, "completed")
+    # a status change of a run being deleted leaves the counters alone
+    client.patch("/runs/update_status", json={"run_id": second, "new_status": "running"})
+    assert overview(client)["resnet"]["running"] == 0
+
+
+def test_ingest_invalidates_only_listings_with_summaries(database, monkeypatch):
+    monkeypatch.setattr(response_cache, "backend", MemoryBackend(1024 * 1024))
+    client = TestClient(app)
+    model = client.post("/models/", json={"name": "resnet", "project_name": "vision"}).json()
+    run_id = client.post("/runs/", json={"model_id": model["id"]}).json()["id"]
+    listing = f"/runs/runbymodels/{model['id']}"
+    assert client.get(listing).json()[0]["summaries"] == []
+    assert client.get(listing, params={"fields": "id,status"}).json() == [{"id": run_id, "status": "running"}]
+
+    async def ingest():
+        # what an ingest does: upsert the summaries, then invalidate
+        async with database() as db:
+            db.add(models.RunSummary(run_id=uuid.UUID(run_id), split=SplitEnum.train, metric="loss", count=1))
+            await db.execute(update(models.TrainingRun).values(status=StatusEnum.failed))
+            await db.commit()
+        await response_cache.invalidate([run_id], summaries=True)
+
+    asyncio.run(ingest())
+    assert [s["count"] for s in client.get(listing).json()[0]["summaries"]] == [1]
+    # the status was changed behind the API's back: the listing without summaries is still cached
+    assert client.get(listing, params={"fields": "id,status"}).json()[0]["status"] == "running"
@@ -0,0 +1,50 @@
+import uuid
+from datetime import datetime, timezone
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from app.db import get_db
+from app.main import app
+
+
+class RowsSession:
+    """Stand-in AsyncSession answering every query with the same SQLAlchemy rows."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def execute(self, stmt):
+        rows = self.rows
+
+        class Result:
+            def all(self):
+                return rows
+        return Result()
+
+
+@pytest.fixture
+def overview_rows():
+    # real Row objects, as returned by the grouped Postgres query
+    with create_engine("sqlite://").connect() as conn:
+        return conn.execute(text(
+            "SELECT :id AS id, 'resnet' AS name, 'vision' AS project_name, 3 AS run_count, "
+            "1 AS running, 1 AS completed, 1 AS failed, 'running' AS latest_status, "
+            ":started AS latest_started_at"
+        ), {"id": str(uuid.uuid4()), "started": datetime(2024, 1, 1, tzinfo=timezone.utc).isoformat()}).all()
+
+
+def test_models_overview_serializes_rows(overview_rows):
+    async def db():
+        yield RowsSession(overview_rows)
+
+    app.dependency_overrides[get_db] = db
+    try:
+        response = TestClient(app).get("/models/overview")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    [model] = response.json()
+    assert model["name"] == "resnet"
+    assert (model["run_count"], model["running"], model["completed"], model["failed"]) == (3, 1, 1, 1)
+    assert model["latest_status"] == "running"
@@ -0,0 +1,93 @@
+import json
+import asyncio
+from app import pubsub
+
+
+class FakeConnection:
+    def __init__(self, alive_pings: int):
+        self.alive_pings = alive_pings
+        self.listeners = []
+        self.notified = []
+        self.closed = False
+
+    async def add_listener(self, channel, callback):
+        self.listeners.append(callback)
+
+    async def fetchval(self, query):
+        if self.alive_pings == 0:
+            raise ConnectionResetError("server closed the connection")
+        self.alive_pings -= 1
+        return 1
+
+    async def execute(self, query, channel, payload):
+        self.notified.append(json.loads(payload))
+
+    async def close(self, timeout=None):
+        self.closed = True
+
+
+def test_listener_reconnects_and_asks_for_resync(monkeypatch):
+    # refused once, then a connection that drops after one ping, then a healthy one
+    attempts = [ConnectionRefusedError("db restarting"), FakeConnection(1), FakeConnection(1000)]
+    opened = []
+
+    async def connect(dsn):
+        result = attempts.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        opened.append(result)
+        return result
+
+    monkeypatch.setattr(pubsub.asyncpg, "connect", connect)
+    monkeypatch.setattr(pubsub, "LISTEN_PING_SECONDS", 0.01)
+    monkeypatch.setattr(pubsub, "LISTEN_MAX_BACKOFF", 0.01)
+
+    async def scenario():
+        broker = pubsub.Broker("postgres")
+        queue = broker.subscribe(["run-1"])
+        await broker.start()
+        for _ in range(200):
+            if len(opened) == 2 and not queue.empty():
+                break
+            await asyncio.sleep(0.01)
+        await broker.stop()
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert len(opened) == 2 and all(conn.closed for conn in opened)
+    assert opened[1].listeners
+    assert queue.get_nowait() == {"run_id": "run-1", "type": "resync"}
+    assert opened[1].notified[0]["subscribed"] == ["run-1"]
+
+
+def test_notify_payloads_fit_with_envelope():
+    broker = pubsub.Broker("postgres")
+    points = [{"step": i, "value": i / 3, "split": "train"} for i in range(2000)]
+    points.insert(10, {"step": -1, "value": "x" * (2 * pubsub.MAX_NOTIFY_BYTES)})
+    payloads = broker._payloads({"run_id": "run-1", "type": "points", "points": points})
+
+    messages = [json.loads(p) for p in payloads]
+    assert all(len(p.encode()) <= pubsub.MAX_NOTIFY_BYTES for p in payloads)
+    assert all(m["event"]["points"] for m in messages if m["event"]["type"] == "points")
+    # the oversized point is replaced by a resync, the others are all relayed in order
+    assert [m["event"]["type"] for m in messages].count("resync") == 1
+    relayed = [p for m in messages if m["event"]["type"] == "points" for p in m["event"]["points"]]
+    assert relayed == points[:10] + points[11:]
+
+
+def test_publish_skips_notify_without_remote_subscribers(monkeypatch):
+    notified = []
+
+    async def notify(run_id, event):
+        notified.append(run_id)
+
+    async def scenario():
+        broker = pubsub.Broker("postgres")
+        monkeypatch.setattr(broker, "_notify", notify)
+        await broker.publish("run-1", {"type": "points", "points": []})
+        broker._on_notify(None, 0, pubsub.CHANNEL, json.dumps({"origin": "other", "subscribed": ["run-1"]}))
+        assert broker.has_subscribers("run-1")
+        await broker.publish("run-1", {"type": "points", "points": []})
+
+    asyncio.run(scenario())
+    assert notified == ["run-1"]
@@ -0,0 +1,38 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+from app import models
+from app.ingest import write_points
+
+
+class RunsSession:
+    """Stand-in AsyncSession: answers the run lookup and records the statements."""
+
+    def __init__(self, runs):
+        self.runs = runs
+        self.statements = []
+
+    async def execute(self, stmt, params=None):
+        self.statements.append(str(stmt.compile(dialect=postgresql.dialect())))
+        runs = self.runs
+
+        class Result:
+            def all(self):
+                return list(runs.items())
+        return Result()
+
+
+def test_points_for_compacted_runs_are_refused():
+    live, compacted = uuid.uuid4(), uuid.uuid4()
+    db = RunsSession({live: None, compacted: datetime(2024, 1, 1, tzinfo=timezone.utc)})
+    rows = [{"run_id": run_id, "step": 1, "split": "train", "value": 0.5} for run_id in (live, compacted)]
+
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(write_points(db, models.Loss, rows, "update"))
+
+    assert e.value.status_code == 409 and str(compacted) in e.value.detail
+    # the run rows were locked and nothing was inserted
+    assert len(db.statements) == 1 and db.statements[0].endswith("FOR KEY SHARE")
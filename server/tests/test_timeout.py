@@ -0,0 +1,39 @@
+import asyncio
+from fastapi.testclient import TestClient
+from app import main
+from app.db import get_db, get_bulk_db, engine_options
+from app.routers import transfer
+
+
+async def slow_import(db, path, format, skip_existing):
+    await asyncio.sleep(0.3)
+    return {"models_created": 0, "runs_imported": 1, "runs_skipped": 0, "losses": 10, "metrics": 0}
+
+
+async def slow_db():
+    await asyncio.sleep(0.3)
+    yield None
+
+
+def test_request_timeout_spares_bulk_uploads(monkeypatch):
+    monkeypatch.setattr(main, "REQUEST_TIMEOUT", 0.1)
+    monkeypatch.setattr(transfer, "import_file", slow_import)
+    main.app.dependency_overrides[get_db] = slow_db
+    main.app.dependency_overrides[get_bulk_db] = slow_db
+    try:
+        client = TestClient(main.app, raise_server_exceptions=False)
+        # an ordinary route is cut off...
+        assert client.get("/models/overview").status_code == 504
+        # ...a bulk upload is not
+        response = client.post("/import", content=b"PAR1")
+    finally:
+        main.app.dependency_overrides.clear()
+    assert response.status_code == 200
+    assert response.json()["runs_imported"] == 1
+
+
+def test_bulk_connections_have_no_statement_timeout():
+    url = "postgresql+asyncpg://u:p@db/traintrack"
+    api, bulk = engine_options(url)["connect_args"], engine_options(url, bulk=True)["connect_args"]
+    assert api["command_timeout"] and api["server_settings"]["statement_timeout"] != "0"
+    assert bulk["command_timeout"] is None and bulk["server_settings"]["statement_timeout"] == "0"
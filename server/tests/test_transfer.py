@@ -0,0 +1,51 @@
+import asyncio
+import json
+import uuid
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import select
+from app import models, transfer
+
+
+def write_export(path, header, points):
+    schema = transfer.POINT_SCHEMA.with_metadata({transfer.HEADER_KEY: json.dumps(header)})
+    columns = {name: [p.get(name) for p in points] for name in schema.names}
+    pq.write_table(pa.table(columns, schema=schema), path)
+
+
+def test_import_keeps_compacted_runs_rolled_up(database, monkeypatch, tmp_path):
+    async def no_summaries(db, kind, rows):
+        pass
+
+    # run_summaries' upsert is Postgres-only SQL
+    monkeypatch.setattr(transfer, "update_summaries", no_summaries)
+    model_id, compacted, raw = str(uuid.uuid4()), str(uuid.uuid4()), str(uuid.uuid4())
+    run = {"model_id": model_id, "status": "completed", "hyperparameters": {}}
+    header = {"version": 1, "models": [{"id": model_id, "name": "resnet", "project_name": "vision"}], "runs": [
+        {**run, "id": compacted, "started_at": None, "finished_at": "2024-01-02T00:00:00+00:00",
+         "compacted_at": "2024-02-01T00:00:00+00:00"},
+        # a file exported before compacted_at was part of the header
+        {**run, "id": raw, "started_at": "2024-01-01T00:00:00+00:00", "finished_at": None},
+    ]}
+    point = {"kind": "loss", "split": "train", "step": 10, "value": 0.5}
+    write_export(tmp_path / "runs.parquet", header, [
+        {**point, "run_id": compacted, "min_value": 0.4, "max_value": 0.9, "count": 10},
+        {**point, "run_id": raw},
+    ])
+
+    async def scenario():
+        async with database() as db:
+            counts = await transfer.import_file(db, str(tmp_path / "runs.parquet"), "parquet", True)
+        async with database() as db:
+            runs = {str(r.id): r for r in (await db.execute(select(models.TrainingRun))).scalars()}
+            rollups = (await db.execute(select(models.LossRollup))).scalars().all()
+            losses = (await db.execute(select(models.Loss))).scalars().all()
+        return counts, runs, rollups, losses
+
+    counts, runs, rollups, losses = asyncio.run(scenario())
+    assert counts["runs_imported"] == 2 and counts["losses"] == 2
+    assert runs[compacted].compacted_at is not None and runs[raw].compacted_at is None
+    # a missing started_at falls back to finished_at
+    assert runs[compacted].started_at.date().isoformat() == "2024-01-02"
+    assert [(str(r.run_id), r.min_value, r.max_value, r.count) for r in rollups] == [(compacted, 0.4, 0.9, 10)]
+    assert [str(p.run_id) for p in losses] == [raw]